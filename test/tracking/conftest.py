@@ -0,0 +1,21 @@
+import cv2
+import numpy as np
+
+import pytest
+
+
+@pytest.fixture
+def videoFrames():
+  # Small grayscale frames, all different, which survive a lossless encoding unchanged
+  rng = np.random.default_rng(0)
+  return rng.integers(0, 256, (12, 32, 48), dtype=np.uint8)
+
+
+@pytest.fixture
+def aviVideo(tmp_path, videoFrames):
+  videoPath = str(tmp_path / 'video.avi')
+  out = cv2.VideoWriter(videoPath, cv2.VideoWriter_fourcc(*'HFYU'), 10, (videoFrames.shape[2], videoFrames.shape[1]))
+  for frame in videoFrames:
+    out.write(cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR))
+  out.release()
+  return videoPath
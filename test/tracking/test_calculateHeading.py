@@ -0,0 +1,46 @@
+import math
+
+import cv2
+import numpy as np
+
+import pytest
+
+from zebrazoom.code.getHyperparameters import getHyperparametersSimple
+from zebrazoom.code.trackingFolder.trackingFunctions import calculateAngle
+from zebrazoom.code.trackingFolder.headTrackingHeadingCalculationFolder.calculateHeading import computeHeading
+
+
+def _referenceComputeHeading(thresh1, x, y, headSize):
+  # Eigenvector of the covariance matrix of the coordinates of the nonzero pixels of the window around the head, in the image padded with a white margin
+  paddedImage = np.full((len(thresh1) + 2 * headSize, len(thresh1[0]) + 2 * headSize), 255, np.uint8)
+  paddedImage[headSize:len(thresh1)+headSize, headSize:len(thresh1[0])+headSize] = thresh1
+  img = paddedImage[y:y + 2 * headSize, x:x + 2 * headSize]
+  img[0,:] = 255
+  img[len(img)-1,:] = 255
+  img[:,0] = 255
+  img[:,len(img[0])-1] = 255
+  yPixels, xPixels = np.nonzero(img)
+  cov = np.cov(np.vstack([xPixels - np.mean(xPixels), yPixels - np.mean(yPixels)]))
+  evals, evecs = np.linalg.eig(cov)
+  x_v1, y_v1 = evecs[:, np.argsort(evals)[::-1][0]]
+  return [(calculateAngle(0, 0, x_v1, y_v1) - math.pi/2) % (2 * math.pi), cov]
+
+
+@pytest.mark.parametrize('seed', range(0, 300))
+def test_computeHeading_matches_the_eigenvector_of_the_pixels(seed):
+  # Fish like blobs, the window around the head sometimes going out of the image
+  rng = np.random.default_rng(seed)
+  thresh1 = np.full((rng.integers(30, 120), rng.integers(30, 120)), 255, np.uint8)
+  for i in range(0, rng.integers(1, 4)):
+    cv2.ellipse(thresh1, (int(rng.integers(0, len(thresh1[0]))), int(rng.integers(0, len(thresh1)))), (int(rng.integers(2, 20)), int(rng.integers(1, 8))), float(rng.uniform(0, 180)), 0, 360, 0, -1)
+  x = int(rng.integers(0, len(thresh1[0])))
+  y = int(rng.integers(0, len(thresh1)))
+  headSize = int(rng.integers(5, 30))
+  heading = computeHeading(thresh1.copy(), x, y, headSize, getHyperparametersSimple({}))
+  [expectedHeading, cov] = _referenceComputeHeading(thresh1, x, y, headSize)
+  angleDifference = abs((heading - expectedHeading + math.pi) % (2 * math.pi) - math.pi)
+  if math.isclose(cov[0, 0], cov[1, 1], rel_tol=1e-12):
+    # Main axis along a diagonal: the sign of the eigenvector found by np.linalg.eig depends on rounding errors
+    assert angleDifference < 1e-9 or abs(angleDifference - math.pi) < 1e-9
+  else:
+    assert angleDifference < 1e-9
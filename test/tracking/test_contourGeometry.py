@@ -0,0 +1,120 @@
+import math
+
+import cv2
+import numpy as np
+
+import pytest
+
+from zebrazoom.code.trackingFolder.contourGeometry import pointsPolygonTest, findClosestContourPoint, simpleOptimalValueSearch, reajustCenterOfMassIfNecessary
+
+
+def _referenceSimpleOptimalValueSearch(PtClosest, contour, unitVector, lenX, lenY):
+  # Copy that was in multipleAnimalsHeadTracking and fishTailTrackingDifficultBackground (the points given as floats to cv2.pointPolygonTest)
+  factor = 0
+  dist = 1
+  maxDist = 0
+  indMax = 0
+  testCenter = PtClosest + factor * unitVector
+  while (dist > 0) and (factor < 20) and (testCenter[0] >= 0) and (testCenter[1] >= 0) and (testCenter[0] < lenX) and (testCenter[1] < lenY):
+    factor = factor + 1
+    testCenter = PtClosest + factor * unitVector
+    testCenter = testCenter.astype(int)
+    dist = cv2.pointPolygonTest(contour, (float(testCenter[0]), float(testCenter[1])), True)
+    if dist > maxDist:
+      maxDist = dist
+      indMax  = factor
+  testCenter = PtClosest + indMax * unitVector
+  testCenter = testCenter.astype(int)
+  return testCenter
+
+
+def _referenceReajustCenterOfMassIfNecessary(contour, x, y, lenX, lenY, searchFurthestPointInside):
+  # Copy that was in multipleAnimalsHeadTracking (first point inside) and fishTailTrackingDifficultBackground (furthest point inside)
+  inside = cv2.pointPolygonTest(contour, (float(x), float(y)), True)
+  if inside < 0:
+    minDist = 100000000000000
+    indMin  = 0
+    for i in range(0, len(contour)):
+      Pt = contour[i][0]
+      dist = math.sqrt((Pt[0] - x)**2 + (Pt[1] - y)**2)
+      if dist < minDist:
+        minDist = dist
+        indMin  = i
+    PtClosest = contour[indMin][0]
+    unitVector = np.array([PtClosest[0] - x, PtClosest[1] - y])
+    unitVectorLength = math.sqrt(unitVector[0]**2 + unitVector[1]**2)
+    unitVector[0] = unitVector[0] / unitVectorLength
+    unitVector[1] = unitVector[1] / unitVectorLength
+    if not(searchFurthestPointInside):
+      factor = 5
+      testCenter = PtClosest + factor * unitVector
+      testCenter = testCenter.astype(int)
+      while (cv2.pointPolygonTest(contour, (float(testCenter[0]), float(testCenter[1])), True) <= 0) and (factor > 1):
+        factor = factor - 1
+        testCenter = PtClosest + factor * unitVector
+    else:
+      testCenter = _referenceSimpleOptimalValueSearch(PtClosest, contour, unitVector, lenX, lenY)
+    x = testCenter[0]
+    y = testCenter[1]
+  return [x, y]
+
+
+def _blobContour(seed):
+  # Contour of a random blob, with concavities
+  rng = np.random.default_rng(seed)
+  image = np.zeros((60, 80), dtype=np.uint8)
+  for i in range(0, 6):
+    cv2.ellipse(image, (int(rng.integers(25, 55)), int(rng.integers(20, 40))), (int(rng.integers(3, 15)), int(rng.integers(3, 15))), float(rng.uniform(0, 180)), 0, 360, 255, -1)
+  contours, hierarchy = cv2.findContours(image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+  return max(contours, key=cv2.contourArea)
+
+
+def _thinContour(seed):
+  # Contour of a thin animal, across which the points are only a few pixels inside
+  rng = np.random.default_rng(seed)
+  image = np.zeros((60, 80), dtype=np.uint8)
+  cv2.ellipse(image, (40, 30), (int(rng.integers(15, 30)), int(rng.integers(2, 5))), float(rng.uniform(0, 180)), 0, 360, 255, -1)
+  contours, hierarchy = cv2.findContours(image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+  return max(contours, key=cv2.contourArea)
+
+
+@pytest.mark.parametrize('seed', range(0, 5))
+def test_pointsPolygonTest_matches_opencv(seed):
+  contour = _blobContour(seed)
+  rng = np.random.default_rng(seed)
+  gridPoints = np.array([[x, y] for x in range(-2, 82, 3) for y in range(-2, 62, 3)])
+  points = np.concatenate((gridPoints, rng.uniform(-2, 82, (200, 2)), contour[:, 0], contour[:-1, 0] / 2 + contour[1:, 0] / 2))
+  distances = pointsPolygonTest(contour, points)
+  expectedDistances = np.array([cv2.pointPolygonTest(contour, (float(x), float(y)), True) for [x, y] in points])
+  assert np.array_equal(np.sign(distances), np.sign(expectedDistances))
+  assert np.allclose(distances, expectedDistances, atol=1e-4)
+
+
+def test_findClosestContourPoint():
+  contour = np.array([[[0, 0]], [[10, 0]], [[10, 10]], [[0, 10]]])
+  assert findClosestContourPoint(contour, 8, 1) == 1
+  assert findClosestContourPoint(contour, 5, 5) == 0 # first one in case of equality
+
+
+@pytest.mark.parametrize('seed', range(0, 8))
+@pytest.mark.parametrize('searchFurthestPointInside', [False, True])
+@pytest.mark.parametrize('getContour', [_blobContour, _thinContour])
+def test_reajustCenterOfMassIfNecessary_matches_the_trackers_copies(seed, searchFurthestPointInside, getContour):
+  contour = getContour(seed)
+  rng = np.random.default_rng(seed)
+  for [x, y] in rng.integers(0, [80, 60], (100, 2)):
+    [newX, newY] = reajustCenterOfMassIfNecessary(contour, x, y, 80, 60, searchFurthestPointInside)
+    [expectedX, expectedY] = _referenceReajustCenterOfMassIfNecessary(contour, x, y, 80, 60, searchFurthestPointInside)
+    assert [newX, newY] == [expectedX, expectedY]
+
+
+@pytest.mark.parametrize('seed', range(0, 8))
+@pytest.mark.parametrize('getContour', [_blobContour, _thinContour])
+def test_simpleOptimalValueSearch_matches_the_trackers_copies(seed, getContour):
+  contour = getContour(seed)
+  rng = np.random.default_rng(seed)
+  for i in range(0, 50):
+    PtClosest = contour[rng.integers(0, len(contour))][0]
+    angle = rng.uniform(0, 2 * math.pi)
+    for unitVector in [np.array([math.cos(angle), math.sin(angle)]), np.array([int(rng.integers(-1, 2)), int(rng.integers(-1, 2))])]:
+      assert np.array_equal(simpleOptimalValueSearch(PtClosest, contour, unitVector, 80, 60), _referenceSimpleOptimalValueSearch(PtClosest, contour, unitVector, 80, 60))
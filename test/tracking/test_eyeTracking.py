@@ -0,0 +1,82 @@
+import math
+
+import cv2
+import numpy as np
+
+import pytest
+
+import zebrazoom.code.trackingFolder.eyeTracking.eyeTracking as eyeTracking
+
+
+def _referenceFindEyeAngleWithSegment(forSpecificEye, headingLineHalfDiameter, headingLineWidth):
+  # Each segment is drawn in black on a copy of the eye crop and the remaining pixels are summed
+  pixelSum  = 0
+  bestAngle = 0
+  nTries    = 20
+  angleOptions = [j * (math.pi / nTries) for j in range(0, nTries)]
+  for step in range(0, 2):
+    for angleOption in angleOptions:
+      startPoint = (int(headingLineHalfDiameter - headingLineHalfDiameter * math.cos(angleOption)), int(headingLineHalfDiameter - headingLineHalfDiameter * math.sin(angleOption)))
+      endPoint   = (int(headingLineHalfDiameter + headingLineHalfDiameter * math.cos(angleOption)), int(headingLineHalfDiameter + headingLineHalfDiameter * math.sin(angleOption)))
+      testImage  = cv2.line(forSpecificEye.copy(), startPoint, endPoint, (0), headingLineWidth)
+      nbWhitePixels = np.sum(testImage)
+      if nbWhitePixels > pixelSum:
+        pixelSum  = nbWhitePixels
+        bestAngle = angleOption
+    angleOptions = [bestAngle - ((math.pi / nTries) / 2) + ((j2 / 50) * (math.pi / nTries)) for j2 in range(0, 50)]
+  return bestAngle
+
+
+def _referenceEyesContours(threshEye, eyesCoordinates):
+  contours, hierarchy = cv2.findContours(threshEye, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+  areas   = np.array([cv2.contourArea(contour) for contour in contours])
+  centers = np.array([[int(M['m10']/M['m00']), int(M['m01']/M['m00'])] if M['m00'] else [0, 0] for M in map(cv2.moments, contours)])
+  candidates = np.nonzero(areas < len(threshEye) * len(threshEye[0]) * 0.9)[0]
+  return [contours[candidates[np.argmin((x - centers[candidates, 0])**2 + (y - centers[candidates, 1])**2)]] for [x, y] in eyesCoordinates]
+
+
+def _eyes(shape, centers, angles, halfAxes):
+  # Thresholded image of a head embedded animal: dark eyes and a dark spot elsewhere on a white background
+  threshEye = np.full(shape, 255, np.uint8)
+  for center, angle, halfAxis in zip(centers, angles, halfAxes):
+    cv2.ellipse(threshEye, center, halfAxis, math.degrees(angle), 0, 360, 0, -1)
+  threshEye[0,:] = 255
+  threshEye[len(threshEye)-1,:] = 255
+  threshEye[:,0] = 255
+  threshEye[:,len(threshEye[0])-1] = 255
+  return threshEye
+
+
+@pytest.mark.parametrize('seed', range(0, 10))
+@pytest.mark.parametrize('headingLineHalfDiameter, headingLineWidth', [(10, 3), (15, 5), (8, 1)])
+def test_findEyeAngleWithSegment_matches_the_draw_and_sum_loop(seed, headingLineHalfDiameter, headingLineWidth):
+  rng = np.random.default_rng(seed)
+  forSpecificEye = np.full((2 * headingLineHalfDiameter, 2 * headingLineHalfDiameter), 220, np.uint8)
+  cv2.ellipse(forSpecificEye, (headingLineHalfDiameter, headingLineHalfDiameter), (headingLineHalfDiameter - 2, headingLineHalfDiameter // 3), rng.uniform(0, 180), 0, 360, 30, -1)
+  forSpecificEye = cv2.add(forSpecificEye, rng.integers(0, 20, forSpecificEye.shape, dtype=np.uint8))
+  assert eyeTracking.findEyeAngleWithSegment(forSpecificEye, headingLineHalfDiameter, headingLineWidth) == _referenceFindEyeAngleWithSegment(forSpecificEye, headingLineHalfDiameter, headingLineWidth)
+
+
+def test_getEyesContours_on_the_region_of_the_previous_eyes(monkeypatch):
+  eyeTracking.eyesRegionCache.clear()
+  shapes = []
+  getEyeContours = eyeTracking.getEyeContours
+  def recordingGetEyeContours(threshEye, offset=(0, 0)):
+    shapes.append(threshEye.shape)
+    return getEyeContours(threshEye, offset)
+  monkeypatch.setattr(eyeTracking, 'getEyeContours', recordingGetEyeContours)
+  eyesCoordinates = [[80, 100], [120, 100]]
+  rng = np.random.default_rng(0)
+  for frameNumber in range(0, 20):
+    centers = [(80, 100), (120, 100), (30, 170)]
+    halfAxes = [(9, 5), (9, 5), (6, 6)]
+    if frameNumber == 10: # the left eye leaves the region: the closest contour of the region is too far from the left eye coordinate and the whole image is used
+      centers[0] = (80, 30)
+    if frameNumber == 15: # the spot is inside the region
+      centers[2] = (100, 85)
+    threshEye = _eyes((200, 200), centers, rng.uniform(0, math.pi, 3), halfAxes)
+    eyesContours = eyeTracking.getEyesContours(threshEye, eyesCoordinates[0], eyesCoordinates[1], 0)
+    for contour, expectedContour in zip(eyesContours, _referenceEyesContours(threshEye, eyesCoordinates)):
+      assert np.array_equal(contour, expectedContour)
+  assert shapes.count((200, 200)) == 2 # first frame and frame 10
+  eyeTracking.eyesRegionCache.clear()
@@ -0,0 +1,30 @@
+import numpy as np
+
+from zebrazoom.code.getHyperparameters import getHyperparametersSimple
+import zebrazoom.code.fasterMultiprocessing as fasterMultiprocessing
+
+
+def _sameOutput(output, expectedOutput):
+  if isinstance(expectedOutput, dict):
+    return output.keys() == expectedOutput.keys() and all(_sameOutput(output[key], expectedOutput[key]) for key in expectedOutput)
+  if isinstance(expectedOutput, (list, tuple)) and not(isinstance(output, np.ndarray)):
+    return len(output) == len(expectedOutput) and all(_sameOutput(value, expectedValue) for value, expectedValue in zip(output, expectedOutput))
+  return np.array_equal(np.asarray(output), np.asarray(expectedOutput), equal_nan=True)
+
+
+def test_parallel_workers_track_the_wells_as_the_sequential_tracking(aviVideo, videoFrames, monkeypatch):
+  wellPositions = [{'topLeftX': x, 'topLeftY': y, 'lengthX': 24, 'lengthY': 16} for y in [0, 16] for x in [0, 24]]
+  background = np.full(videoFrames.shape[1:], 255, np.uint8)
+  def hyperparameters(nbWorkers):
+    return getHyperparametersSimple({"firstFrame": 0, "lastFrame": len(videoFrames) - 1, "nbWells": 4, "nbAnimalsPerWell": 1, "trackTail": 0, "headSize": 5, "minPixelDiffForBackExtract": 20, "freqAlgoPosFollow": 0, "fasterMultiprocessingNbWorkers": nbWorkers})
+  nbWorkersUsed = []
+  trackWellsWithParallelWorkers = fasterMultiprocessing.trackWellsWithParallelWorkers
+  def recordingTrackWellsWithParallelWorkers(videoPath, background, wellPositions, hyperparameters, wellNumbers, nbWorkers):
+    nbWorkersUsed.append(nbWorkers)
+    return trackWellsWithParallelWorkers(videoPath, background, wellPositions, hyperparameters, wellNumbers, nbWorkers)
+  monkeypatch.setattr(fasterMultiprocessing, 'trackWellsWithParallelWorkers', recordingTrackWellsWithParallelWorkers)
+  expectedOutput = fasterMultiprocessing.fasterMultiprocessing(aviVideo, background, wellPositions, [], hyperparameters(1), 'video')
+  output = fasterMultiprocessing.fasterMultiprocessing(aviVideo, background, wellPositions, [], hyperparameters(2), 'video')
+  assert nbWorkersUsed == [2]
+  assert [wellNumber for wellNumber, parameters, unused in output] == [0, 1, 2, 3]
+  assert _sameOutput(output, expectedOutput)
@@ -0,0 +1,96 @@
+import math
+
+import cv2
+import numpy as np
+
+import pytest
+
+from zebrazoom.code.getHyperparameters import getHyperparametersSimple
+from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.tailTrackingExtremityDetectFolder.findBodyContour import getDifferenceWithBackground, findMinPixelDiffForBackExtractByBisection
+
+
+def _referenceForeground(hyperparameters, initialCurFrame, back, minPixelDiffForBackExtract):
+  # The pixels close enough to the background are put to white before thresholding the frame
+  curFrame = initialCurFrame.copy()
+  putToWhite = ( curFrame.astype('int32') >= (back.astype('int32') - minPixelDiffForBackExtract) )
+  curFrame[putToWhite] = 255
+  ret, thresh1_b = cv2.threshold(curFrame, hyperparameters["thresholdForBlobImg"], 255, cv2.THRESH_BINARY)
+  return 255 - thresh1_b
+
+
+def _referenceBodyArea(hyperparameters, initialCurFrame, back, x, y, minPixelDiffForBackExtract, contourPrecision):
+  thresh1_b = _referenceForeground(hyperparameters, initialCurFrame, back, minPixelDiffForBackExtract)
+  bodyContour = 0
+  contours, hierarchy = cv2.findContours(thresh1_b, cv2.RETR_TREE, contourPrecision)
+  for contour in contours:
+    if cv2.pointPolygonTest(contour, (x, y), True) >= 0 and cv2.moments(contour)['m00']:
+      bodyContour = contour
+  return cv2.contourArea(bodyContour) if not(type(bodyContour) == int) else -100000000
+
+
+def _referenceSearch(hyperparameters, initialCurFrame, back, x, y, nbBlackPixelsMax, minPixelDiffForBackExtract, contourPrecision):
+  # The threshold is moved by one at each try, towards the body area nbBlackPixelsMax
+  minPixel2nbBlackPixels = {}
+  countTries = 0
+  previousNbBlackPixels = []
+  while (minPixelDiffForBackExtract > 0) and (countTries < 30) and not(minPixelDiffForBackExtract in minPixel2nbBlackPixels):
+    nbBlackPixels = _referenceBodyArea(hyperparameters, initialCurFrame, back, x, y, minPixelDiffForBackExtract, contourPrecision)
+    minPixel2nbBlackPixels[minPixelDiffForBackExtract] = nbBlackPixels
+    if nbBlackPixels > nbBlackPixelsMax:
+      minPixelDiffForBackExtract = minPixelDiffForBackExtract + 1
+    else:
+      minPixelDiffForBackExtract = minPixelDiffForBackExtract - 1
+    countTries = countTries + 1
+    previousNbBlackPixels.append(nbBlackPixels)
+    if len(previousNbBlackPixels) >= 3 and previousNbBlackPixels[-3:].count(previousNbBlackPixels[-1]) == 3:
+      countTries = 1000000
+  best_minPixelDiffForBackExtract = 0
+  minDist = 10000000000000
+  for minPixelDiffForBackExtract in minPixel2nbBlackPixels:
+    dist = abs(minPixel2nbBlackPixels[minPixelDiffForBackExtract] - nbBlackPixelsMax)
+    if dist < minDist:
+      minDist = dist
+      best_minPixelDiffForBackExtract = minPixelDiffForBackExtract
+  return [best_minPixelDiffForBackExtract, minPixel2nbBlackPixels]
+
+
+def _fishFrame(seed):
+  # Body getting lighter from its head (at (22, 30)) to its tail, on a noisy background: the body area decreases at each threshold increase
+  rng = np.random.default_rng(seed)
+  back = np.full((60, 200), 200, np.uint8)
+  frame = cv2.subtract(back, rng.integers(0, 6, back.shape, dtype=np.uint8))
+  bodyHalfWidth = int(rng.integers(2, 5))
+  headIntensity = int(rng.integers(20, 50))
+  for i in range(0, 150):
+    frame[30-bodyHalfWidth:30+bodyHalfWidth+1, 20+i] = headIntensity + i
+  return [frame, back]
+
+
+@pytest.mark.parametrize('seed', range(0, 4))
+@pytest.mark.parametrize('thresholdForBlobImg', [255, 150, 100])
+def test_foreground_matches_the_put_to_white_and_threshold_path(seed, thresholdForBlobImg):
+  [frame, back] = _fishFrame(seed)
+  hyperparameters = getHyperparametersSimple({"thresholdForBlobImg": thresholdForBlobImg})
+  diff = getDifferenceWithBackground(hyperparameters, frame, back)
+  for minPixelDiffForBackExtract in range(0, 256):
+    assert np.array_equal((diff > minPixelDiffForBackExtract).astype(np.uint8) * 255, _referenceForeground(hyperparameters, frame, back, minPixelDiffForBackExtract))
+
+
+@pytest.mark.parametrize('seed', range(0, 6))
+@pytest.mark.parametrize('nbBlackPixelsMax', [100, 200, 300])
+@pytest.mark.parametrize('initialOffset', [-12, -4, 0, 3, 12])
+@pytest.mark.parametrize('contourPrecision', [cv2.CHAIN_APPROX_SIMPLE, cv2.CHAIN_APPROX_NONE])
+def test_bisection_finds_the_threshold_of_the_step_by_one_search(seed, nbBlackPixelsMax, initialOffset, contourPrecision):
+  [frame, back] = _fishFrame(seed)
+  hyperparameters = getHyperparametersSimple({})
+  # The search starts a few thresholds away from the lowest threshold giving a body area below nbBlackPixelsMax, as when starting from the threshold found on the previous frame
+  crossingThreshold = next(minPixelDiffForBackExtract for minPixelDiffForBackExtract in range(1, 256) if _referenceBodyArea(hyperparameters, frame, back, 22, 30, minPixelDiffForBackExtract, contourPrecision) <= nbBlackPixelsMax)
+  initialMinPixelDiffForBackExtract = crossingThreshold + initialOffset
+  [expectedMinPixelDiffForBackExtract, minPixel2nbBlackPixels] = _referenceSearch(hyperparameters, frame, back, 22, 30, nbBlackPixelsMax, initialMinPixelDiffForBackExtract, contourPrecision)
+  assert crossingThreshold - 1 in minPixel2nbBlackPixels and crossingThreshold in minPixel2nbBlackPixels
+  [minPixelDiffForBackExtract, thresh1, bodyContour] = findMinPixelDiffForBackExtractByBisection(hyperparameters, frame, back, 22, 30, nbBlackPixelsMax, initialMinPixelDiffForBackExtract, contourPrecision)
+  # Thresholds giving body areas as close to nbBlackPixelsMax are equally good
+  if minPixelDiffForBackExtract != expectedMinPixelDiffForBackExtract:
+    assert abs(minPixel2nbBlackPixels[minPixelDiffForBackExtract] - nbBlackPixelsMax) == abs(minPixel2nbBlackPixels[expectedMinPixelDiffForBackExtract] - nbBlackPixelsMax)
+  assert np.array_equal(thresh1, _referenceForeground(hyperparameters, frame, back, minPixelDiffForBackExtract))
+  assert cv2.contourArea(bodyContour) == minPixel2nbBlackPixels[minPixelDiffForBackExtract]
@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+
+import pytest
+
+from zebrazoom.code.getBackground import getBackground
+from zebrazoom.code.getHyperparameters import getHyperparametersSimple
+
+
+def _referenceBackground(videoPath, hyperparameters, firstFrame, lastFrame, backCalculationStep):
+  # Each sampled frame is read after seeking to it, in one pass for the background and in another one for the check that movement occurs in the video
+  cap = cv2.VideoCapture(videoPath)
+  def readFrame(k):
+    cap.set(1, k)
+    ret, frame = cap.read()
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+  ret, back = cap.read()
+  back = cv2.cvtColor(back, cv2.COLOR_BGR2GRAY)
+  samplesFramesNumbers = [k for k in range(firstFrame, lastFrame) if k % backCalculationStep == 0]
+  if hyperparameters["backgroundExtractionWithOnlyTwoFrames"] == 0:
+    for k in samplesFramesNumbers:
+      back = cv2.max(readFrame(k), back) if hyperparameters["extractBackWhiteBackground"] else cv2.min(readFrame(k), back)
+  else:
+    maxDiff    = 0
+    indMaxDiff = firstFrame
+    for k in samplesFramesNumbers:
+      diff = np.sum(np.abs(readFrame(k) - back))
+      if diff > maxDiff:
+        maxDiff    = diff
+        indMaxDiff = k
+    back = cv2.max(readFrame(indMaxDiff), back) if hyperparameters["extractBackWhiteBackground"] else cv2.min(readFrame(indMaxDiff), back)
+  def removeBackground(frame):
+    frame[frame.astype('int32') >= (back.astype('int32') - hyperparameters["minPixelDiffForBackExtract"])] = 255
+    return frame
+  firstImage = removeBackground(readFrame(firstFrame))
+  maxDiff = 0
+  for k in samplesFramesNumbers:
+    diff = np.abs(removeBackground(readFrame(k)) - firstImage)
+    if hyperparameters["checkThatMovementOccurInVideoMedianFilterWindow"]:
+      diff = cv2.medianBlur(diff, hyperparameters["checkThatMovementOccurInVideoMedianFilterWindow"])
+    maxDiff = max(maxDiff, np.sum(diff))
+  cap.release()
+  return [back, maxDiff]
+
+
+@pytest.mark.parametrize('extractBackWhiteBackground', [0, 1])
+@pytest.mark.parametrize('backgroundExtractionWithOnlyTwoFrames', [0, 1])
+@pytest.mark.parametrize('firstFrame, backCalculationStep', [(1, 1), (2, 3), (1, 2)])
+@pytest.mark.parametrize('checkThatMovementOccurInVideoMedianFilterWindow', [0, 3])
+def test_getBackground_matches_the_frame_by_frame_extraction(aviVideo, extractBackWhiteBackground, backgroundExtractionWithOnlyTwoFrames, firstFrame, backCalculationStep, checkThatMovementOccurInVideoMedianFilterWindow):
+  config = {"firstFrameForBackExtract": firstFrame, "lastFrameForBackExtract": 11, "backCalculationStep": backCalculationStep, "extractBackWhiteBackground": extractBackWhiteBackground, "backgroundExtractionWithOnlyTwoFrames": backgroundExtractionWithOnlyTwoFrames, "minPixelDiffForBackExtract": 20, "checkThatMovementOccurInVideoMedianFilterWindow": checkThatMovementOccurInVideoMedianFilterWindow}
+  [expectedBack, maxDiff] = _referenceBackground(aviVideo, getHyperparametersSimple(config), firstFrame, 11, backCalculationStep)
+  assert np.array_equal(getBackground(aviVideo, getHyperparametersSimple(config)), expectedBack)
+  # Movement is found when the maximum difference with the first frame reaches checkThatMovementOccurInVideo, the background being set to 0 otherwise
+  assert np.array_equal(getBackground(aviVideo, getHyperparametersSimple({**config, "checkThatMovementOccurInVideo": maxDiff})), expectedBack)
+  assert not np.any(getBackground(aviVideo, getHyperparametersSimple({**config, "checkThatMovementOccurInVideo": maxDiff + 1})))
+
+
+def test_getBackground_reads_the_samples_once(aviVideo, monkeypatch):
+  import zebrazoom.videoFormatConversion.zzVideoReading as zzVideoReading
+  framesRead = []
+  readFramesInIncreasingOrder = zzVideoReading.readFramesInIncreasingOrder
+  def recordingReadFramesInIncreasingOrder(cap, framesNumbers, maxNbFramesGrabbedInsteadOfSeeking):
+    for k, ret, frame in readFramesInIncreasingOrder(cap, framesNumbers, maxNbFramesGrabbedInsteadOfSeeking):
+      framesRead.append(k)
+      yield [k, ret, frame]
+  monkeypatch.setattr(zzVideoReading, 'readFramesInIncreasingOrder', recordingReadFramesInIncreasingOrder)
+  getBackground(aviVideo, getHyperparametersSimple({"firstFrameForBackExtract": 1, "lastFrameForBackExtract": 11, "backCalculationStep": 2, "checkThatMovementOccurInVideo": 1}))
+  assert framesRead == [2, 4, 6, 8, 10]
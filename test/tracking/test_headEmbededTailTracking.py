@@ -0,0 +1,87 @@
+import math
+
+import cv2
+import numpy as np
+
+import pytest
+
+from zebrazoom.code.getHyperparameters import getHyperparametersSimple
+from zebrazoom.code.trackingFolder.trackingFunctions import calculateAngle, distBetweenThetas, assignValueIfBetweenRange
+from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.headEmbededTailTracking import findNextPoints, appendPoint
+
+
+def _referenceFindNextPoints(depth, x, y, frame, points, angle, maxDepth, steps, nbList, hyperparameters, dontChooseThisPoint=[], maxRadiusForDontChoosePoint=0):
+  # Recursive implementation, the candidate points being evaluated one by one
+  lenX = len(frame[0]) - 1
+  lenY = len(frame) - 1
+  thetaDiffAccept = 1
+  if depth < hyperparameters["initialTailPortionMaxSegmentDiffAngleCutOffPos"] * maxDepth:
+    thetaDiffAccept = hyperparameters["initialTailPortionMaxSegmentDiffAngleValue"]
+  if depth > 0.85*maxDepth:
+    thetaDiffAccept = 0.6
+  if hyperparameters["headEmbededMaxAngleBetweenSubsequentSegments"]:
+    thetaDiffAccept = hyperparameters["headEmbededMaxAngleBetweenSubsequentSegments"]
+  pixTotMax = 1000000
+  l = [i*(math.pi/nbList) for i in range(0,2*nbList) if distBetweenThetas(i*(math.pi/nbList), angle) < thetaDiffAccept]
+  for step in steps:
+    if (step < maxDepth - depth) or (step == steps[0]):
+      for theta in l:
+        xNew = assignValueIfBetweenRange(int(x + step * (math.cos(theta))), 0, lenX)
+        yNew = assignValueIfBetweenRange(int(y + step * (math.sin(theta))), 0, lenY)
+        pixTot = frame[yNew][xNew]
+        if (pixTot < pixTotMax):
+          dist = 1000000000000000000
+          for num in range(0, len(dontChooseThisPoint[0]) if len(dontChooseThisPoint) else 0):
+            dist = min(dist, math.sqrt((xNew - dontChooseThisPoint[0, num])**2 + (yNew - dontChooseThisPoint[1, num])**2))
+          if (not(dist <= maxRadiusForDontChoosePoint)):
+            pixTotMax = pixTot
+            xTot = xNew
+            yTot = yNew
+  pixSur = np.min(frame[max(yTot - 4, 0):min(yTot + 4, len(frame)), max(xTot - 4, 0):min(xTot + 4, len(frame[0]))])
+  distSubsquentPoints = math.sqrt((xTot - x)**2 + (yTot - y)**2)
+  keepDescending = depth + distSubsquentPoints < maxDepth and ((pixSur < hyperparameters["headEmbededParamTailDescentPixThreshStop"]) or (depth < hyperparameters["authorizedRelativeLengthTailEnd"]*maxDepth))
+  if not(keepDescending):
+    xTot = int(x + (maxDepth / (depth + distSubsquentPoints)) * (xTot - x))
+    yTot = int(y + (maxDepth / (depth + distSubsquentPoints)) * (yTot - y))
+  points = appendPoint(xTot, yTot, points)
+  newTheta = calculateAngle(x,y,xTot,yTot)
+  if distSubsquentPoints > 0 and keepDescending:
+    (points,nop) = _referenceFindNextPoints(depth+distSubsquentPoints,xTot,yTot,frame,points,newTheta,maxDepth,steps,nbList,hyperparameters)
+  if depth == 0:
+    lenPoints = len(points[0]) - 1
+    if points[0, lenPoints-1] == points[0, lenPoints] and points[1, lenPoints-1] == points[1, lenPoints]:
+      points = points[:, :len(points[0])-1]
+  return (points,newTheta)
+
+
+def _headEmbeddedTail(seed):
+  # Dark tail, randomly bent and getting lighter towards its tip, starting at (30, 75) on a bright background
+  rng = np.random.default_rng(seed)
+  frame = np.full((150, 200), 230, dtype=np.uint8)
+  [x, y] = [30., 75.]
+  theta = rng.uniform(-0.3, 0.3)
+  for segment in range(0, 10):
+    theta += rng.uniform(-0.4, 0.4)
+    [xNew, yNew] = [x + 12 * math.cos(theta), y + 12 * math.sin(theta)]
+    cv2.line(frame, (int(x), int(y)), (int(xNew), int(yNew)), 20 + 15 * segment, 5)
+    [x, y] = [xNew, yNew]
+  return cv2.add(frame, rng.integers(0, 10, frame.shape, dtype=np.uint8))
+
+
+@pytest.mark.parametrize('seed', range(0, 6))
+@pytest.mark.parametrize('nbList, steps, maxDepth', [(10, [10], 100), (20, [6, 9], 120), (15, [12, 4], 80)])
+@pytest.mark.parametrize('headEmbededMaxAngleBetweenSubsequentSegments', [0, 0.5])
+def test_findNextPoints_matches_the_recursive_implementation(seed, nbList, steps, maxDepth, headEmbededMaxAngleBetweenSubsequentSegments):
+  frame = _headEmbeddedTail(seed)
+  hyperparameters = getHyperparametersSimple({"headEmbededMaxAngleBetweenSubsequentSegments": headEmbededMaxAngleBetweenSubsequentSegments})
+  (points, firstTheta) = findNextPoints(0, 30, 75, frame, np.zeros((2, 0)), 0, maxDepth, steps, nbList, frame, 0, hyperparameters)
+  (referencePoints, referenceFirstTheta) = _referenceFindNextPoints(0, 30, 75, frame, np.zeros((2, 0)), 0, maxDepth, steps, nbList, hyperparameters)
+  assert len(referencePoints[0]) > 3
+  assert np.array_equal(points, referencePoints)
+  assert firstTheta == referenceFirstTheta
+  # The first point being prevented from being close to the points found
+  for maxRadiusForDontChoosePoint in [0, 2]:
+    (points, firstTheta) = findNextPoints(0, 30, 75, frame, np.zeros((2, 0)), 0, maxDepth, steps, nbList, frame, 0, hyperparameters, referencePoints[:, :2], maxRadiusForDontChoosePoint)
+    (expectedPoints, expectedFirstTheta) = _referenceFindNextPoints(0, 30, 75, frame, np.zeros((2, 0)), 0, maxDepth, steps, nbList, hyperparameters, referencePoints[:, :2], maxRadiusForDontChoosePoint)
+    assert np.array_equal(points, expectedPoints)
+    assert firstTheta == expectedFirstTheta
@@ -0,0 +1,77 @@
+import itertools
+
+import numpy as np
+
+import pytest
+
+from zebrazoom.code.trackingFolder.refactoredCode2022.identitiesLinkage import linkPositions, linkTrackletsOverSlidingWindow
+
+
+def _referenceLinksCost(previousPositions, currentPositions, maxDistance):
+  # Tries all the possible assignments: the number of links is maximized first, then their total length is minimized
+  best = (0, 0)
+  for currentIds in itertools.permutations(list(range(0, len(currentPositions))) + [-1] * len(previousPositions), len(previousPositions)):
+    lengths = [np.linalg.norm(previousPositions[previousId] - currentPositions[currentId]) for previousId, currentId in enumerate(currentIds) if currentId != -1]
+    if all(not(np.isnan(length)) and (not(maxDistance) or length <= maxDistance) for length in lengths):
+      best = min(best, (-len(lengths), sum(lengths)))
+  return best
+
+
+@pytest.mark.parametrize('seed', range(0, 30))
+def test_linkPositions_finds_the_optimal_links(seed):
+  rng = np.random.default_rng(seed)
+  previousPositions = rng.uniform(0, 100, (rng.integers(1, 5), 2))
+  currentPositions  = rng.uniform(0, 100, (rng.integers(1, 5), 2))
+  previousPositions[rng.uniform(size=len(previousPositions)) < 0.2] = np.nan
+  currentPositions[rng.uniform(size=len(currentPositions)) < 0.2] = np.nan
+  maxDistance = [0, 40][seed % 2]
+  links = linkPositions(previousPositions, currentPositions, maxDistance)
+  linked = links != -1
+  assert len(np.unique(links[linked])) == np.count_nonzero(linked)
+  lengths = np.linalg.norm(previousPositions[linked] - currentPositions[links[linked]], axis=1)
+  assert not(np.any(np.isnan(lengths))) and (not(maxDistance) or np.all(lengths <= maxDistance))
+  [minusNbLinks, totalLength] = _referenceLinksCost(previousPositions, currentPositions, maxDistance)
+  assert np.count_nonzero(linked) == -minusNbLinks
+  assert np.isclose(np.sum(lengths), totalLength)
+
+
+def test_linkPositions_allowed_links():
+  previousPositions = np.array([[0., 0.], [10., 0.]])
+  currentPositions  = np.array([[1., 0.], [11., 0.]])
+  assert list(linkPositions(previousPositions, currentPositions)) == [0, 1]
+  assert list(linkPositions(previousPositions, currentPositions, allowedLinks=np.array([[False, True], [True, False]]))) == [1, 0]
+  assert list(linkPositions(previousPositions, currentPositions, allowedLinks=np.array([[False, False], [True, False]]))) == [-1, 0]
+
+
+def _trackletsFixture():
+  # Animal 0 is lost on frames 4 and 5, and found again on frame 6 under the id 1 (not detected before), next to where it was lost; animal 2 is always detected far away
+  nbFrames = 10
+  trackingHeadTailAllAnimals = np.zeros((3, nbFrames, 2, 2))
+  trackingHeadTailAllAnimals[0, :4, 0] = [[10 + frame, 10] for frame in range(0, 4)]
+  trackingHeadTailAllAnimals[1, 6:, 0] = [[10 + frame, 11] for frame in range(6, nbFrames)]
+  trackingHeadTailAllAnimals[2, :, 0]  = [[80, 80 + frame] for frame in range(0, nbFrames)]
+  trackingHeadTailAllAnimals[:, :, 1] = trackingHeadTailAllAnimals[:, :, 0] + 5
+  trackingHeadingAllAnimals = np.arange(3 * nbFrames, dtype=float).reshape((3, nbFrames))
+  trackingEyesAllAnimals = [np.arange(nbFrames * 2).reshape((nbFrames, 2)) + 100 * animalId for animalId in range(0, 3)]
+  return [trackingHeadTailAllAnimals, trackingHeadingAllAnimals, trackingEyesAllAnimals]
+
+
+def test_linkTrackletsOverSlidingWindow_links_the_tracklets():
+  [trackingHeadTailAllAnimals, trackingHeadingAllAnimals, trackingEyesAllAnimals] = _trackletsFixture()
+  [expectedHeadTail, expectedHeading, expectedEyes] = _trackletsFixture()
+  linkTrackletsOverSlidingWindow(trackingHeadTailAllAnimals, [trackingHeadingAllAnimals, trackingEyesAllAnimals], {"identitiesLinkageSlidingWindow": 3, "identitiesLinkageMaxDistance": 10})
+  for [trackingData, expectedData] in [[trackingHeadTailAllAnimals, expectedHeadTail], [trackingHeadingAllAnimals, expectedHeading], [trackingEyesAllAnimals, expectedEyes]]:
+    assert np.array_equal(trackingData[0][:6], expectedData[0][:6]) and np.array_equal(trackingData[0][6:], expectedData[1][6:])
+    assert np.array_equal(trackingData[1][:6], expectedData[1][:6]) and np.array_equal(trackingData[1][6:], expectedData[0][6:])
+    assert np.array_equal(trackingData[2], expectedData[2])
+
+
+@pytest.mark.parametrize('windowSize, maxDistance', [(1, 10), (3, 2)])
+def test_linkTrackletsOverSlidingWindow_leaves_distant_tracklets(windowSize, maxDistance):
+  # The animal is lost for too long, or found too far away
+  [trackingHeadTailAllAnimals, trackingHeadingAllAnimals, trackingEyesAllAnimals] = _trackletsFixture()
+  [expectedHeadTail, expectedHeading, expectedEyes] = _trackletsFixture()
+  linkTrackletsOverSlidingWindow(trackingHeadTailAllAnimals, [trackingHeadingAllAnimals, trackingEyesAllAnimals], {"identitiesLinkageSlidingWindow": windowSize, "identitiesLinkageMaxDistance": maxDistance})
+  assert np.array_equal(trackingHeadTailAllAnimals, expectedHeadTail)
+  assert np.array_equal(trackingHeadingAllAnimals, expectedHeading)
+  assert np.array_equal(trackingEyesAllAnimals, expectedEyes)
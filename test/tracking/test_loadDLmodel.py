@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+from zebrazoom.code.getHyperparameters import getHyperparametersSimple
+
+
+@pytest.mark.parametrize('quantize', [0, 1])
+def test_model_exported_for_cpu(tmp_path, quantize):
+  torch = pytest.importorskip('torch')
+  pytest.importorskip('torchvision')
+  from zebrazoom.code.deepLearningFunctions.loadDLmodel import get_instance_segmentation_model, loadDLmodel, loadExportedDLmodel, getCpuExportedDLmodelPath
+
+  if torch.cuda.is_available():
+    pytest.skip('the model is only exported for inference on CPU')
+  
+  torch.manual_seed(0)
+  pathToSavedModel = str(tmp_path / 'model.pth')
+  torch.save(get_instance_segmentation_model(2, pretrained=False).state_dict(), pathToSavedModel)
+  hyperparameters = getHyperparametersSimple({"trackingDLCpuExport": 1, "trackingDLCpuExportQuantize": quantize})
+  
+  exportedModelPath = loadDLmodel(pathToSavedModel, hyperparameters)
+  assert exportedModelPath == getCpuExportedDLmodelPath(pathToSavedModel, quantize)
+  assert os.path.exists(exportedModelPath)
+  # The model exported is reused as long as the weights don't change
+  exportTime = os.path.getmtime(exportedModelPath)
+  assert loadDLmodel(pathToSavedModel, hyperparameters) == exportedModelPath
+  assert os.path.getmtime(exportedModelPath) == exportTime
+  
+  exportedModel = loadExportedDLmodel(exportedModelPath)
+  eagerModel = loadDLmodel(pathToSavedModel)
+  images = [torch.rand(3, 64, 80, generator=torch.Generator().manual_seed(seed)) for seed in range(0, 2)]
+  with torch.no_grad():
+    losses, predictions = exportedModel(images)
+    expectedPredictions = eagerModel(images)
+  assert len(predictions) == len(expectedPredictions) == len(images)
+  for prediction, expectedPrediction in zip(predictions, expectedPredictions):
+    assert prediction.keys() == expectedPrediction.keys()
+    assert prediction['masks'].shape[1:] == (1, 64, 80)
+    if not(quantize):
+      for key in expectedPrediction:
+        assert torch.allclose(prediction[key].float(), expectedPrediction[key].float(), atol=1e-4)
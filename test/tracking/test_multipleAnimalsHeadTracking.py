@@ -0,0 +1,29 @@
+import cv2
+import numpy as np
+
+import pytest
+
+from zebrazoom.code.trackingFolder.headTrackingHeadingCalculationFolder.multipleAnimalsHeadTracking import findCenterByIterativelyDilating, findCenterByDistanceTransform
+
+
+def _animalContour(seed, lenX, lenY):
+  # Contour of a random elongated blob, sometimes touching the borders of the image
+  rng = np.random.default_rng(seed)
+  image = np.zeros((lenY, lenX), dtype=np.uint8)
+  [x, y] = rng.integers(0, [lenX, lenY])
+  for i in range(0, 4):
+    [xNew, yNew] = [x, y] + rng.integers(-12, 13, 2)
+    cv2.line(image, (int(x), int(y)), (int(xNew), int(yNew)), 255, int(rng.integers(2, 9)))
+    [x, y] = [xNew, yNew]
+  contours, hierarchy = cv2.findContours(image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+  return max(contours, key=cv2.contourArea)
+
+
+@pytest.mark.parametrize('seed', range(0, 40))
+def test_findCenterByDistanceTransform_matches_the_iterative_dilations(seed):
+  contour = _animalContour(seed, 50, 40)
+  assert findCenterByDistanceTransform(contour, 50, 40) == findCenterByIterativelyDilating(contour, 50, 40)
+
+
+def test_findCenterByDistanceTransform_without_contour():
+  assert findCenterByDistanceTransform(0, 50, 40) == [0, 0]
@@ -0,0 +1,75 @@
+import cv2
+import numpy as np
+
+from zebrazoom.code.getHyperparameters import getHyperparametersSimple
+from zebrazoom.code.trackingFolder.refactoredCode2022.plateBlobsDetection import getWellNumberLookup, findAnimalsBlobsInPlate, getBlobContour
+
+
+def _wellPositions(positions, length):
+  return [{'topLeftX': x, 'topLeftY': y, 'lengthX': length, 'lengthY': length} for [x, y] in positions]
+
+
+def test_blobs_are_found_in_their_wells():
+  wellPositions = _wellPositions([[0, 0], [25, 0], [0, 25], [25, 25]], 20)
+  wellNumberLookup = getWellNumberLookup(wellPositions, 50, 50)
+  foreground = np.full((50, 50), 255, np.uint8)
+  cv2.rectangle(foreground, (3, 3), (12, 5), 0, -1)     # well 0
+  cv2.rectangle(foreground, (30, 30), (31, 31), 0, -1)  # well 3, too small
+  cv2.rectangle(foreground, (28, 5), (40, 8), 0, -1)    # well 1
+  cv2.rectangle(foreground, (30, 12), (34, 16), 0, -1)  # well 1, smaller
+  cv2.rectangle(foreground, (5, 28), (10, 33), 0, -1)   # well 2
+  hyperparameters = getHyperparametersSimple({"minAreaBody": 20, "maxAreaBody": 60, "nbAnimalsPerWell": 1})
+  [labels, stats, animalsBlobsPerWell] = findAnimalsBlobsInPlate(foreground, wellNumberLookup, len(wellPositions), hyperparameters)
+  assert [len(wellBlobs) for wellBlobs in animalsBlobsPerWell] == [1, 1, 1, 0]
+  assert stats[animalsBlobsPerWell[1][0], cv2.CC_STAT_AREA] == 13 * 4 # the biggest blob first
+  # Same contour as the hole found by findContours in the image of the well
+  wellImage = cv2.copyMakeBorder(foreground[25:45, 0:20], 2, 2, 2, 2, cv2.BORDER_CONSTANT, value=255)
+  contours, hierarchy = cv2.findContours(wellImage, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE, offset=(-2, -2))
+  [expectedContour] = [contour for contour, contourHierarchy in zip(contours, hierarchy[0]) if contourHierarchy[3] != -1]
+  assert np.array_equal(getBlobContour(labels, stats, animalsBlobsPerWell[2][0], 0, 25), expectedContour)
+
+
+def _wellHoles(foreground, wellPosition):
+  # Holes found by findContours in the image of a well
+  wellImage = foreground[wellPosition['topLeftY']:wellPosition['topLeftY']+wellPosition['lengthY'], wellPosition['topLeftX']:wellPosition['topLeftX']+wellPosition['lengthX']]
+  wellImage = cv2.copyMakeBorder(wellImage, 2, 2, 2, 2, cv2.BORDER_CONSTANT, value=255)
+  contours, hierarchy = cv2.findContours(wellImage, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE, offset=(-2, -2))
+  return [contour for contour, contourHierarchy in zip(contours, hierarchy[0]) if contourHierarchy[3] != -1]
+
+
+def test_blob_spreading_over_touching_wells():
+  # L shaped blob going from well 1 to well 2 through well 0: it is split in one blob per well, as when each well is thresholded separately
+  wellPositions = _wellPositions([[0, 0], [20, 0], [0, 20]], 20)
+  wellNumberLookup = getWellNumberLookup(wellPositions, 40, 40)
+  foreground = np.full((40, 40), 255, np.uint8)
+  cv2.rectangle(foreground, (14, 36), (17, 39), 0, -1)
+  cv2.rectangle(foreground, (16, 16), (17, 39), 0, -1)
+  cv2.rectangle(foreground, (16, 16), (39, 17), 0, -1)
+  cv2.rectangle(foreground, (36, 14), (39, 17), 0, -1)
+  hyperparameters = getHyperparametersSimple({"minAreaBody": 40, "maxAreaBody": 60, "nbAnimalsPerWell": 1})
+  [labels, stats, animalsBlobsPerWell] = findAnimalsBlobsInPlate(foreground, wellNumberLookup, len(wellPositions), hyperparameters)
+  assert [len(wellBlobs) for wellBlobs in animalsBlobsPerWell] == [0, 1, 1] # the piece of the blob in well 0 is too small
+  for wellNumber in [1, 2]:
+    [label] = animalsBlobsPerWell[wellNumber]
+    assert stats[label, cv2.CC_STAT_AREA] == 48
+    [expectedContour] = _wellHoles(foreground, wellPositions[wellNumber])
+    assert np.array_equal(getBlobContour(labels, stats, label, wellPositions[wellNumber]['topLeftX'], wellPositions[wellNumber]['topLeftY']), expectedContour)
+  hyperparameters = getHyperparametersSimple({"minAreaBody": 10, "maxAreaBody": 60, "nbAnimalsPerWell": 1})
+  [labels, stats, animalsBlobsPerWell] = findAnimalsBlobsInPlate(foreground, wellNumberLookup, len(wellPositions), hyperparameters)
+  [label] = animalsBlobsPerWell[0]
+  assert stats[label, cv2.CC_STAT_AREA] == 12
+  [expectedContour] = _wellHoles(foreground, wellPositions[0])
+  assert np.array_equal(getBlobContour(labels, stats, label, 0, 0), expectedContour)
+
+
+def test_blob_split_in_several_pieces_inside_a_well():
+  # U shaped blob leaving well 0 and coming back into it: its two pieces in well 0 are two blobs
+  wellPositions = _wellPositions([[0, 0], [20, 0]], 20)
+  wellNumberLookup = getWellNumberLookup(wellPositions, 20, 40)
+  foreground = np.full((20, 40), 255, np.uint8)
+  cv2.rectangle(foreground, (10, 2), (25, 4), 0, -1)
+  cv2.rectangle(foreground, (23, 2), (25, 12), 0, -1)
+  cv2.rectangle(foreground, (8, 10), (25, 12), 0, -1)
+  hyperparameters = getHyperparametersSimple({"minAreaBody": 20, "maxAreaBody": 60, "nbAnimalsPerWell": 2})
+  [labels, stats, animalsBlobsPerWell] = findAnimalsBlobsInPlate(foreground, wellNumberLookup, len(wellPositions), hyperparameters)
+  assert [list(stats[animalsBlobsPerWell[0], cv2.CC_STAT_AREA]), list(stats[animalsBlobsPerWell[1], cv2.CC_STAT_AREA])] == [[36, 30], [51]]
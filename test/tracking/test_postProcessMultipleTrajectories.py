@@ -0,0 +1,68 @@
+import math
+
+import numpy as np
+
+import pytest
+
+from zebrazoom.code.getHyperparameters import getHyperparametersSimple
+from zebrazoom.code.trackingFolder.postProcessMultipleTrajectories import postProcessMultipleTrajectories
+
+
+def _referencePostProcess(trackingHeadTailAllAnimals, hyperparameters, wellPositions):
+  # Frame by frame implementation of the removal of the points on the borders and of the filling of the gaps, each animal being processed separately
+  maxDistanceAuthorized = hyperparameters["postProcessMaxDistanceAuthorized"]
+  maxDisapearanceFrames = hyperparameters["postProcessMaxDisapearanceFrames"]
+  borderMargin = hyperparameters["postProcessRemovePointsOnBordersMargin"]
+  for animalId, headTail in enumerate(trackingHeadTailAllAnimals):
+    if borderMargin:
+      for frameNumber in range(0, len(headTail)):
+        [xHead, yHead] = headTail[frameNumber][0]
+        if (xHead <= borderMargin) or (yHead <= borderMargin) or (xHead >= wellPositions[animalId]["lengthX"] - borderMargin - 1) or (yHead >= wellPositions[animalId]["lengthY"] - borderMargin - 1):
+          headTail[frameNumber][0] = 0
+    currentlyZero  = False
+    zeroFrameStart = 0
+    for frameNumber in range(0, len(headTail)):
+      [xHead, yHead] = headTail[frameNumber][0]
+      [xHeadPrev, yHeadPrev] = headTail[max(frameNumber - 1, 0)][0]
+      if ((xHead == 0 and yHead == 0) or (math.sqrt((xHead - xHeadPrev)**2 + (yHead - yHeadPrev)**2) > maxDistanceAuthorized)) and (frameNumber != len(headTail) - 1):
+        if not(currentlyZero):
+          zeroFrameStart = frameNumber
+        currentlyZero = True
+      elif currentlyZero:
+        [xHeadStart, yHeadStart] = headTail[zeroFrameStart - 1][0] if zeroFrameStart >= 1 else headTail[frameNumber][0]
+        [xHeadEnd, yHeadEnd] = headTail[frameNumber][0]
+        distance = math.sqrt((xHeadEnd - xHeadStart)**2 + (yHeadEnd - yHeadStart)**2)
+        if (distance < maxDistanceAuthorized) or (frameNumber - zeroFrameStart > maxDisapearanceFrames):
+          currentlyZero = False
+          for frameAtZeroToChange in range(zeroFrameStart, frameNumber):
+            if distance < maxDistanceAuthorized and not((xHeadEnd == 0) and (yHeadEnd == 0)):
+              headTail[frameAtZeroToChange][0] = [xHeadStart + (xHeadEnd - xHeadStart) / (frameNumber - zeroFrameStart) * (frameAtZeroToChange - zeroFrameStart), yHeadStart + (yHeadEnd - yHeadStart) / (frameNumber - zeroFrameStart) * (frameAtZeroToChange - zeroFrameStart)]
+            else:
+              headTail[frameAtZeroToChange][0] = [xHeadStart, yHeadStart]
+  return trackingHeadTailAllAnimals
+
+
+def _trajectories(seed, nbAnimals, nbFrames):
+  # Random walks with undetected frames (head at (0, 0)) and occasional big jumps
+  rng = np.random.default_rng(seed)
+  trackingHeadTailAllAnimals = np.zeros((nbAnimals, nbFrames, 3, 2))
+  trackingHeadTailAllAnimals[:, :, 0] = 50 + np.cumsum(rng.normal(0, 2, (nbAnimals, nbFrames, 2)), axis=1)
+  trackingHeadTailAllAnimals[:, :, 0] += np.cumsum(rng.uniform(size=(nbAnimals, nbFrames, 1)) < 0.03, axis=1) * rng.choice([-30, 30], (nbAnimals, 1, 2))
+  undetected = rng.uniform(size=(nbAnimals, nbFrames)) < rng.uniform(0.05, 0.5)
+  undetected = np.logical_or(undetected, np.roll(undetected, 1, axis=1)) # gaps of several frames
+  trackingHeadTailAllAnimals[undetected, 0] = 0
+  trackingHeadTailAllAnimals[:, :, 1:] = rng.uniform(0, 100, (nbAnimals, nbFrames, 2, 2))
+  return trackingHeadTailAllAnimals
+
+
+@pytest.mark.parametrize('seed', range(0, 20))
+@pytest.mark.parametrize('maxDistanceAuthorized, maxDisapearanceFrames, borderMargin', [(10**45, 100, 0), (8, 5, 0), (15, 2, 3), (5, 30, 0)])
+def test_postProcessMultipleTrajectories_matches_the_frame_by_frame_implementation(seed, maxDistanceAuthorized, maxDisapearanceFrames, borderMargin):
+  trackingHeadTailAllAnimals = _trajectories(seed, 3, 200)
+  trackingHeadingAllAnimals = np.random.default_rng(seed).uniform(0, 2 * math.pi, (3, 200))
+  wellPositions = [{"lengthX": 100, "lengthY": 110} for animalId in range(0, 3)]
+  hyperparameters = getHyperparametersSimple({"postProcessMaxDistanceAuthorized": maxDistanceAuthorized, "postProcessMaxDisapearanceFrames": maxDisapearanceFrames, "postProcessRemovePointsOnBordersMargin": borderMargin})
+  expected = _referencePostProcess(trackingHeadTailAllAnimals.copy(), hyperparameters, wellPositions)
+  [heading, headTail, eyes] = postProcessMultipleTrajectories(trackingHeadingAllAnimals.copy(), trackingHeadTailAllAnimals, 0, None, hyperparameters, wellPositions)
+  assert np.allclose(headTail, expected, rtol=0, atol=1e-9)
+  assert np.array_equal(heading, trackingHeadingAllAnimals)
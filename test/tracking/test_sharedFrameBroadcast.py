@@ -0,0 +1,49 @@
+import multiprocessing as mp
+
+import numpy as np
+
+from zebrazoom.code.getHyperparameters import getHyperparametersSimple
+from zebrazoom.code.sharedFrameBroadcast import SharedFrameBroadcaster
+
+
+def _readAllFrames(sharedFrameReader, framesRead):
+  frames = []
+  while True:
+    ret, frame = sharedFrameReader.read()
+    if not(ret):
+      break
+    frames.append(frame.copy())
+  sharedFrameReader.release()
+  framesRead.put(np.array(frames))
+
+
+def _startConsumers(broadcaster, nbConsumers, framesRead):
+  processes = [mp.Process(target=_readAllFrames, args=(broadcaster.getReader(consumerId), framesRead)) for consumerId in range(0, nbConsumers)]
+  for p in processes:
+    p.start()
+  return processes
+
+
+def test_all_consumers_read_all_frames_in_order(aviVideo, videoFrames):
+  hyperparameters = getHyperparametersSimple({"firstFrame": 2, "lastFrame": len(videoFrames) - 1, "singleDecodeFrameBroadcastNbSlots": 3})
+  broadcaster = SharedFrameBroadcaster(aviVideo, hyperparameters, 3)
+  framesRead = mp.Queue()
+  processes = _startConsumers(broadcaster, 3, framesRead)
+  broadcaster.broadcast(processes)
+  results = [framesRead.get(timeout=30) for p in processes]
+  for p in processes:
+    p.join()
+  for frames in results:
+    assert np.array_equal(frames, videoFrames[2:])
+
+
+def test_broadcast_goes_on_when_a_consumer_stops_early(aviVideo, videoFrames):
+  hyperparameters = getHyperparametersSimple({"firstFrame": 0, "lastFrame": len(videoFrames) - 1, "singleDecodeFrameBroadcastNbSlots": 2})
+  broadcaster = SharedFrameBroadcaster(aviVideo, hyperparameters, 2)
+  broadcaster.getReader(1).release() # as done by a well process which stopped reading
+  framesRead = mp.Queue()
+  p = mp.Process(target=_readAllFrames, args=(broadcaster.getReader(0), framesRead))
+  p.start()
+  broadcaster.broadcast([p, None])
+  assert np.array_equal(framesRead.get(timeout=30), videoFrames)
+  p.join()
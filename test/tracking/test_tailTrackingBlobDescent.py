@@ -0,0 +1,90 @@
+import math
+
+import cv2
+import numpy as np
+
+import pytest
+
+from zebrazoom.code.trackingFolder.trackingFunctions import calculateAngle, distBetweenThetas, assignValueIfBetweenRange
+from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.tailTrackingBlobDescent import findNextPoints, recenterPointAlongOrthogonalTailAxis, checkNewPointNotRedundant, appendPoint
+
+
+def _referenceFindNextPoints(x, y, thresh1, frame, depth, points, lastTheta, nbList, thetaDiffAccept, expDecreaseFactor, step):
+  # Recursive implementation, each ray being followed pixel by pixel
+  thresh1lenX = len(thresh1[0]) - 1
+  thresh1lenY = len(thresh1) - 1
+  maxThetaCorrected = -1
+  if depth >= 25:
+    return (points, maxThetaCorrected)
+  maxTheta = 0
+  ktotMax = 0
+  k1Max = 0
+  k2Max = 0
+  for thetaB in [i*(math.pi/nbList) for i in range(0,2*nbList) if abs(i*(math.pi/nbList)-lastTheta) < thetaDiffAccept]:
+    theta = thetaB % math.pi
+    kMax = []
+    for direction in [1, -1]:
+      pixVal = 1
+      k = 1
+      while pixVal < 150 and k < 100:
+        pixVal = thresh1[assignValueIfBetweenRange(int(y + direction * k * math.sin(theta)), 0, thresh1lenY)][assignValueIfBetweenRange(int(x + direction * k * math.cos(theta)), 0, thresh1lenX)]
+        k = k + 1
+      kMax.append(k - 2)
+    ktot = 0
+    for k in kMax:
+      for i in range(0, k):
+        ktot = ktot + math.exp(-i*expDecreaseFactor)
+    if ktot > ktotMax:
+      ktotMax = ktot
+      [k1Max, k2Max] = kMax
+      maxTheta = theta
+  predictedTetha = maxTheta if depth == 0 else maxTheta + ((maxTheta - lastTheta + 2*math.pi) % (2*math.pi))
+  candidates = []
+  for (direction, kMax) in [(1, k1Max), (-1, k2Max)]:
+    k = min(kMax, step)
+    xNew = assignValueIfBetweenRange(int(x + direction * k * math.cos(maxTheta)), 0, thresh1lenX)
+    yNew = assignValueIfBetweenRange(int(y + direction * k * math.sin(maxTheta)), 0, thresh1lenY)
+    candidates.append(recenterPointAlongOrthogonalTailAxis(xNew, yNew, predictedTetha+(math.pi)/2, frame, thresh1))
+  cv2.circle(frame, (x, y), 1, (255,0,255), -1)
+  if distBetweenThetas(lastTheta, maxTheta) > distBetweenThetas(lastTheta, maxTheta + math.pi):
+    [xNew, yNew] = candidates[1]
+    thetaCorrected = maxTheta + math.pi
+  else:
+    [xNew, yNew] = candidates[0]
+    thetaCorrected = maxTheta
+  cv2.circle(frame, (xNew, yNew), 1, (0,255,0), -1)
+  if checkNewPointNotRedundant(points, xNew, yNew):
+    points = appendPoint(xNew, yNew, points)
+    if (xNew - x)**2 + (yNew - y)**2 > 0:
+      maxThetaCorrected = thetaCorrected
+      (points, nop) = _referenceFindNextPoints(xNew, yNew, thresh1, frame, depth + 1, points, calculateAngle(x, y, xNew, yNew), nbList, thetaDiffAccept, expDecreaseFactor, step)
+  return (points, maxThetaCorrected)
+
+
+def _fishBlob(seed):
+  # Dark fish, with a randomly bent tail getting thinner, on a white background
+  rng = np.random.default_rng(seed)
+  thresh1 = np.full((150, 200), 255, dtype=np.uint8)
+  [x, y] = [40., 75.]
+  theta = rng.uniform(-0.3, 0.3)
+  cv2.circle(thresh1, (int(x), int(y)), 7, 0, -1)
+  for thickness in range(9, 1, -1):
+    theta += rng.uniform(-0.4, 0.4)
+    [xNew, yNew] = [x + 15 * math.cos(theta), y + 15 * math.sin(theta)]
+    cv2.line(thresh1, (int(x), int(y)), (int(xNew), int(yNew)), 0, thickness)
+    [x, y] = [xNew, yNew]
+  return thresh1
+
+
+@pytest.mark.parametrize('seed', range(0, 6))
+@pytest.mark.parametrize('nbList, step, lastTheta', [(10, 10, 0), (20, 6, 0.2), (15, 12, 2 * math.pi)])
+def test_findNextPoints_matches_the_recursive_implementation(seed, nbList, step, lastTheta):
+  thresh1 = _fishBlob(seed)
+  frame = cv2.cvtColor(thresh1, cv2.COLOR_GRAY2BGR)
+  referenceFrame = frame.copy()
+  (points, firstTheta) = findNextPoints(40, 75, thresh1, frame, 0, np.zeros((2, 0)), lastTheta, 0, nbList, 1.2, 0.5, step, 0)
+  (referencePoints, referenceFirstTheta) = _referenceFindNextPoints(40, 75, thresh1, referenceFrame, 0, np.zeros((2, 0)), lastTheta, nbList, 1.2, 0.5, step)
+  assert len(referencePoints[0]) > 3
+  assert np.array_equal(points, referencePoints)
+  assert firstTheta == referenceFirstTheta
+  assert np.array_equal(frame, referenceFrame)
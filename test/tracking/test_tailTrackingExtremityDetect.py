@@ -0,0 +1,240 @@
+import math
+
+import cv2
+import numpy as np
+
+import pytest
+
+from zebrazoom.code.getHyperparameters import getHyperparametersSimple
+from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.tailTrackingExtremityDetectFolder.Rotate import Rotate
+from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.tailTrackingExtremityDetectFolder.resampleSeqConstPtsPerArcLength import resampleSeqConstPtsPerArcLength
+from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.tailTrackingExtremityDetectFolder.getMidline import getMidline
+from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.tailTrackingExtremityDetectFolder.findTheTwoSides import findTheTwoSides
+from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.tailTrackingExtremityDetectFolder.findTailExtremeteFolder.insideTailExtremete import insideTailExtremete
+from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.tailTrackingExtremityDetectFolder.findTailExtremeteFolder.functions import initialiseDistance2
+
+
+# Point by point implementations of the contour kernels
+
+def _referenceRotate(boundary, aaa, bbb, angle):
+  x1 = aaa + 100*math.cos(angle)
+  y1 = bbb + 100*math.sin(angle)
+  x2 = aaa + 100*math.cos(angle + math.pi)
+  y2 = bbb + 100*math.sin(angle + math.pi)
+  min_dist1 = 1000000
+  min_dist2 = 1000000
+  for i in range(0, len(boundary)):
+    Pt = boundary[i][0]
+    min_dist1 = min(min_dist1, (Pt[0] - x1)*(Pt[0] - x1) + (Pt[1] - y1)*(Pt[1] - y1))
+    min_dist2 = min(min_dist2, (Pt[0] - x2)*(Pt[0] - x2) + (Pt[1] - y2)*(Pt[1] - y2))
+  theta = (math.pi/2) - (angle if min_dist1 < min_dist2 else angle + math.pi)
+  alpha = 0
+  for i in range(0, len(boundary)):
+    Pt = boundary[i][0]
+    x = Pt[0] - aaa
+    y = Pt[1] - bbb
+    r = math.sqrt(x*x + y*y)
+    if x > 0:
+      alpha = math.atan(y/x)
+    if x < 0:
+      alpha = math.pi - math.atan(y/-x)
+    if x == 0:
+      alpha = math.pi/2 if y > 0 else -math.pi/2
+    Pt[0] = r*math.cos(theta + alpha) + aaa
+    Pt[1] = r*math.sin(theta + alpha) + bbb + 200
+  return boundary
+
+
+def _referenceResample(OrigBound, numTailPoints):
+  distOrg = np.zeros(len(OrigBound))
+  totDist = 0
+  for i in range(1, len(OrigBound)):
+    totDist = totDist + math.sqrt((OrigBound[i-1][0][0]-OrigBound[i][0][0])**2 + (OrigBound[i-1][0][1]-OrigBound[i][0][1])**2)
+    distOrg[i] = totDist
+  uniDist = np.array([totDist * (i/(numTailPoints-1)) for i in range(0, numTailPoints)])
+  return np.transpose([np.interp(uniDist, distOrg, OrigBound[:, 0, 0]), np.interp(uniDist, distOrg, OrigBound[:, 0, 1])])
+
+
+def _referenceGetMidline(bord1, bord2, MostCurvyIndex, boundary, taille, distance2, hyperparameters):
+  [bord1, bord2] = sorted([bord1, bord2])
+  if distance2[bord2] - distance2[bord1] > (distance2[bord1] - distance2[0]) + (distance2[len(boundary)] - distance2[bord2]):
+    tailRange = list(range(bord1, bord2))
+  else:
+    tailRange = list(range(bord2, len(boundary))) + list(range(0, bord1))
+  tailRangeA = []
+  tailRangeB = []
+  fillSecond = 0
+  for i in tailRange:
+    if i == MostCurvyIndex:
+      fillSecond = 1
+    (tailRangeB if fillSecond else tailRangeA).append(i)
+  OrigBoundA = boundary[tailRangeA]
+  OrigBoundB = boundary[tailRangeB]
+  output = np.zeros((1, 0, 2))
+  if (bord1!=bord2) and (bord1!=MostCurvyIndex) and (bord2!=MostCurvyIndex) and not((bord1==1) and (bord2==1) and (MostCurvyIndex==1)) and (len(OrigBoundA)>1) and (len(OrigBoundB)>1):
+    NBoundA = _referenceResample(OrigBoundA, taille)
+    NBoundB = _referenceResample(OrigBoundB, taille)
+    points = []
+    TotalDist = 0
+    for i in range(1, taille):
+      point = (NBoundB[i % taille] + NBoundA[taille - i]) / 2
+      if i > 1:
+        TotalDist = TotalDist + math.sqrt((point[0]-points[-1][0])**2 + (point[1]-points[-1][1])**2)
+      points.append(point)
+    if hyperparameters["minTailSize"] <= TotalDist <= hyperparameters["maxTailSize"]:
+      output = np.array([points[::-1] + [boundary[MostCurvyIndex][0]]])
+  else:
+    output = np.array([[boundary[MostCurvyIndex][0]] * taille])
+  return output
+
+
+def _referenceInsideTailExtremete(distance, DotProds, extremes, tailRange, boundary):
+  [max_droite, min_gauche, max_bas, min_haut, ind_droite, ind_gauche, ind_bas, ind_haut] = extremes
+  TotalBPts = len(boundary)
+  dist_calculate_curv = int(TotalBPts / 25)
+  if dist_calculate_curv < 3:
+    dist_calculate_curv = 3
+  max = 0
+  for i in tailRange:
+    AheadPt  = boundary[(i + dist_calculate_curv) % TotalBPts][0]
+    Pt       = boundary[i % TotalBPts][0]
+    BehindPt = boundary[(i + TotalBPts - dist_calculate_curv) % TotalBPts][0]
+    DotProds[i] = (AheadPt[0] - Pt[0]) * (Pt[0] - BehindPt[0]) + (AheadPt[1] - Pt[1]) * (Pt[1] - BehindPt[1])
+    [x, y] = Pt
+    if x > max_droite:
+      max_droite = x
+      ind_droite = i
+    if x < min_gauche:
+      min_gauche = x
+      ind_gauche = i
+    if y > max_bas:
+      max_bas = y
+      ind_bas = i
+    if y < min_haut:
+      min_haut = y
+      ind_haut = i
+    max = distance[i]
+  return [max, max_droite, min_gauche, max_bas, min_haut, ind_droite, ind_gauche, ind_bas, ind_haut]
+
+
+def _closestPoints(bodyContour, x, y):
+  # Indexes of the closest and of the second closest points of the contour to (x, y), the first ones being kept in case of equality
+  minDist1 = 1000000000000
+  minDist2 = 1000000000000
+  indMin1  = 0
+  indMin2  = 0
+  for i in range(0, len(bodyContour)):
+    Pt   = bodyContour[i][0]
+    dist = math.sqrt((Pt[0] - x)**2 + (Pt[1] - y)**2)
+    if dist < minDist1:
+      [minDist2, indMin2] = [minDist1, indMin1]
+      [minDist1, indMin1] = [dist, i]
+    elif dist < minDist2:
+      [minDist2, indMin2] = [dist, i]
+  return [indMin1, indMin2]
+
+
+def _findBorder(headPosition, unitVector, bodyContour, dst):
+  factor = 1
+  headPos = np.array(headPosition)
+  testBorder = (headPos + factor * unitVector).astype(int)
+  while (cv2.pointPolygonTest(bodyContour, (float(testBorder[0]), float(testBorder[1])), True) > 0) and (factor < 100) and (testBorder[0] >= 0) and (testBorder[1] >= 0) and (testBorder[0] < len(dst[0])) and (testBorder[1] < len(dst)):
+    factor = factor + 1
+    testBorder = headPos + factor * unitVector
+  return testBorder
+
+
+def _fishContour(seed):
+  # Contour of a fish: an elliptic head and a bent tail getting thinner
+  rng = np.random.default_rng(seed)
+  image = np.zeros((200, 200), np.uint8)
+  angle = rng.uniform(0, 2 * math.pi)
+  [x, y] = [100., 100.]
+  cv2.ellipse(image, (int(x), int(y)), (9, 6), math.degrees(angle), 0, 360, 255, -1)
+  for thickness in range(7, 1, -1):
+    angle += rng.uniform(-0.4, 0.4)
+    [xNew, yNew] = [x - 10 * math.cos(angle), y - 10 * math.sin(angle)]
+    cv2.line(image, (int(x), int(y)), (int(xNew), int(yNew)), 255, thickness)
+    [x, y] = [xNew, yNew]
+  contours, hierarchy = cv2.findContours(image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+  return [max(contours, key=len), image]
+
+
+@pytest.mark.parametrize('seed', range(0, 10))
+def test_Rotate_matches_the_point_by_point_implementation(seed):
+  [bodyContour, image] = _fishContour(seed)
+  angle = np.random.default_rng(seed).uniform(0, 2 * math.pi)
+  expected = _referenceRotate(bodyContour.copy(), 100, 100, angle)
+  assert np.array_equal(Rotate(bodyContour.copy(), 100, 100, angle, None), expected)
+
+
+@pytest.mark.parametrize('seed', range(0, 10))
+def test_resampleSeqConstPtsPerArcLength_matches_the_point_by_point_implementation(seed):
+  [bodyContour, image] = _fishContour(seed)
+  assert np.array_equal(resampleSeqConstPtsPerArcLength(bodyContour[5:60], 10), _referenceResample(bodyContour[5:60], 10))
+
+
+@pytest.mark.parametrize('seed', range(0, 10))
+@pytest.mark.parametrize('checkAllContour', [0, 1])
+def test_insideTailExtremete_matches_the_point_by_point_implementation(seed, checkAllContour):
+  [bodyContour, image] = _fishContour(seed)
+  distance2 = initialiseDistance2(np.zeros(len(bodyContour) + 1), bodyContour)[1]
+  n = len(bodyContour)
+  tailRange = np.arange(0, n) if checkAllContour else np.concatenate((np.arange(0, n // 5), np.arange(n // 2, n)))
+  extremes = [0, 5000, 0, 5000, 0, 0, 0, 0]
+  DotProds = np.zeros(n)
+  expectedDotProds = np.zeros(n)
+  result = insideTailExtremete(distance2, DotProds, *extremes[:4], *extremes[4:], tailRange, bodyContour, None)
+  assert result == _referenceInsideTailExtremete(distance2, expectedDotProds, extremes, tailRange, bodyContour)
+  assert np.array_equal(DotProds, expectedDotProds)
+
+
+@pytest.mark.parametrize('seed', range(0, 10))
+@pytest.mark.parametrize('minTailSize, maxTailSize', [(3, 60), (3, 1000), (65, 1000)])
+def test_getMidline_matches_the_point_by_point_implementation(seed, minTailSize, maxTailSize):
+  [bodyContour, image] = _fishContour(seed)
+  hyperparameters = getHyperparametersSimple({"minTailSize": minTailSize, "maxTailSize": maxTailSize})
+  distance2 = initialiseDistance2(np.zeros(len(bodyContour) + 1), bodyContour)[1]
+  [bord1, bord2] = findTheTwoSides([100, 100], bodyContour, image, hyperparameters)
+  Pts = bodyContour[:, 0]
+  MostCurvyIndex = int(np.argmax((Pts[:, 0] - 100)**2 + (Pts[:, 1] - 100)**2)) # the tip of the tail
+  for taille in [9, 10]:
+    expected = _referenceGetMidline(int(bord1), int(bord2), MostCurvyIndex, bodyContour, taille, distance2, hyperparameters)
+    assert np.array_equal(getMidline(int(bord1), int(bord2), MostCurvyIndex, bodyContour, image, taille, distance2, 0, hyperparameters, taille), expected)
+
+
+def test_getMidline_tail_length():
+  # The length of the midline of an ellipse is compared to minTailSize: it counts all the segments of the midline
+  image = np.zeros((200, 200), np.uint8)
+  cv2.ellipse(image, (100, 100), (60, 12), 0, 0, 360, 255, -1)
+  contours, hierarchy = cv2.findContours(image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+  boundary = contours[0]
+  distance2 = initialiseDistance2(np.zeros(len(boundary) + 1), boundary)[1]
+  n = len(boundary)
+  MostCurvyIndex = int(np.argmin(boundary[:, 0, 0]))
+  for minTailSize in [20, 70]:
+    hyperparameters = getHyperparametersSimple({"minTailSize": minTailSize, "maxTailSize": 1000})
+    expected = _referenceGetMidline(n // 8, n - n // 8, MostCurvyIndex, boundary, 10, distance2, hyperparameters)
+    assert expected.shape == (1, 10, 2)
+    assert np.array_equal(getMidline(n // 8, n - n // 8, MostCurvyIndex, boundary, image, 10, distance2, 0, hyperparameters, 10), expected)
+
+
+@pytest.mark.parametrize('seed', range(0, 10))
+def test_findTheTwoSides_matches_the_point_by_point_implementation(seed):
+  [bodyContour, image] = _fishContour(seed)
+  headPosition = [100, 100]
+  [indMin1, indMin2] = findTheTwoSides(headPosition, bodyContour, image, getHyperparametersSimple({}))
+  PtClosest = bodyContour[_closestPoints(bodyContour, *headPosition)[0]][0]
+  unitVector = np.array([headPosition[0] - PtClosest[0], headPosition[1] - PtClosest[1]])
+  unitVector = unitVector / math.sqrt(unitVector[0]**2 + unitVector[1]**2)
+  testBorder = _findBorder(headPosition, unitVector.astype(int), bodyContour, image)
+  assert [indMin1, indMin2] == [_closestPoints(bodyContour, *headPosition)[0], _closestPoints(bodyContour, testBorder[0], testBorder[1])[0]]
+
+
+@pytest.mark.parametrize('seed', range(0, 10))
+def test_findTheTwoSides_of_the_mouth_matches_the_point_by_point_implementation(seed):
+  [bodyContour, image] = _fishContour(seed)
+  headPosition = [100, 100]
+  [indMin1, indMin2, mouthAngle] = findTheTwoSides(headPosition, bodyContour, image, getHyperparametersSimple({"detectMouthInsteadOfHeadTwoSides": 1}))
+  testBorder = _findBorder(headPosition, np.array([math.cos(mouthAngle), math.sin(mouthAngle)]), bodyContour, image)
+  assert [indMin1, indMin2] == _closestPoints(bodyContour, testBorder[0], testBorder[1])
@@ -0,0 +1,88 @@
+import numpy as np
+
+import pytest
+
+from zebrazoom.code.trackingFolder.temporalChunksTracking import getTemporalChunks, findAnimalIdsCorrespondanceWithPreviousChunk
+
+
+@pytest.mark.parametrize('firstFrame, lastFrame', [(0, 99), (5, 57), (10, 10), (3, 12)])
+@pytest.mark.parametrize('nbChunks', [1, 3, 8])
+@pytest.mark.parametrize('nbWarmUpFrames', [0, 1, 4])
+def test_getTemporalChunks_cover_the_frames(firstFrame, lastFrame, nbChunks, nbWarmUpFrames):
+  chunks = getTemporalChunks(firstFrame, lastFrame, nbChunks, nbWarmUpFrames)
+  assert 1 <= len(chunks) <= nbChunks
+  # The frames kept are consecutive, each frame being kept by exactly one chunk
+  assert chunks[0][0] == chunks[0][1] == firstFrame
+  assert chunks[-1][2] == lastFrame
+  for [warmUpFirstFrame, chunkFirstFrame, chunkLastFrame], nextChunk in zip(chunks, chunks[1:] + [None]):
+    assert chunkFirstFrame <= chunkLastFrame
+    if nextChunk is not None:
+      assert nextChunk[1] == chunkLastFrame + 1
+  # The warm up frames are the frames kept by the previous chunk just before the chunk
+  for [warmUpFirstFrame, chunkFirstFrame, chunkLastFrame] in chunks[1:]:
+    assert warmUpFirstFrame == chunkFirstFrame - nbWarmUpFrames
+  # A chunk is never shorter than its warm up
+  for [warmUpFirstFrame, chunkFirstFrame, chunkLastFrame] in chunks[:-1]:
+    assert chunkLastFrame - chunkFirstFrame + 1 >= nbWarmUpFrames
+
+
+def test_getTemporalChunks_sizes():
+  assert getTemporalChunks(0, 99, 4, 5) == [[0, 0, 24], [20, 25, 49], [45, 50, 74], [70, 75, 99]]
+  assert getTemporalChunks(0, 9, 4, 5) == [[0, 0, 4], [0, 5, 9]]
+  assert getTemporalChunks(0, 9, 4, 20) == [[0, 0, 9]]
+
+
+def _trajectories(seed, nbAnimals, nbFrames):
+  # Animals far apart moving slowly
+  rng = np.random.default_rng(seed)
+  starts = np.array([[50 + 100 * animalId, 50 + 40 * (animalId % 2)] for animalId in range(0, nbAnimals)], dtype=float)
+  steps = rng.uniform(-2, 2, (nbAnimals, nbFrames, 2))
+  trackingHeadTail = np.zeros((nbAnimals, nbFrames, 3, 2))
+  trackingHeadTail[:, :, 0] = starts[:, np.newaxis] + np.cumsum(steps, axis=1)
+  return trackingHeadTail
+
+
+def _joinChunks(trackingHeadTail, permutation, firstFrame, warmUpFirstFrame, chunkFirstFrame):
+  # Previous chunk tracked up to chunkFirstFrame, the next chunk from warmUpFirstFrame with the animals ids permuted
+  trackingHeadTailAllAnimals = np.zeros(trackingHeadTail.shape)
+  trackingHeadTailAllAnimals[:, :chunkFirstFrame-firstFrame] = trackingHeadTail[:, :chunkFirstFrame-firstFrame]
+  chunkTrackingHeadTailAllAnimals = trackingHeadTail[permutation, warmUpFirstFrame-firstFrame:]
+  return [trackingHeadTailAllAnimals, chunkTrackingHeadTailAllAnimals]
+
+
+@pytest.mark.parametrize('seed', range(0, 5))
+@pytest.mark.parametrize('nbAnimals', [2, 4])
+def test_findAnimalIdsCorrespondanceWithPreviousChunk_permuted_ids(seed, nbAnimals):
+  trackingHeadTail = _trajectories(seed, nbAnimals, 30)
+  permutation = np.random.default_rng(seed).permutation(nbAnimals)
+  [trackingHeadTailAllAnimals, chunkTrackingHeadTailAllAnimals] = _joinChunks(trackingHeadTail, permutation, 10, 15, 20)
+  animalIds = findAnimalIdsCorrespondanceWithPreviousChunk(trackingHeadTailAllAnimals, chunkTrackingHeadTailAllAnimals, 10, 15, 20)
+  assert np.array_equal(permutation[animalIds], np.arange(nbAnimals))
+
+
+def test_findAnimalIdsCorrespondanceWithPreviousChunk_missing_animals():
+  # Animals not detected (at (0, 0)) on some of the warm up frames: these frames must not count as positions close to the animal near (0, 0)
+  trackingHeadTail = np.zeros((3, 10, 3, 2))
+  trackingHeadTail[:, :, 0] = [[[10, 8]], [[150, 90]], [[40, 160]]]
+  permutation = np.array([2, 0, 1])
+  [trackingHeadTailAllAnimals, chunkTrackingHeadTailAllAnimals] = _joinChunks(trackingHeadTail, permutation, 0, 5, 10)
+  trackingHeadTailAllAnimals[:, 5:10][np.array([[0, 1, 0, 1, 0], [0, 1, 1, 0, 1], [1, 0, 0, 0, 1]], bool), 0] = 0
+  chunkTrackingHeadTailAllAnimals[:, 0:5][np.array([[0, 0, 0, 1, 1], [0, 1, 0, 0, 0], [1, 1, 0, 1, 0]], bool), 0] = 0
+  animalIds = findAnimalIdsCorrespondanceWithPreviousChunk(trackingHeadTailAllAnimals, chunkTrackingHeadTailAllAnimals, 0, 5, 10)
+  assert np.array_equal(permutation[animalIds], np.arange(3))
+
+
+@pytest.mark.parametrize('seed', range(0, 5))
+def test_findAnimalIdsCorrespondanceWithPreviousChunk_animals_never_detected_together(seed):
+  trackingHeadTail = _trajectories(seed, 3, 30)
+  permutation = np.random.default_rng(seed).permutation(3)
+  [trackingHeadTailAllAnimals, chunkTrackingHeadTailAllAnimals] = _joinChunks(trackingHeadTail, permutation, 10, 15, 20)
+  # Animal 1 is only detected on the first warm up frames by the previous chunk and on the last ones by the next chunk
+  trackingHeadTailAllAnimals[1, 7:10, 0] = 0
+  chunkTrackingHeadTailAllAnimals[np.argmax(permutation == 1), 0:3, 0] = 0
+  animalIds = findAnimalIdsCorrespondanceWithPreviousChunk(trackingHeadTailAllAnimals, chunkTrackingHeadTailAllAnimals, 10, 15, 20)
+  assert np.array_equal(permutation[animalIds], np.arange(3))
+  # Animal 1 not detected at all on the warm up frames by the previous chunk: it takes the remaining id
+  trackingHeadTailAllAnimals[1, 5:10, 0] = 0
+  animalIds = findAnimalIdsCorrespondanceWithPreviousChunk(trackingHeadTailAllAnimals, chunkTrackingHeadTailAllAnimals, 10, 15, 20)
+  assert np.array_equal(permutation[animalIds], np.arange(3))
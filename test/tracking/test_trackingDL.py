@@ -0,0 +1,81 @@
+import cv2
+import numpy as np
+
+import pytest
+
+from zebrazoom.code.getHyperparameters import getHyperparametersSimple
+from zebrazoom.code.deepLearningFunctions.predictedMaskThreshold import getNbPixelsAboveThresholds, dicotomySearchOfOptimalThreshold
+
+
+def _referenceDicotomySearch(thresh, countNonZeroTarget):
+  # Each threshold tried is applied to the mask and its nonzero pixels are counted
+  countNonZero = 0
+  low  = 0
+  high = 255
+  thresh2 = None
+  while abs(countNonZero - countNonZeroTarget) > 100 and (high - low) > 1:
+    thresValueToTry = int((low + high) / 2)
+    ret, thresh2 = cv2.threshold(thresh, thresValueToTry, 255, cv2.THRESH_BINARY)
+    countNonZero = cv2.countNonZero(thresh2)
+    if countNonZero > countNonZeroTarget:
+      low = thresValueToTry
+    else:
+      high = thresValueToTry
+  return thresh2
+
+
+def _predictedMasks(seed, nbMasks):
+  # Blurred blobs, as the masks predicted by the model
+  rng = np.random.default_rng(seed)
+  masks = np.zeros((nbMasks, 60, 80), np.uint8)
+  for mask in masks:
+    cv2.ellipse(mask, (int(rng.integers(20, 60)), int(rng.integers(20, 40))), (int(rng.integers(5, 20)), int(rng.integers(3, 10))), rng.uniform(0, 180), 0, 360, 255, -1)
+    mask[:, :] = cv2.GaussianBlur(mask, (11, 11), 0)
+  return masks
+
+
+@pytest.mark.parametrize('seed', range(0, 5))
+def test_getNbPixelsAboveThresholds_matches_countNonZero(seed):
+  masks = _predictedMasks(seed, 4)
+  nbPixelsAboveThresholds = getNbPixelsAboveThresholds(masks)
+  assert nbPixelsAboveThresholds.shape == (4, 256)
+  for mask, maskNbPixelsAboveThresholds in zip(masks, nbPixelsAboveThresholds):
+    assert list(maskNbPixelsAboveThresholds) == [cv2.countNonZero(cv2.threshold(mask, thresh, 255, cv2.THRESH_BINARY)[1]) for thresh in range(0, 256)]
+
+
+@pytest.mark.parametrize('seed', range(0, 5))
+@pytest.mark.parametrize('countNonZeroTarget', [50, 300, 700, 5000])
+def test_dicotomySearchOfOptimalThreshold_matches_the_threshold_loop(seed, countNonZeroTarget):
+  masks = _predictedMasks(seed, 3)
+  for mask, nbPixelsAboveThresholds in zip(masks, getNbPixelsAboveThresholds(masks)):
+    expectedThresh2 = _referenceDicotomySearch(mask, countNonZeroTarget)
+    thresValue = dicotomySearchOfOptimalThreshold(nbPixelsAboveThresholds, countNonZeroTarget)
+    if expectedThresh2 is None:
+      assert thresValue == -1
+    else:
+      assert np.array_equal(cv2.threshold(mask, thresValue, 255, cv2.THRESH_BINARY)[1], expectedThresh2)
+
+
+def test_trackingDL_batched_forward_pass(aviVideo, videoFrames):
+  torch = pytest.importorskip('torch')
+  from zebrazoom.code.deepLearningFunctions.trackingDL import trackingDL
+
+  imagesSeen = []
+  def model(images):
+    # Stand-in for the instance segmentation model: the mask of each image is its inverted first channel
+    imagesSeen.extend(image.clone() for image in images)
+    return [{'masks': (1 - image[:1]).unsqueeze(0)} for image in images]
+
+  wellPositions = [{'topLeftX': 8, 'topLeftY': 4, 'lengthX': 30, 'lengthY': 24}]
+  outputs = []
+  for trackingDLBatchSize in [1, 5]:
+    imagesSeen.clear()
+    hyperparameters = getHyperparametersSimple({"firstFrame": 0, "lastFrame": len(videoFrames) - 1, "nbAnimalsPerWell": 1, "trackTail": 0, "headSize": 5, "freqAlgoPosFollow": 0, "trackingDLBatchSize": trackingDLBatchSize, "trackingDLdicotomySearchOfOptimalBlobArea": 300})
+    outputs.append(trackingDL(aviVideo, 0, wellPositions, hyperparameters, 'video', model, torch.device('cpu')))
+    # The images given to the model are the crops of the well scaled to [0, 1] on 3 channels, as when each frame was converted on its own
+    assert len(imagesSeen) == len(videoFrames)
+    for image, frame in zip(imagesSeen, videoFrames):
+      oneChannel = [[a/255 for a in row] for row in frame[4:28, 8:38].tolist()]
+      assert torch.equal(image, torch.tensor([oneChannel, oneChannel, oneChannel]))
+  for output, expectedOutput in zip(outputs[1][:2], outputs[0][:2]):
+    assert np.array_equal(output, expectedOutput)
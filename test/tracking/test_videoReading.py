@@ -0,0 +1,168 @@
+import os
+
+import cv2
+import numpy as np
+
+import pytest
+
+import zebrazoom.videoFormatConversion.zzVideoReading as zzVideoReading
+from zebrazoom.videoFormatConversion.zzVideoReading import getSqbRecordDtype
+
+
+def _writeSeqVideo(folder, frames, nbFramesPerBinFile=5):
+  # Hiris .seq video: settings in the .seq, frames in numbered .bin files and their positions in the .sqb
+  height, width = frames.shape[1:3]
+  bytesPerPixel = 3 if frames.ndim == 4 else 1
+  seqPath = os.path.join(folder, 'video.seq')
+  with open(seqPath, 'w') as seq:
+    seq.write("[Sequence Settings]\nWidth=%d\nHeight=%d\nBytesPerPixel=%d\nNumber of files=%d\nBin File=video\n" % (width, height, bytesPerPixel, len(frames)))
+  index = np.zeros(len(frames), dtype=getSqbRecordDtype())
+  for binFile in range(0, (len(frames) + nbFramesPerBinFile - 1) // nbFramesPerBinFile):
+    binFrames = frames[binFile * nbFramesPerBinFile:(binFile + 1) * nbFramesPerBinFile]
+    with open(os.path.join(folder, 'video%0.5d.bin' % binFile), 'wb') as binData:
+      binData.write(b'\0' * 7) # the frames don't have to start at the beginning of the file
+      for numFrame, frame in enumerate(binFrames):
+        index[binFile * nbFramesPerBinFile + numFrame] = (binData.tell(), 0, binFile, 0) if len(index.dtype) == 4 else (binData.tell(), 0, 0, binFile, 0)
+        binData.write(frame.tobytes())
+  index.tofile(os.path.join(folder, 'video.sqb'))
+  return seqPath
+
+
+@pytest.mark.parametrize('color', [False, True])
+@pytest.mark.parametrize('grayscale', [False, True])
+def test_seq_frames_round_trip(tmp_path, videoFrames, color, grayscale):
+  frames = np.stack([cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR) for frame in videoFrames]) if color else videoFrames
+  cap = zzVideoReading.VideoCapture(_writeSeqVideo(str(tmp_path), frames), grayscale=grayscale)
+  assert (cap.get(3), cap.get(4), cap.get(7)) == (frames.shape[2], frames.shape[1], len(frames))
+  framesRead = []
+  while True:
+    ret, frame = cap.read()
+    if not(ret):
+      break
+    framesRead.append(frame)
+  assert np.array_equal(np.array([zzVideoReading.getGrayscaleFrame(frame) for frame in framesRead]), videoFrames)
+  assert all(frame.ndim == (2 if grayscale else 3) for frame in framesRead)
+  cap.set(1, 7)
+  ret, frame = cap.read()
+  assert ret and np.array_equal(zzVideoReading.getGrayscaleFrame(frame), videoFrames[7])
+  cap.release()
+
+
+@pytest.mark.parametrize('color', [False, True])
+@pytest.mark.parametrize('grayscale', [False, True])
+def test_seq_frames_can_be_drawn_on(tmp_path, videoFrames, color, grayscale):
+  frames = np.stack([cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR) for frame in videoFrames]) if color else videoFrames
+  seqPath = _writeSeqVideo(str(tmp_path), frames)
+  # Frames that don't need to be converted are read-only views by default
+  cap = zzVideoReading.VideoCapture(seqPath, grayscale=grayscale)
+  ret, frame = cap.read()
+  assert frame.flags.writeable == (color == grayscale)
+  cap.release()
+  cap = zzVideoReading.ZzVideoReading(seqPath, grayscale, copyFrames=True)
+  ret, frame = cap.read()
+  cv2.circle(frame, (10, 10), 5, 0, -1)
+  ret, frame = cap.read()
+  assert np.array_equal(zzVideoReading.getGrayscaleFrame(frame), videoFrames[1])
+  cap.release()
+
+
+@pytest.mark.parametrize('lastFrame', [-1, 1500]) # a last frame beyond the end of the video is capped
+def test_seq_to_avi_conversion_in_segments(tmp_path, lastFrame):
+  from zebrazoom.videoFormatConversion.seq_to_avi import sqb_convert_to_avi
+  frames = np.random.default_rng(1).integers(0, 256, (1000, 8, 16), dtype=np.uint8)
+  os.mkdir(tmp_path / 'seq')
+  _writeSeqVideo(str(tmp_path / 'seq'), frames, 300)
+  sqb_convert_to_avi(str(tmp_path / 'seq'), 'video', lastFrame=lastFrame, nbProcesses=2)
+  assert sorted(os.listdir(tmp_path)) == ['seq', 'video.avi'] # the segments are removed
+  cap = cv2.VideoCapture(str(tmp_path / 'video.avi'))
+  framesRead = []
+  ret, frame = cap.read()
+  while ret:
+    framesRead.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    ret, frame = cap.read()
+  assert np.array_equal(np.array(framesRead), frames)
+
+
+@pytest.mark.parametrize('grayscale', [False, True])
+def test_image_folder_round_trip(tmp_path, videoFrames, grayscale):
+  # Images are read in the natural order of the numbers in their names, and other files are ignored
+  for frameNumber, frame in enumerate(videoFrames):
+    cv2.imwrite(str(tmp_path / ('frame%d.png' % frameNumber)), frame)
+  (tmp_path / 'notes.txt').write_text('not an image')
+  cap = zzVideoReading.VideoCapture(str(tmp_path), grayscale=grayscale)
+  assert (cap.get(3), cap.get(4), cap.get(7)) == (videoFrames.shape[2], videoFrames.shape[1], len(videoFrames))
+  framesRead = []
+  ret, frame = cap.read()
+  while ret:
+    framesRead.append(zzVideoReading.getGrayscaleFrame(frame))
+    ret, frame = cap.read()
+  assert np.array_equal(np.array(framesRead), videoFrames)
+  cap.set(1, 3)
+  assert cap.grab()
+  ret, frame = cap.read()
+  assert ret and np.array_equal(zzVideoReading.getGrayscaleFrame(frame), videoFrames[4])
+  cap.release()
+
+
+@pytest.mark.parametrize('nbFramesPrefetched', [0, 3])
+def test_grayscale_and_prefetched_reading(aviVideo, videoFrames, nbFramesPrefetched):
+  cap = zzVideoReading.VideoCapture(aviVideo, grayscale=True, nbFramesPrefetched=nbFramesPrefetched)
+  framesRead = []
+  ret, frame = cap.read()
+  while ret:
+    assert frame.ndim == 2
+    framesRead.append(frame.copy()) # the frames can be reused by the next read
+    ret, frame = cap.read()
+  assert np.array_equal(np.array(framesRead), videoFrames)
+  cap.set(1, 5)
+  ret, frame = cap.read()
+  assert ret and np.array_equal(frame, videoFrames[5])
+  cap.release()
+
+
+def test_seek_index(tmp_path, aviVideo, videoFrames):
+  seekIndexFolder = str(tmp_path / 'output')
+  os.mkdir(seekIndexFolder)
+  zzVideoReading.buildSeekIndex(aviVideo, seekIndexFolder)
+  [keyFrames, timestamps] = zzVideoReading.loadSeekIndex(aviVideo, zzVideoReading.getSeekIndexPath(seekIndexFolder))
+  assert keyFrames[0] == 0 and np.all(np.diff(keyFrames) > 0) and keyFrames[-1] < len(videoFrames)
+  cap = zzVideoReading.VideoCapture(aviVideo, grayscale=True, seekIndexFolder=seekIndexFolder)
+  assert isinstance(cap, zzVideoReading.ZzSeekIndexVideoCapture)
+  for frameNumber in [3, 4, 9, 2, 11]:
+    cap.set(1, frameNumber)
+    ret, frame = cap.read()
+    assert ret and np.array_equal(frame, videoFrames[frameNumber])
+  cap.release()
+  assert not(isinstance(zzVideoReading.VideoCapture(aviVideo, grayscale=True), zzVideoReading.ZzSeekIndexVideoCapture)) # only used when the output folder is given
+
+
+class _PacketsCapture():
+  # Demuxes packets given in decoding order as [isKeyFrame, timestamp], as with B-frames in an open GOP
+  packets = [[1, 0], [0, 120], [0, 40], [0, 80], [1, 240], [0, 160], [0, 200]]
+
+  def __init__(self, videoPath):
+    self.packetNumber = -1
+
+  def isOpened(self):
+    return True
+
+  def set(self, propToChange, value):
+    return propToChange == cv2.CAP_PROP_FORMAT
+
+  def grab(self):
+    self.packetNumber += 1
+    return self.packetNumber < len(self.packets)
+
+  def get(self, idOfInfoRequested):
+    return self.packets[self.packetNumber][0 if idOfInfoRequested == cv2.CAP_PROP_LRF_HAS_KEY_FRAME else 1]
+
+  def release(self):
+    pass
+
+
+def test_seek_index_uses_the_display_order_of_the_packets(tmp_path, aviVideo, monkeypatch):
+  monkeypatch.setattr(cv2, 'VideoCapture', _PacketsCapture)
+  zzVideoReading.buildSeekIndex(aviVideo, str(tmp_path))
+  [keyFrames, timestamps] = zzVideoReading.loadSeekIndex(aviVideo, zzVideoReading.getSeekIndexPath(str(tmp_path)))
+  assert list(keyFrames) == [0, 6]
+  assert list(timestamps) == [0, 40, 80, 120, 160, 200, 240]
@@ -88,15 +88,16 @@ if __name__ == '__main__':
       videoName = sys.argv[3]
       codec     = sys.argv[4] if len(sys.argv) >= 5 else 'HFYU'
       lastFrame = int(sys.argv[5]) if len(sys.argv) >= 6 else -1
-      sqb_convert_to_avi(path, videoName, codec, lastFrame)
+      nbProcesses = int(sys.argv[6]) if len(sys.argv) >= 7 else -1
+      grayscale = bool(int(sys.argv[7])) if len(sys.argv) >= 8 else False
+      sqb_convert_to_avi(path, videoName, codec, lastFrame, nbProcesses, grayscale)
 
 
     elif sys.argv[1] == "convertSeqToAviThenLaunchTracking":
 
-      from zebrazoom.videoFormatConversion.seq_to_avi import sqb_convert_to_avi
+      from zebrazoom.videoFormatConversion.seq_to_avi import SeqToAviBackgroundConversion
       from zebrazoom.mainZZ import mainZZ
-      from pathlib import Path
-      import time
+      import json
       path       = sys.argv[2]
       videoName  = sys.argv[3]
       configFile = sys.argv[4]
@@ -104,16 +105,20 @@ if __name__ == '__main__':
       lastFrame  = int(sys.argv[6]) if len(sys.argv) >= 7 else -1
       argv2      = sys.argv.copy()
       del argv2[1:2]
-      argv2.insert(3, 'avi')
+      argv2.insert(3, 'seq')
       del argv2[5:7]
-      path2      = Path(path).parent
-      print("Launching the convertion from seq to avi")
-      sqb_convert_to_avi(path, videoName, codec, lastFrame)
-      print("small break start")
-      time.sleep(2)
-      print("Launching the tracking, the data produced by ZebraZoom can be found in the folder: " + paths.getDefaultZZoutputFolder())
+      if lastFrame > 0:
+        # Only tracking the frames converted to avi
+        with open(configFile) as f:
+          config = json.load(f)
+        argv2 += ["lastFrame", str(min(int(config["lastFrame"]), lastFrame) if "lastFrame" in config else lastFrame)]
+      print("Launching the convertion from seq to avi in the background")
       __spec__ = "ModuleSpec(name='builtins', loader=<class '_frozen_importlib.BuiltinImporter'>)"
-      mainZZ(path2, videoName, 'avi', configFile, argv2, useGUI=False)
+      backgroundAviConversion = SeqToAviBackgroundConversion(path, videoName, codec, lastFrame)
+      print("Launching the tracking directly on the seq video, the data produced by ZebraZoom can be found in the folder: " + paths.getDefaultZZoutputFolder())
+      mainZZ(path, videoName, 'seq', configFile, argv2, useGUI=False, backgroundAviConversion=backgroundAviConversion)
+      backgroundAviConversion.wait()
+      print("Convertion from seq to avi done")
 
 
     elif sys.argv[1] == "DL_createMask":
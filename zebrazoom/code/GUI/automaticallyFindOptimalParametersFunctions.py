@@ -115,7 +115,7 @@ def getGroundTruthFromUser(self, controller, nbOfImagesToManuallyClassify, saveI
         else:
           QApplication.instance().configFileHistory[-2]()
           return None
-      frame2 = cv2.circle(frame, tuple(headCoordinates), 2, (0, 0, 255), -1)
+      frame2 = cv2.circle(frame.copy(), tuple(headCoordinates), 2, (0, 0, 255), -1)
 
       goToOptimize = False
       def callback2(video):
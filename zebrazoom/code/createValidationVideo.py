@@ -265,6 +265,8 @@ def createValidationVideo(videoPath, superStruct, hyperparameters):
           if frameIsBGR:
             frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
         
+        if not(frame.flags.writeable): # frames read from .seq videos are read-only views
+          frame = frame.copy()
         drawInfoFrame(l, frame, infoFrame, colorModifTab, hyperparameters)
           
         out.write(frame)
@@ -14,9 +14,10 @@ import zebrazoom.code.deepLearningFunctions.PyTorchFunctions.utils      as utils
 import zebrazoom.code.deepLearningFunctions.PyTorchFunctions.transforms as T
 
 
-def get_instance_segmentation_model(num_classes):
+def get_instance_segmentation_model(num_classes, pretrained=True):
 
-  model = torchvision.models.detection.maskrcnn_resnet50_fpn(pretrained=True)
+  # Without pretrained, neither the weights of the model nor the ones of its backbone are downloaded
+  model = torchvision.models.detection.maskrcnn_resnet50_fpn(weights='DEFAULT' if pretrained else None, weights_backbone=None)
   in_features = model.roi_heads.box_predictor.cls_score.in_features
   model.roi_heads.box_predictor = FastRCNNPredictor(in_features, num_classes)
   in_features_mask = model.roi_heads.mask_predictor.conv5_mask.in_channels
@@ -26,14 +27,44 @@ def get_instance_segmentation_model(num_classes):
   return model
 
 
-def loadDLmodel(pathToSavedModel):
+def getCpuExportedDLmodelPath(pathToSavedModel, quantize):
+  # The TorchScript version of the model is saved next to its weights
+  return os.path.splitext(pathToSavedModel)[0] + ('_cpuInt8' if quantize else '_cpu') + '.torchscript.pt'
+
+
+def exportDLmodelForCpu(model, pathToSavedModel, quantize):
+  # Saves the TorchScript version of the model (with the weights of its linear layers dynamically quantized to int8 if quantize is set) for CPU inference, unless it was already exported from the same weights
+  exportedModelPath = getCpuExportedDLmodelPath(pathToSavedModel, quantize)
+  if not(os.path.exists(exportedModelPath)) or os.path.getmtime(exportedModelPath) < os.path.getmtime(pathToSavedModel):
+    model = model.cpu()
+    if quantize:
+      model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    torch.jit.save(torch.jit.script(model), exportedModelPath + '.tmp')
+    os.replace(exportedModelPath + '.tmp', exportedModelPath)
+  return exportedModelPath
+
+
+def loadDLmodel(pathToSavedModel, hyperparameters=None):
+  # The weights of the whole model are loaded from pathToSavedModel: the pretrained weights are not needed (and are thus never downloaded)
+  # On CPU with trackingDLCpuExport set, the path of the TorchScript version of the model is returned instead, each well process then loads it with loadExportedDLmodel
 
   num_classes = 2
   device = torch.device('cuda') if torch.cuda.is_available() else torch.device('cpu')
-  model = get_instance_segmentation_model(num_classes)
+  model = get_instance_segmentation_model(num_classes, pretrained=False)
   model.to(device)
   model.load_state_dict(torch.load(pathToSavedModel, map_location=device))
   model.eval()
   
+  if hyperparameters is not None and hyperparameters["trackingDLCpuExport"] and device.type == 'cpu':
+    return exportDLmodelForCpu(model, pathToSavedModel, hyperparameters["trackingDLCpuExportQuantize"])
+  
+  return model
+
+
+def loadExportedDLmodel(exportedModelPath):
+
+  model = torch.jit.load(exportedModelPath, map_location='cpu')
+  model.eval()
+  
   return model
 
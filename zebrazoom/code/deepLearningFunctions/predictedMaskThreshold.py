@@ -0,0 +1,25 @@
+import numpy as np
+
+
+def getNbPixelsAboveThresholds(masks):
+  # Number of pixels of each predicted mask strictly above each threshold from 0 to 255 (i.e. the number of nonzero pixels left by cv2.threshold), calculated for all the masks at once from their histograms
+  nbMasks = len(masks)
+  values  = masks.reshape((nbMasks, -1)).astype(np.int64) + 256 * np.arange(nbMasks)[:, np.newaxis]
+  histograms = np.bincount(values.flatten(), minlength=256*nbMasks).reshape((nbMasks, 256))
+  return masks[0].size - np.cumsum(histograms, axis=1)
+
+
+def dicotomySearchOfOptimalThreshold(nbPixelsAboveThresholds, countNonZeroTarget):
+  # Dichotomy search of the threshold leaving about countNonZeroTarget nonzero pixels in the predicted mask: returns the last threshold tried (-1 if none was tried)
+  countNonZero = 0
+  low  = 0
+  high = 255
+  thresValueToTry = -1
+  while abs(countNonZero - countNonZeroTarget) > 100 and (high - low) > 1:
+    thresValueToTry = int((low + high) / 2)
+    countNonZero = nbPixelsAboveThresholds[thresValueToTry]
+    if countNonZero > countNonZeroTarget:
+      low = thresValueToTry
+    else:
+      high = thresValueToTry
+  return thresValueToTry
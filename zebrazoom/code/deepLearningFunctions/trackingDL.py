@@ -4,11 +4,59 @@ import numpy as np
 import torch
 import cv2
 import zebrazoom.videoFormatConversion.zzVideoReading as zzVideoReading
+from zebrazoom.videoFormatConversion.zzVideoReading import getGrayscaleFrame
 import zebrazoom.code.util as util
 
 from zebrazoom.code.trackingFolder.headTrackingHeadingCalculationFolder.headTrackingHeadingCalculation import headTrackingHeadingCalculation
 from zebrazoom.code.trackingFolder.tailTracking import tailTracking
 from zebrazoom.code.trackingFolder.debugTracking import debugTracking
+from zebrazoom.code.deepLearningFunctions.predictedMaskThreshold import getNbPixelsAboveThresholds, dicotomySearchOfOptimalThreshold
+
+
+class WellFramesDataset(torch.utils.data.IterableDataset):
+  # Frames of a well grouped in batches of trackingDLBatchSize frames, each batch being a tensor of the well crops (uint8) with the corresponding frame numbers
+  # Each crop is copied once, as soon as it is read (the reader can reuse its frames), into the numpy array of its batch, which is then wrapped in a tensor without copy
+  # Iterated through a DataLoader, so that the frames can be read and converted in trackingDLNbDataLoaderWorkers worker processes while the previous batches are processed by the model
+  
+  def __init__(self, videoPath, wellPosition, hyperparameters, firstFrame, lastFrame):
+    self.videoPath       = videoPath
+    self.wellPosition    = wellPosition
+    self.hyperparameters = hyperparameters
+    self.firstFrame      = firstFrame
+    self.lastFrame       = lastFrame
+  
+  def __iter__(self):
+    xtop = self.wellPosition['topLeftX']
+    ytop = self.wellPosition['topLeftY']
+    lenX = self.wellPosition['lengthX']
+    lenY = self.wellPosition['lengthY']
+    batchSize = max(int(self.hyperparameters["trackingDLBatchSize"]), 1)
+    
+    cap = zzVideoReading.VideoCapture(self.videoPath, grayscale=True, nbFramesPrefetched=self.hyperparameters["nbFramesPrefetchedInBackgroundThread"])
+    if (cap.isOpened()== False): 
+      print("Error opening video stream or file")
+    cap.set(1, self.firstFrame)
+    
+    frameNumbers = []
+    for i in range(self.firstFrame, self.lastFrame + 1):
+      ret, frame = cap.read()
+      if not(ret):
+        currentFrameNum = int(cap.get(1))
+        while not(ret):
+          currentFrameNum = currentFrameNum - 1
+          cap.set(1, currentFrameNum)
+          ret, frame = cap.read()
+      grey = getGrayscaleFrame(frame)
+      crop = grey[ytop:ytop+lenY, xtop:xtop+lenX]
+      if len(frameNumbers) == 0:
+        curFrames = np.empty((min(batchSize, self.lastFrame - i + 1),) + crop.shape, np.uint8)
+      curFrames[len(frameNumbers)] = crop
+      frameNumbers.append(i)
+      if len(frameNumbers) == batchSize or i == self.lastFrame:
+        yield [frameNumbers, torch.from_numpy(curFrames)]
+        frameNumbers = []
+    cap.release()
+
 
 def trackingDL(videoPath, wellNumber, wellPositions, hyperparameters, videoName, dlModel, device):
   
@@ -21,16 +69,17 @@ def trackingDL(videoPath, wellNumber, wellPositions, hyperparameters, videoName,
     firstFrame = hyperparameters["firstFrameForTracking"]
   lastFrame = hyperparameters["lastFrame"]
   
-  xtop = wellPositions[wellNumber]['topLeftX']
-  ytop = wellPositions[wellNumber]['topLeftY']
-  lenX = wellPositions[wellNumber]['lengthX']
-  lenY = wellPositions[wellNumber]['lengthY']
+  # On CPU, the wells processes share the cores (see trackingDLNbThreadsPerProcess) and may use the TorchScript version of the model
+  if device.type == 'cpu' and hyperparameters["trackingDLNbThreadsPerProcess"]:
+    torch.set_num_threads(int(hyperparameters["trackingDLNbThreadsPerProcess"]))
+  if type(dlModel) == str:
+    from zebrazoom.code.deepLearningFunctions.loadDLmodel import loadExportedDLmodel
+    dlModel = loadExportedDLmodel(dlModel)
   
   cap = zzVideoReading.VideoCapture(videoPath)
-  if (cap.isOpened()== False): 
-    print("Error opening video stream or file")
   frame_width  = int(cap.get(3))
   frame_height = int(cap.get(4))
+  cap.release()
   
   nbTailPoints = hyperparameters["nbTailPoints"]
   trackingHeadTailAllAnimals = np.zeros((hyperparameters["nbAnimalsPerWell"], lastFrame-firstFrame+1, nbTailPoints, 2))
@@ -38,101 +87,78 @@ def trackingDL(videoPath, wellNumber, wellPositions, hyperparameters, videoName,
   trackingEyesAllAnimals     = 0
   trackingProbabilityOfGoodDetection = 0
   
-  # Performing the tracking on each frame
-  i = firstFrame
-  cap.set(1, firstFrame)
+  # Performing the tracking on each batch of frames
   if int(hyperparameters["onlyDoTheTrackingForThisNumberOfFrames"]) != 0:
     lastFrame = min(lastFrame, firstFrame + int(hyperparameters["onlyDoTheTrackingForThisNumberOfFrames"]))
-  while (i < lastFrame+1):
-    
-    if (hyperparameters["freqAlgoPosFollow"] != 0) and (i % hyperparameters["freqAlgoPosFollow"] == 0):
-      print("Tracking: wellNumber:",wellNumber," ; frame:",i)
-      if hyperparameters["popUpAlgoFollow"]:
-        prepend("Tracking: wellNumber:" + str(wellNumber) + " ; frame:" + str(i))
-    if hyperparameters["debugTracking"]:
-      print("frame:",i)
-
-    ret, frame = cap.read()
-    if not(ret):
-      currentFrameNum = int(cap.get(1))
-      while not(ret):
-        currentFrameNum = currentFrameNum - 1
-        cap.set(1, currentFrameNum)
-        ret, frame = cap.read()
-    grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    curFrame = grey[ytop:ytop+lenY, xtop:xtop+lenX]
+  framesLoader = torch.utils.data.DataLoader(WellFramesDataset(videoPath, wellPositions[wellNumber], hyperparameters, firstFrame, lastFrame), batch_size=None, num_workers=min(int(hyperparameters["trackingDLNbDataLoaderWorkers"]), 1)) # A single worker reads all the frames of the well
+  for [frameNumbers, curFrames] in framesLoader:
     
-    oneChannel  = curFrame.tolist()
-    oneChannel2 = [[a/255 for a in list] for list in oneChannel]
-    imgTorch    = torch.tensor([oneChannel2, oneChannel2, oneChannel2])
-
+    # The crops are converted to float and duplicated on 3 channels (without copy) directly on the device, and all the frames of the batch go through the model at once
+    images = curFrames.to(device).float().div(255)
     with torch.no_grad():
-      prediction = dlModel([imgTorch.to(device)])
+      predictions = dlModel([image.expand(3, len(image), len(image[0])) for image in images])
+    if type(predictions) == tuple: # TorchScript models return the losses and the predictions
+      predictions = predictions[1]
     
-    if len(prediction) and len(prediction[0]['masks']):
-      thresh = prediction[0]['masks'][0, 0].mul(255).byte().cpu().numpy()
-      if debugPlus:
-        util.showFrame(255 - thresh, title="thresh")
-      
-      if hyperparameters["applySimpleThresholdOnPredictedMask"]:
-        ret, thresh2 = cv2.threshold(thresh, hyperparameters["applySimpleThresholdOnPredictedMask"], 255, cv2.THRESH_BINARY)
-        if hyperparameters["simpleThresholdCheckMinForMaxCountour"]:
-          contours, hierarchy = cv2.findContours(thresh2, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-          maxContourArea = 0
-          for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > maxContourArea:
-              maxContourArea = area
-          if maxContourArea < hyperparameters["simpleThresholdCheckMinForMaxCountour"]:
-            print("maxContour found had a value that's too low (for wellNumber:", wellNumber, ", frame:", i,")")
-            countNonZeroTarget = hyperparameters["trackingDLdicotomySearchOfOptimalBlobArea"]
-            countNonZero       = 0
-            low  = 0
-            high = 255
-            while abs(countNonZero - countNonZeroTarget) > 100 and (high - low) > 1:
-              thresValueToTry = int((low + high) / 2)
-              ret, thresh2 = cv2.threshold(thresh, thresValueToTry, 255, cv2.THRESH_BINARY)
-              countNonZero = cv2.countNonZero(thresh2)
-              if countNonZero > countNonZeroTarget:
-                low = thresValueToTry
-              else:
-                high = thresValueToTry
-      else:
-        if hyperparameters["trackingDLdicotomySearchOfOptimalBlobArea"]:
-          countNonZeroTarget = hyperparameters["trackingDLdicotomySearchOfOptimalBlobArea"]
-          countNonZero       = 0
-          low  = 0
-          high = 255
-          while abs(countNonZero - countNonZeroTarget) > 100 and (high - low) > 1:
-            thresValueToTry = int((low + high) / 2)
-            ret, thresh2 = cv2.threshold(thresh, thresValueToTry, 255, cv2.THRESH_BINARY)
-            countNonZero = cv2.countNonZero(thresh2)
-            if countNonZero > countNonZeroTarget:
-              low = thresValueToTry
-            else:
-              high = thresValueToTry
-        else:
-          thresh2 = thresh
-        
-      thresh3 = thresh2.copy()
+    predicted = [idx for idx in range(0, len(frameNumbers)) if idx < len(predictions) and len(predictions[idx]['masks'])]
+    if len(predicted):
+      threshs = torch.stack([predictions[idx]['masks'][0, 0] for idx in predicted]).mul(255).byte().cpu().numpy()
+      nbPixelsAboveThresholds = getNbPixelsAboveThresholds(threshs)
     
-      if debugPlus:
-        util.showFrame(255 - thresh2, title="thresh2")
+    for idx, i in enumerate(frameNumbers):
       
-      [trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingProbabilityOfGoodDetection, lastFirstTheta] = headTrackingHeadingCalculation(hyperparameters, firstFrame, i, thresh2, thresh2, thresh2, thresh2, hyperparameters["erodeSize"], frame_width, frame_height, trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingProbabilityOfGoodDetection, 0, wellPositions[wellNumber]["lengthX"])
+      if (hyperparameters["freqAlgoPosFollow"] != 0) and (i % hyperparameters["freqAlgoPosFollow"] == 0):
+        print("Tracking: wellNumber:",wellNumber," ; frame:",i)
+        if hyperparameters["popUpAlgoFollow"]:
+          prepend("Tracking: wellNumber:" + str(wellNumber) + " ; frame:" + str(i))
+      if hyperparameters["debugTracking"]:
+        print("frame:",i)
       
-      if hyperparameters["trackTail"] == 1:
-        for animalId in range(0, hyperparameters["nbAnimalsPerWell"]):
-          [trackingHeadTailAllAnimals, trackingHeadingAllAnimals] = tailTracking(animalId, i, firstFrame, videoPath, thresh3, hyperparameters, thresh3, nbTailPoints, thresh3, 0, trackingHeadTailAllAnimals, trackingHeadingAllAnimals, 0, 0, 0, thresh3, 0, wellNumber)
+      curFrame = curFrames[idx].numpy()
       
-      # Debug functions
-      debugTracking(nbTailPoints, i, firstFrame, trackingHeadTailAllAnimals, trackingHeadingAllAnimals, curFrame, hyperparameters)
-    
-    else:
+      if idx in predicted:
+        thresh = threshs[predicted.index(idx)]
+        if debugPlus:
+          util.showFrame(255 - thresh, title="thresh")
+        
+        if hyperparameters["applySimpleThresholdOnPredictedMask"]:
+          ret, thresh2 = cv2.threshold(thresh, hyperparameters["applySimpleThresholdOnPredictedMask"], 255, cv2.THRESH_BINARY)
+          if hyperparameters["simpleThresholdCheckMinForMaxCountour"]:
+            contours, hierarchy = cv2.findContours(thresh2, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+            maxContourArea = 0
+            for contour in contours:
+              area = cv2.contourArea(contour)
+              if area > maxContourArea:
+                maxContourArea = area
+            if maxContourArea < hyperparameters["simpleThresholdCheckMinForMaxCountour"]:
+              print("maxContour found had a value that's too low (for wellNumber:", wellNumber, ", frame:", i,")")
+              thresValue = dicotomySearchOfOptimalThreshold(nbPixelsAboveThresholds[predicted.index(idx)], hyperparameters["trackingDLdicotomySearchOfOptimalBlobArea"])
+              if thresValue != -1:
+                ret, thresh2 = cv2.threshold(thresh, thresValue, 255, cv2.THRESH_BINARY)
+        else:
+          if hyperparameters["trackingDLdicotomySearchOfOptimalBlobArea"]:
+            thresValue = dicotomySearchOfOptimalThreshold(nbPixelsAboveThresholds[predicted.index(idx)], hyperparameters["trackingDLdicotomySearchOfOptimalBlobArea"])
+            if thresValue != -1:
+              ret, thresh2 = cv2.threshold(thresh, thresValue, 255, cv2.THRESH_BINARY)
+          else:
+            thresh2 = thresh
+          
+        thresh3 = thresh2.copy()
       
-      print("No predictions for frame", i, "and well number", wellNumber)
-    
-    print("done for frame", i)
-    i = i + 1
+        if debugPlus:
+          util.showFrame(255 - thresh2, title="thresh2")
+        
+        [trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingProbabilityOfGoodDetection, lastFirstTheta] = headTrackingHeadingCalculation(hyperparameters, firstFrame, i, thresh2, thresh2, thresh2, thresh2, hyperparameters["erodeSize"], frame_width, frame_height, trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingProbabilityOfGoodDetection, 0, wellPositions[wellNumber]["lengthX"])
+        
+        if hyperparameters["trackTail"] == 1:
+          for animalId in range(0, hyperparameters["nbAnimalsPerWell"]):
+            [trackingHeadTailAllAnimals, trackingHeadingAllAnimals] = tailTracking(animalId, i, firstFrame, videoPath, thresh3, hyperparameters, thresh3, nbTailPoints, thresh3, 0, trackingHeadTailAllAnimals, trackingHeadingAllAnimals, 0, 0, 0, thresh3, 0, wellNumber)
+        
+        # Debug functions
+        debugTracking(nbTailPoints, i, firstFrame, trackingHeadTailAllAnimals, trackingHeadingAllAnimals, curFrame, hyperparameters)
+      
+      else:
+        
+        print("No predictions for frame", i, "and well number", wellNumber)
   
   return [trackingHeadTailAllAnimals, trackingHeadingAllAnimals, trackingEyesAllAnimals, 0, 0]
\ No newline at end of file
@@ -12,13 +12,67 @@ from multiprocessing import Process
 import cv2
 import zebrazoom.videoFormatConversion.zzVideoReading as zzVideoReading
 import numpy as np
+from zebrazoom.code.trackingFolder.trackingFunctions import trackingUsesGrayscaleFrames
 import math
 import queue
 from zebrazoom.code.trackingFolder.refactoredCode2022.detectMovementWithRawVideoInsideTracking2 import detectMovementWithRawVideoInsideTracking2
+from zebrazoom.code.getImage.plateForegroundExtraction import PlateForegroundExtraction
+from zebrazoom.code.sharedFrameBroadcast import SharedFrameBroadcaster
+
+def canUseParallelWorkers(hyperparameters):
+  # The wells are split between several worker processes reading the same decoded frames: not possible when the tracking requires user interaction or modifies the hyperparameters of all the wells (backgroundSubtractorKNN)
+  return int(hyperparameters["fasterMultiprocessingNbWorkers"]) > 1 and hyperparameters["onlyTrackThisOneWell"] == -1 and not(hyperparameters["backgroundSubtractorKNN"]) and not(hyperparameters["debugTracking"]) and hyperparameters["adjustFreelySwimTracking"] == 0
 
 def fasterMultiprocessing(videoPath, background, wellPositions, output, hyperparameters, videoName):
   
-  cap = zzVideoReading.VideoCapture(videoPath)
+  if hyperparameters["onlyTrackThisOneWell"] == -1:
+    wellNumbers = list(range(0, hyperparameters["nbWells"]))
+  else:
+    wellNumbers = [hyperparameters["onlyTrackThisOneWell"]]
+  
+  nbWorkers = min(int(hyperparameters["fasterMultiprocessingNbWorkers"]), len(wellNumbers))
+  if nbWorkers > 1 and canUseParallelWorkers(hyperparameters):
+    return output + trackWellsWithParallelWorkers(videoPath, background, wellPositions, hyperparameters, wellNumbers, nbWorkers)
+  
+  cap = zzVideoReading.VideoCapture(videoPath, grayscale=trackingUsesGrayscaleFrames(hyperparameters), nbFramesPrefetched=hyperparameters["nbFramesPrefetchedInBackgroundThread"])
+  
+  return output + trackWells(cap, videoPath, background, wellPositions, hyperparameters, wellNumbers)
+
+def _parallelWorker(videoPath, background, wellPositions, hyperparameters, wellNumbers, sharedFrameReader, workerOutput):
+  # The wells of a worker are always tracked by this worker, so the tracking of each well goes through all the frames in order
+  for wellData in trackWells(sharedFrameReader, videoPath, background, wellPositions, hyperparameters, wellNumbers):
+    workerOutput.put(wellData)
+  sharedFrameReader.release()
+
+def trackWellsWithParallelWorkers(videoPath, background, wellPositions, hyperparameters, wellNumbers, nbWorkers):
+  # Each frame is decoded only once by this process and shared through a ring buffer with a pool of workers, each tracking a fixed subset of the wells
+  
+  # The broadcast goes from firstFrame to lastFrame, as the tracking below
+  sharedFrameBroadcaster = SharedFrameBroadcaster(videoPath, dict(hyperparameters, firstFrameForTracking=-1, onlyDoTheTrackingForThisNumberOfFrames=0), nbWorkers)
+  workerOutput = mp.Queue()
+  processes = []
+  for workerId in range(0, nbWorkers):
+    p = Process(target=_parallelWorker, args=(videoPath, background, wellPositions, hyperparameters, wellNumbers[workerId::nbWorkers], sharedFrameBroadcaster.getReader(workerId), workerOutput))
+    p.start()
+    processes.append(p)
+  
+  sharedFrameBroadcaster.broadcast(processes)
+  
+  output = []
+  while len(output) < len(wellNumbers):
+    try:
+      output.append(workerOutput.get(timeout=1))
+    except queue.Empty:
+      if not(any(p.is_alive() for p in processes)):
+        raise ValueError("The tracking of some wells stopped before the end of the video")
+  for p in processes:
+    p.join()
+  
+  return sorted(output, key=lambda wellData: wellData[0])
+
+def trackWells(cap, videoPath, background, wellPositions, hyperparameters, wellNumbers):
+  # Tracks the wells of wellNumbers on all the frames read from cap and returns the list of [wellNumber, parameters, []] of these wells
+  
   if (cap.isOpened()== False): 
     print("Error opening video stream or file")
   frame_width  = int(cap.get(3))
@@ -27,32 +81,33 @@ def fasterMultiprocessing(videoPath, background, wellPositions, output, hyperpar
   lastFrame  = hyperparameters["lastFrame"]
   nbTailPoints = hyperparameters["nbTailPoints"]
   
-  trackingHeadTailAllAnimalsList = []
-  trackingHeadingAllAnimalsList  = []
+  # The lists are indexed by well number, the wells not tracked here being left to None
+  trackingHeadTailAllAnimalsList = [None] * hyperparameters["nbWells"]
+  trackingHeadingAllAnimalsList  = [None] * hyperparameters["nbWells"]
   if hyperparameters["eyeTracking"]:
-    trackingEyesAllAnimalsList   = []
+    trackingEyesAllAnimalsList   = [None] * hyperparameters["nbWells"]
   else:
     trackingEyesAllAnimals = 0
   trackingDataList               = []
   
   if hyperparameters["detectMovementWithRawVideoInsideTracking"]:
     previousFrames   = queue.Queue(hyperparameters["frameGapComparision"])
-    auDessusPerAnimalIdList = []
-    for wellNumber in range(0, hyperparameters["nbWells"]):
-      auDessusPerAnimalIdList.append([np.zeros((lastFrame-firstFrame+1, 1)) for nbAnimalsPerWell in range(0, hyperparameters["nbAnimalsPerWell"])])
+    auDessusPerAnimalIdList = [None] * hyperparameters["nbWells"]
+    for wellNumber in wellNumbers:
+      auDessusPerAnimalIdList[wellNumber] = [np.zeros((lastFrame-firstFrame+1, 1)) for nbAnimalsPerWell in range(0, hyperparameters["nbAnimalsPerWell"])]
   
   if not(hyperparameters["nbAnimalsPerWell"] > 1) and not(hyperparameters["headEmbeded"]) and (hyperparameters["findHeadPositionByUserInput"] == 0) and (hyperparameters["takeTheHeadClosestToTheCenter"] == 0):
-    trackingProbabilityOfGoodDetectionList = []
+    trackingProbabilityOfGoodDetectionList = [None] * hyperparameters["nbWells"]
   else:
     trackingProbabilityOfGoodDetectionList = 0
   
-  for wellNumber in range(0, hyperparameters["nbWells"]):
-    trackingHeadTailAllAnimalsList.append(np.zeros((hyperparameters["nbAnimalsPerWell"], lastFrame-firstFrame+1, nbTailPoints, 2)))
-    trackingHeadingAllAnimalsList.append(np.zeros((hyperparameters["nbAnimalsPerWell"], lastFrame-firstFrame+1)))
+  for wellNumber in wellNumbers:
+    trackingHeadTailAllAnimalsList[wellNumber] = np.zeros((hyperparameters["nbAnimalsPerWell"], lastFrame-firstFrame+1, nbTailPoints, 2))
+    trackingHeadingAllAnimalsList[wellNumber]  = np.zeros((hyperparameters["nbAnimalsPerWell"], lastFrame-firstFrame+1))
     if hyperparameters["eyeTracking"]:
-      trackingEyesAllAnimalsList.append(np.zeros((hyperparameters["nbAnimalsPerWell"], lastFrame-firstFrame+1, 8)))
+      trackingEyesAllAnimalsList[wellNumber] = np.zeros((hyperparameters["nbAnimalsPerWell"], lastFrame-firstFrame+1, 8))
     if not(hyperparameters["nbAnimalsPerWell"] > 1) and not(hyperparameters["headEmbeded"]) and (hyperparameters["findHeadPositionByUserInput"] == 0) and (hyperparameters["takeTheHeadClosestToTheCenter"] == 0):
-      trackingProbabilityOfGoodDetectionList.append(np.zeros((hyperparameters["nbAnimalsPerWell"], lastFrame-firstFrame+1)))
+      trackingProbabilityOfGoodDetectionList[wellNumber] = np.zeros((hyperparameters["nbAnimalsPerWell"], lastFrame-firstFrame+1))
   
   if hyperparameters["backgroundSubtractorKNN"]:
     fgbg = cv2.createBackgroundSubtractorKNN()
@@ -61,7 +116,9 @@ def fasterMultiprocessing(videoPath, background, wellPositions, output, hyperpar
       ret, frame = cap.read()
       fgmask = fgbg.apply(frame)
     cap.release()
-    cap = zzVideoReading.VideoCapture(videoPath)
+    cap = zzVideoReading.VideoCapture(videoPath, nbFramesPrefetched=hyperparameters["nbFramesPrefetchedInBackgroundThread"])
+  
+  plateForegroundExtraction = PlateForegroundExtraction()
   
   i = firstFrame
   
@@ -88,8 +145,10 @@ def fasterMultiprocessing(videoPath, background, wellPositions, output, hyperpar
       if hyperparameters["backgroundSubtractorKNN"]:
         frame = fgbg.apply(frame)
         frame = 255 - frame
+      elif hyperparameters["nbAnimalsPerWell"] == 1 and not(hyperparameters["forceBlobMethodForHeadTracking"]):
+        [grey, foreground] = plateForegroundExtraction.extract(frame, background, hyperparameters["minPixelDiffForBackExtract"])
       
-      for wellNumber in range(0 if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"], hyperparameters["nbWells"] if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"] + 1):
+      for wellNumber in wellNumbers:
         
         if hyperparameters["nbAnimalsPerWell"] == 1 and not(hyperparameters["forceBlobMethodForHeadTracking"]):
           minPixelDiffForBackExtract = hyperparameters["minPixelDiffForBackExtract"]
@@ -99,14 +158,10 @@ def fasterMultiprocessing(videoPath, background, wellPositions, output, hyperpar
           lenY = wellPositions[wellNumber]['lengthY']
           if hyperparameters["backgroundSubtractorKNN"]:
             grey = frame
+            curFrame = grey[ytop:ytop+lenY, xtop:xtop+lenX]
           else:
-            grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-          curFrame = grey[ytop:ytop+lenY, xtop:xtop+lenX]
-          if not(hyperparameters["backgroundSubtractorKNN"]):
-            back = background[ytop:ytop+lenY, xtop:xtop+lenX]
-            putToWhite = ( curFrame.astype('int32') >= (back.astype('int32') - minPixelDiffForBackExtract) )
-            curFrame[putToWhite] = 255
-          else:
+            curFrame = foreground[ytop:ytop+lenY, xtop:xtop+lenX]
+          if hyperparameters["backgroundSubtractorKNN"]:
             hyperparameters["paramGaussianBlur"] = int(math.sqrt(cv2.countNonZero(255 - curFrame) / hyperparameters["nbAnimalsPerWell"]) / 2) * 2 + 1
           if hyperparameters["paramGaussianBlur"]:
             blur = cv2.GaussianBlur(curFrame, (hyperparameters["paramGaussianBlur"], hyperparameters["paramGaussianBlur"]),0)
@@ -146,14 +201,14 @@ def fasterMultiprocessing(videoPath, background, wellPositions, output, hyperpar
             
       if hyperparameters["detectMovementWithRawVideoInsideTracking"]:
         for numFish in range(0, hyperparameters["nbAnimalsPerWell"]):
-          [auDessusPerAnimalIdList, previousFrames] = detectMovementWithRawVideoInsideTracking2(hyperparameters, trackingHeadTailAllAnimalsList, previousFrames, numFish, i, firstFrame, auDessusPerAnimalIdList, grey, wellPositions)
+          [auDessusPerAnimalIdList, previousFrames] = detectMovementWithRawVideoInsideTracking2(hyperparameters, trackingHeadTailAllAnimalsList, previousFrames, numFish, i, firstFrame, auDessusPerAnimalIdList, grey, wellPositions, wellNumbers)
         
     if hyperparameters["adjustFreelySwimTracking"] == 1:
       i, widgets = adjustFreelySwimTrackingParams(nbTailPoints, i, firstFrame, trackingHeadTailAllAnimals, trackingHeadingAllAnimals, frame, frame2, hyperparameters, widgets)
     else:
       i = i + 1
     
-  for wellNumber in range(0 if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"], hyperparameters["nbWells"] if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"] + 1):
+  for wellNumber in wellNumbers:
     
     if hyperparameters["postProcessMultipleTrajectories"]:
       [trackingHeadingAllAnimalsList[wellNumber], trackingHeadTailAllAnimalsList[wellNumber], trackingEyesAllAnimals] = postProcessMultipleTrajectories(trackingHeadingAllAnimalsList[wellNumber], trackingHeadTailAllAnimalsList[wellNumber], [], trackingProbabilityOfGoodDetectionList[wellNumber], hyperparameters, wellPositions)
@@ -163,9 +218,9 @@ def fasterMultiprocessing(videoPath, background, wellPositions, output, hyperpar
     else:
       trackingDataList.append([trackingHeadTailAllAnimalsList[wellNumber], trackingHeadingAllAnimalsList[wellNumber], [], 0, 0])
     
-  wellNumberBeginLoop = 0 if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"]
-  for wellNumber in range(wellNumberBeginLoop, hyperparameters["nbWells"] if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"] + 1):
-    parameters = extractParameters(trackingDataList[wellNumber-wellNumberBeginLoop], wellNumber, hyperparameters, videoPath, wellPositions, background)
+  output = []
+  for wellNumber, trackingData in zip(wellNumbers, trackingDataList):
+    parameters = extractParameters(trackingData, wellNumber, hyperparameters, videoPath, wellPositions, background)
     output.append([wellNumber,parameters,[]])
   
   return output
\ No newline at end of file
@@ -23,20 +23,22 @@ from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.tailTrackingExtre
 from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.tailTrackingExtremityDetectFolder.findTheTwoSides import findTheTwoSides
 from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.tailTrackingExtremityDetectFolder.findBodyContour import findBodyContour
 from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.tailTrackingExtremityDetectFolder.Rotate import Rotate
-from zebrazoom.code.trackingFolder.trackingFunctions import calculateAngle
+from zebrazoom.code.trackingFolder.trackingFunctions import calculateAngle, trackingUsesGrayscaleFrames
 
 from zebrazoom.code.trackingFolder.refactoredCode2022.findCenterByIterativelyDilating import findCenterByIterativelyDilating
 from zebrazoom.code.trackingFolder.refactoredCode2022.headingCompute import computeHeading2
 from zebrazoom.code.trackingFolder.refactoredCode2022.findTheTwoSides2 import findTheTwoSides2
-from zebrazoom.code.trackingFolder.refactoredCode2022.identitiesLinkage import findOptimalIdCorrespondance, switchIdentities
+from zebrazoom.code.trackingFolder.refactoredCode2022.plateBlobsDetection import getWellNumberLookup, findAnimalsBlobsInPlate, getBlobContour
+from zebrazoom.code.trackingFolder.refactoredCode2022.identitiesLinkage import findOptimalIdCorrespondance, switchIdentities, linkTrackletsOverSlidingWindow
 
 from zebrazoom.code.updateBackgroundAtInterval import updateBackgroundAtInterval
+from zebrazoom.code.getImage.plateForegroundExtraction import PlateForegroundExtraction
 
 from zebrazoom.code.trackingFolder.refactoredCode2022.detectMovementWithRawVideoInsideTracking2 import detectMovementWithRawVideoInsideTracking2
 
 def fasterMultiprocessing2(videoPath, background, wellPositions, output, hyperparameters, videoName):
   
-  cap = zzVideoReading.VideoCapture(videoPath)
+  cap = zzVideoReading.VideoCapture(videoPath, grayscale=trackingUsesGrayscaleFrames(hyperparameters), nbFramesPrefetched=hyperparameters["nbFramesPrefetchedInBackgroundThread"])
   if (cap.isOpened()== False): 
     print("Error opening video stream or file")
   frame_width  = int(cap.get(3))
@@ -82,6 +84,11 @@ def fasterMultiprocessing2(videoPath, background, wellPositions, output, hyperpa
     # cap.release()
     # cap = zzVideoReading.VideoCapture(videoPath)
   
+  plateForegroundExtraction = PlateForegroundExtraction()
+  
+  if hyperparameters["fasterMultiprocessing2PlateConnectedComponents"]:
+    wellNumberLookup = getWellNumberLookup(wellPositions, frame_height, frame_width)
+  
   i = firstFrame
   
   if firstFrame:
@@ -111,6 +118,13 @@ def fasterMultiprocessing2(videoPath, background, wellPositions, output, hyperpa
         # frame = fgbg.apply(frame)
         # frame = 255 - frame
       
+      # The background is modified in place when it's updated during the tracking
+      [grey, foreground] = plateForegroundExtraction.extract(frame, background, hyperparameters["minPixelDiffForBackExtract"], hyperparameters["updateBackgroundAtInterval"] != 0)
+      
+      # The blobs of the animals of all the wells are found at once on the whole plate
+      if hyperparameters["fasterMultiprocessing2PlateConnectedComponents"]:
+        [labels, stats, animalsBlobsPerWell] = findAnimalsBlobsInPlate(foreground, wellNumberLookup, hyperparameters["nbWells"], hyperparameters)
+      
       for wellNumber in range(0 if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"], hyperparameters["nbWells"] if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"] + 1):
         
         minPixelDiffForBackExtract = hyperparameters["minPixelDiffForBackExtract"]
@@ -121,14 +135,11 @@ def fasterMultiprocessing2(videoPath, background, wellPositions, output, hyperpa
         # if hyperparameters["backgroundSubtractorKNN"]:
           # grey = frame
         # else:
-        grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         
-        curFrame = grey[ytop:ytop+lenY, xtop:xtop+lenX].copy()
-        initialCurFrame = curFrame.copy()
+        curFrame = foreground[ytop:ytop+lenY, xtop:xtop+lenX]
+        initialCurFrame = grey[ytop:ytop+lenY, xtop:xtop+lenX]
         # if not(hyperparameters["backgroundSubtractorKNN"]):
         back = background[ytop:ytop+lenY, xtop:xtop+lenX]
-        putToWhite = ( curFrame.astype('int32') >= (back.astype('int32') - minPixelDiffForBackExtract) )
-        curFrame[putToWhite] = 255
         # else:
           # hyperparameters["paramGaussianBlur"] = int(math.sqrt(cv2.countNonZero(255 - curFrame) / hyperparameters["nbAnimalsPerWell"]) / 2) * 2 + 1
         # if hyperparameters["paramGaussianBlur"]:
@@ -137,31 +148,34 @@ def fasterMultiprocessing2(videoPath, background, wellPositions, output, hyperpa
           # blur = curFrame
         headPositionFirstFrame = 0
         
-        ret, thresh1 = cv2.threshold(curFrame.copy(), 254, 255, cv2.THRESH_BINARY)
-        
-        contours, hierarchy = cv2.findContours(thresh1,cv2.RETR_TREE,cv2.CHAIN_APPROX_SIMPLE)
-        areas = np.array([cv2.contourArea(contour) for contour in contours])
-        
-        maxIndexes = []
-        for numFish in range(0, hyperparameters["nbAnimalsPerWell"]):
-          maxArea = -1
-          maxInd  = -1
-          for idx, area in enumerate(areas):
-            if area > maxArea and area > 0.7 * hyperparameters["minAreaBody"] and area < 1.3 * hyperparameters["maxAreaBody"]:
-              maxArea = area
-              maxInd  = idx
-          areas[maxInd] = -1
-          if maxInd != -1:
-            maxIndexes.append(maxInd)
+        if hyperparameters["fasterMultiprocessing2PlateConnectedComponents"]:
+          bodyContours = [getBlobContour(labels, stats, label, xtop, ytop) for label in animalsBlobsPerWell[wellNumber]]
+        else:
+          ret, thresh1 = cv2.threshold(curFrame.copy(), 254, 255, cv2.THRESH_BINARY)
+          
+          contours, hierarchy = cv2.findContours(thresh1,cv2.RETR_TREE,cv2.CHAIN_APPROX_SIMPLE)
+          areas = np.array([cv2.contourArea(contour) for contour in contours])
+          
+          maxIndexes = []
+          for numFish in range(0, hyperparameters["nbAnimalsPerWell"]):
+            maxArea = -1
+            maxInd  = -1
+            for idx, area in enumerate(areas):
+              if area > maxArea and area > 0.7 * hyperparameters["minAreaBody"] and area < 1.3 * hyperparameters["maxAreaBody"]:
+                maxArea = area
+                maxInd  = idx
+            areas[maxInd] = -1
+            if maxInd != -1:
+              maxIndexes.append(maxInd)
+          bodyContours = [contours[idx] for idx in maxIndexes]
         
-        for animal_Id, idx in enumerate(maxIndexes):
-          bodyContour = contours[idx]
+        for animal_Id, bodyContour in enumerate(bodyContours):
           M = cv2.moments(bodyContour)
           if M['m00']:
             # x = int(M['m10']/M['m00'])
             # y = int(M['m01']/M['m00'])
             # headPosition = [x, y]
-            headPosition = findCenterByIterativelyDilating(bodyContour.copy(), len(curFrame[0]), len(curFrame))
+            headPosition = findCenterByIterativelyDilating(bodyContour.copy(), len(curFrame[0]), len(curFrame), hyperparameters["findCenterOfAnimalByDistanceTransform"])
             
             trackingHeadTailAllAnimalsList[wellNumber][animal_Id, i-firstFrame][0][0] = headPosition[0]
             trackingHeadTailAllAnimalsList[wellNumber][animal_Id, i-firstFrame][0][1] = headPosition[1]
@@ -194,7 +208,7 @@ def fasterMultiprocessing2(videoPath, background, wellPositions, output, hyperpa
         # if hyperparameters["eyeTracking"]:
           # trackingEyesAllAnimalsList[wellNumber] = eyeTracking(animalId, i, firstFrame, frame, hyperparameters, thresh1, trackingHeadingAllAnimalsList[wellNumber], trackingHeadTailAllAnimalsList[wellNumber], trackingEyesAllAnimalsList[wellNumber])
         
-        correspondance = findOptimalIdCorrespondance(trackingHeadTailAllAnimalsList, wellNumber,  i, firstFrame)
+        correspondance = findOptimalIdCorrespondance(trackingHeadTailAllAnimalsList, wellNumber,  i, firstFrame, hyperparameters)
         
         [trackingHeadTailAllAnimalsList, trackingHeadingAllAnimalsList] = switchIdentities(correspondance, trackingHeadTailAllAnimalsList, trackingHeadingAllAnimalsList, wellNumber, i, firstFrame)
         
@@ -246,6 +260,9 @@ def fasterMultiprocessing2(videoPath, background, wellPositions, output, hyperpa
     
   for wellNumber in range(0 if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"], hyperparameters["nbWells"] if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"] + 1):
     
+    if hyperparameters["identitiesLinkageSlidingWindow"]:
+      linkTrackletsOverSlidingWindow(trackingHeadTailAllAnimalsList[wellNumber], [trackingHeadingAllAnimalsList[wellNumber]] + ([auDessusPerAnimalIdList[wellNumber]] if hyperparameters["detectMovementWithRawVideoInsideTracking"] else []), hyperparameters)
+    
     # if hyperparameters["postProcessMultipleTrajectories"]:
       # [trackingHeadingAllAnimalsList[wellNumber], trackingHeadTailAllAnimalsList[wellNumber], trackingEyesAllAnimals] = postProcessMultipleTrajectories(trackingHeadingAllAnimalsList[wellNumber], trackingHeadTailAllAnimalsList[wellNumber], [], trackingProbabilityOfGoodDetectionList[wellNumber], hyperparameters, wellPositions)
     if hyperparameters["detectMovementWithRawVideoInsideTracking"]:
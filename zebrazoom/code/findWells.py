@@ -366,7 +366,7 @@ def findWells(videoPath, hyperparameters):
     l = []
     well = { 'topLeftX' : 0 , 'topLeftY' : 0 , 'lengthX' : frame_width , 'lengthY': frame_height }
     l.append(well)
-    saveWellsRepartitionImage(l, frame, hyperparameters)
+    saveWellsRepartitionImage(l, frame.copy(), hyperparameters)
     cap.release()
     return l
   
@@ -398,7 +398,7 @@ def findWells(videoPath, hyperparameters):
     ret, frame = cap.read()
     if hyperparameters["imagePreProcessMethod"]:
       frame = preprocessImage(frame, hyperparameters)
-    saveWellsRepartitionImage(l, frame, hyperparameters)
+    saveWellsRepartitionImage(l, frame.copy(), hyperparameters)
     cap.release()
     return l
   
@@ -477,7 +477,7 @@ def findWells(videoPath, hyperparameters):
       if topLeftY + wellPos_lengthY >= lengthY:
         wellPositions[i]['lengthY'] = lengthY - topLeftY - 1
   
-  saveWellsRepartitionImage(wellPositions, frame, hyperparameters)
+  saveWellsRepartitionImage(wellPositions, frame.copy(), hyperparameters)
   
   if hyperparameters["debugFindWells"]:
     from PyQt5.QtCore import Qt
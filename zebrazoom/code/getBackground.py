@@ -1,12 +1,15 @@
+import os
 import numpy as np
 import cv2
 from zebrazoom.code.preprocessImage import preprocessImage, preprocessBackgroundImage
 import zebrazoom.videoFormatConversion.zzVideoReading as zzVideoReading
+from zebrazoom.videoFormatConversion.zzVideoReading import getGrayscaleFrame
 
 
 def getBackground(videoPath, hyperparameters):
   
-  cap   = zzVideoReading.VideoCapture(videoPath)
+  seekIndexFolder = os.path.join(hyperparameters["outputFolder"], hyperparameters["videoName"]) if ("keyFramesSeekIndex" in hyperparameters) and hyperparameters["keyFramesSeekIndex"] and ("outputFolder" in hyperparameters) and ("videoName" in hyperparameters) else None
+  cap   = zzVideoReading.VideoCapture(videoPath, grayscale=True, seekIndexFolder=seekIndexFolder)
   max_l = int(cap.get(7))
 
   backCalculationStep = hyperparameters["backCalculationStep"]
@@ -35,7 +38,7 @@ def getBackground(videoPath, hyperparameters):
   if hyperparameters["useFirstFrameAsBackground"]:
     if hyperparameters["invertBlackWhiteOnImages"]:
       back = 255 - back
-    back = cv2.cvtColor(back, cv2.COLOR_BGR2GRAY)
+    back = getGrayscaleFrame(back)
     if hyperparameters["backgroundPreProcessMethod"]:
       back = preprocessBackgroundImage(back, hyperparameters)
     if debugExtractBack:
@@ -54,92 +57,91 @@ def getBackground(videoPath, hyperparameters):
   
   if ret and hyperparameters["invertBlackWhiteOnImages"]:
     back = 255 - back
-  back = cv2.cvtColor(back, cv2.COLOR_BGR2GRAY)
-  if hyperparameters["backgroundExtractionWithOnlyTwoFrames"] == 0:
-    for k in range(firstFrame,lastFrame):
-      if (k % backCalculationStep == 0):
-        cap.set(1, k)
-        ret, frame = cap.read()
-        if ret and hyperparameters["invertBlackWhiteOnImages"]:
-          frame = 255 - frame
-        if debugExtractBack:
-          print(k)
-        if ret:
-          frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-          if hyperparameters["extractBackWhiteBackground"]:
-            back = cv2.max(frame, back)
-          else:
-            back = cv2.min(frame, back)
-        else:
-          print("couldn't use the frame", k, "for the background extraction")
-  else:
-    maxDiff    = 0
-    indMaxDiff = firstFrame
-    for k in range(firstFrame,lastFrame):
-      if (k % backCalculationStep == 0):
-        cap.set(1, k)
-        ret, frame = cap.read()
-        if ret:
-          if hyperparameters["invertBlackWhiteOnImages"]:
-            frame = 255 - frame
-          frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-          diff  = np.sum(np.abs(frame - back))
-          if diff > maxDiff:
-            maxDiff    = diff
-            indMaxDiff = k
-    cap.set(1, indMaxDiff)
-    ret, frame = cap.read()
-    if ret:
-      if hyperparameters["invertBlackWhiteOnImages"]:
-        frame = 255 - frame
-      frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+  back = getGrayscaleFrame(back)
+  # The frames sampled are read in a single forward pass, and are only kept in memory for the median and for the check that movement occurs in the video (which needs the final background)
+  samplesFramesNumbers = range(firstFrame + (-firstFrame) % backCalculationStep, lastFrame, backCalculationStep)
+  keepSamples = hyperparameters["backgroundExtractionMedian"] or hyperparameters["checkThatMovementOccurInVideo"]
+  samples    = []
+  maxDiff    = 0
+  indMaxDiff = firstFrame
+  frameMaxDiff = None
+  for k, ret, frame in zzVideoReading.readFramesInIncreasingOrder(cap, samplesFramesNumbers, hyperparameters["backgroundExtractionMaxNbFramesGrabbedInsteadOfSeeking"]):
+    if debugExtractBack:
+      print(k)
+    if not(ret):
+      print("couldn't use the frame", k, "for the background extraction")
+      continue
+    if hyperparameters["invertBlackWhiteOnImages"]:
+      frame = 255 - frame
+    frame = getGrayscaleFrame(frame)
+    if keepSamples:
+      samples.append([k, frame])
+    if hyperparameters["backgroundExtractionWithOnlyTwoFrames"]:
+      diff  = np.sum(np.abs(frame - back))
+      if diff > maxDiff:
+        maxDiff      = diff
+        indMaxDiff   = k
+        frameMaxDiff = frame
+    elif not(hyperparameters["backgroundExtractionMedian"]):
       if hyperparameters["extractBackWhiteBackground"]:
-        back = cv2.max(frame, back)
+        cv2.max(frame, back, back)
       else:
-        back = cv2.min(frame, back)
-    else:
-      print("couldn't use the frame", k, "for the background extraction")
+        cv2.min(frame, back, back)
+  
+  if hyperparameters["backgroundExtractionWithOnlyTwoFrames"]:
+    if frameMaxDiff is None:
+      cap.set(1, indMaxDiff)
+      ret, frameMaxDiff = cap.read()
+      if ret:
+        if hyperparameters["invertBlackWhiteOnImages"]:
+          frameMaxDiff = 255 - frameMaxDiff
+        frameMaxDiff = getGrayscaleFrame(frameMaxDiff)
+      else:
+        frameMaxDiff = None
+        print("couldn't use the frame", indMaxDiff, "for the background extraction")
+    if frameMaxDiff is not None:
+      if hyperparameters["extractBackWhiteBackground"]:
+        back = cv2.max(frameMaxDiff, back)
+      else:
+        back = cv2.min(frameMaxDiff, back)
+  elif hyperparameters["backgroundExtractionMedian"] and len(samples):
+    back = np.median(np.array([frame for k, frame in samples]), axis=0, overwrite_input=True).astype(back.dtype)
   
   if hyperparameters["backgroundPreProcessMethod"]:
     back = preprocessBackgroundImage(back, hyperparameters)
   
   if hyperparameters["checkThatMovementOccurInVideo"]:
-    cap.set(1, firstFrame)
-    ret, frame = cap.read()
-    if ret:
-      if hyperparameters["invertBlackWhiteOnImages"]:
-        frame = 255 - frame
-      frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    
+    def removeBackground(frame):
       if hyperparameters["imagePreProcessMethod"]:
         frame = preprocessBackgroundImage(frame, hyperparameters)
       if type(frame[0][0]) == np.ndarray:
         frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
       putToWhite = (frame.astype('int32') >= (back.astype('int32')-hyperparameters["minPixelDiffForBackExtract"]))
       frame[putToWhite] = 255
-    firstImage = frame
+      return frame
+    
+    if len(samples) and samples[0][0] == firstFrame:
+      firstImage = removeBackground(samples[0][1].copy())
+    else:
+      cap.set(1, firstFrame)
+      ret, frame = cap.read()
+      if ret:
+        if hyperparameters["invertBlackWhiteOnImages"]:
+          frame = 255 - frame
+        frame = removeBackground(getGrayscaleFrame(frame))
+      firstImage = frame
     maxDiff    = 0
     indMaxDiff = firstFrame
-    for k in range(firstFrame,lastFrame):
-      if (k % backCalculationStep == 0):
-        cap.set(1, k)
-        ret, frame = cap.read()
-        if ret:
-          if hyperparameters["invertBlackWhiteOnImages"]:
-            frame = 255 - frame
-          frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-          if hyperparameters["imagePreProcessMethod"]:
-            frame = preprocessBackgroundImage(frame, hyperparameters)
-          if type(frame[0][0]) == np.ndarray:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-          putToWhite = (frame.astype('int32') >= (back.astype('int32')-hyperparameters["minPixelDiffForBackExtract"]))
-          frame[putToWhite] = 255
-          if hyperparameters["checkThatMovementOccurInVideoMedianFilterWindow"]:
-            diff  = np.sum(cv2.medianBlur(np.abs(frame - firstImage), hyperparameters["checkThatMovementOccurInVideoMedianFilterWindow"]))
-          else:
-            diff  = np.sum(np.abs(frame - firstImage))
-          if diff > maxDiff:
-            maxDiff    = diff
-            indMaxDiff = k
+    for k, frame in samples:
+      frame = removeBackground(frame)
+      if hyperparameters["checkThatMovementOccurInVideoMedianFilterWindow"]:
+        diff  = np.sum(cv2.medianBlur(np.abs(frame - firstImage), hyperparameters["checkThatMovementOccurInVideoMedianFilterWindow"]))
+      else:
+        diff  = np.sum(np.abs(frame - firstImage))
+      if diff > maxDiff:
+        maxDiff    = diff
+        indMaxDiff = k
     print("checkThatMovementOccurInVideo: max difference is:", maxDiff)
     if maxDiff < hyperparameters["checkThatMovementOccurInVideo"]:
       back[:, :] = 0 # TODO: tracking should NOT RUN after background is set to 0 as it is here
@@ -107,7 +107,7 @@ def getHyperparameters(configFile, videoName, videoPath, argv):
   hyperparameters["fillGapFrameNb"]             = getConfig(config, "fillGapFrameNb", videoPath)
   hyperparameters["minPixelDiffForBackExtract"] = getConfig(config, "minPixelDiffForBackExtract", videoPath)
   hyperparameters["outputFolder"]               = getConfig(config, "outputFolder", videoPath)
-  hyperparameters["videoName"]                  = videoName[0:(len(videoName)-4)] # Need to improve this!
+  hyperparameters["videoName"]                  = videoName if os.path.isdir(videoPath) else videoName[0:(len(videoName)-4)] # Need to improve this!
   hyperparameters["detectBoutMinNbFrames"]      = getConfig(config, "detectBoutMinNbFrames", videoPath)
   hyperparameters["detectBoutMinDist"]          = getConfig(config, "detectBoutMinDist", videoPath)
   hyperparameters["nbRowsOfWells"]              = getConfig(config, "nbRowsOfWells", videoPath)
@@ -247,6 +247,11 @@ def getHyperparameters(configFile, videoName, videoPath, argv):
   hyperparameters["multipleAnimalTrackingAdvanceAlgorithmMarginX"] = getConfig(config, "multipleAnimalTrackingAdvanceAlgorithmMarginX", videoPath)
   hyperparameters["multipleAnimalTrackingAdvanceAlgorithmDist1"] = getConfig(config, "multipleAnimalTrackingAdvanceAlgorithmDist1", videoPath)
   hyperparameters["multipleAnimalTrackingAdvanceAlgorithmDist2"] = getConfig(config, "multipleAnimalTrackingAdvanceAlgorithmDist2", videoPath)
+  hyperparameters["multipleAnimalTrackingAdvanceAlgorithmOptimalLinkage"] = getConfig(config, "multipleAnimalTrackingAdvanceAlgorithmOptimalLinkage", videoPath)
+  
+  hyperparameters["identitiesLinkageMaxDistance"] = getConfig(config, "identitiesLinkageMaxDistance", videoPath)
+  hyperparameters["identitiesLinkageMaxNbFramesDisappeared"] = getConfig(config, "identitiesLinkageMaxNbFramesDisappeared", videoPath)
+  hyperparameters["identitiesLinkageSlidingWindow"] = getConfig(config, "identitiesLinkageSlidingWindow", videoPath)
   
   hyperparameters["perBoutOutput"] = getConfig(config, "perBoutOutput", videoPath)
   hyperparameters["perBoutOutputVideoStartStopFrameMargin"] = getConfig(config, "perBoutOutputVideoStartStopFrameMargin", videoPath)
@@ -308,6 +313,8 @@ def getHyperparameters(configFile, videoName, videoPath, argv):
   hyperparameters["backgroundPreProcessParameters"] = getConfig(config, "backgroundPreProcessParameters", videoPath)
   
   hyperparameters["backgroundExtractionWithOnlyTwoFrames"] = getConfig(config, "backgroundExtractionWithOnlyTwoFrames", videoPath)
+  hyperparameters["backgroundExtractionMedian"] = getConfig(config, "backgroundExtractionMedian", videoPath)
+  hyperparameters["backgroundExtractionMaxNbFramesGrabbedInsteadOfSeeking"] = getConfig(config, "backgroundExtractionMaxNbFramesGrabbedInsteadOfSeeking", videoPath)
   
   hyperparameters["checkThatMovementOccurInVideo"] = getConfig(config, "checkThatMovementOccurInVideo", videoPath)
   hyperparameters["checkThatMovementOccurInVideoMedianFilterWindow"] = getConfig(config, "checkThatMovementOccurInVideoMedianFilterWindow", videoPath)
@@ -346,9 +353,11 @@ def getHyperparameters(configFile, videoName, videoPath, argv):
   hyperparameters["fixedHeadPositionY"] = getConfig(config, "fixedHeadPositionY", videoPath)
   
   hyperparameters["recalculateForegroundImageBasedOnBodyArea"] = getConfig(config, "recalculateForegroundImageBasedOnBodyArea", videoPath)
+  hyperparameters["recalculateForegroundImageBasedOnBodyAreaBisection"] = getConfig(config, "recalculateForegroundImageBasedOnBodyAreaBisection", videoPath)
   
   hyperparameters["detectMouthInsteadOfHeadTwoSides"] = getConfig(config, "detectMouthInsteadOfHeadTwoSides", videoPath)
   hyperparameters["findCenterOfAnimalByIterativelyDilating"] = getConfig(config, "findCenterOfAnimalByIterativelyDilating", videoPath)
+  hyperparameters["findCenterOfAnimalByDistanceTransform"] = getConfig(config, "findCenterOfAnimalByDistanceTransform", videoPath)
   
   hyperparameters["backgroundExtractionForceUseAllVideoFrames"] = getConfig(config, "backgroundExtractionForceUseAllVideoFrames", videoPath)
   
@@ -373,6 +382,14 @@ def getHyperparameters(configFile, videoName, videoPath, argv):
   hyperparameters["groupOfMultipleSameSizeAndShapeEquallySpacedWells"] = getConfig(config, "groupOfMultipleSameSizeAndShapeEquallySpacedWells", videoPath)
   
   hyperparameters["fasterMultiprocessing"] = getConfig(config, "fasterMultiprocessing", videoPath)
+  hyperparameters["fasterMultiprocessing2PlateConnectedComponents"] = getConfig(config, "fasterMultiprocessing2PlateConnectedComponents", videoPath)
+  hyperparameters["fasterMultiprocessingNbWorkers"] = getConfig(config, "fasterMultiprocessingNbWorkers", videoPath)
+  hyperparameters["singleDecodeFrameBroadcast"] = getConfig(config, "singleDecodeFrameBroadcast", videoPath)
+  hyperparameters["singleDecodeFrameBroadcastNbSlots"] = getConfig(config, "singleDecodeFrameBroadcastNbSlots", videoPath)
+  hyperparameters["nbFramesPrefetchedInBackgroundThread"] = getConfig(config, "nbFramesPrefetchedInBackgroundThread", videoPath)
+  hyperparameters["keyFramesSeekIndex"] = getConfig(config, "keyFramesSeekIndex", videoPath)
+  hyperparameters["temporalChunksTrackingNbProcesses"] = getConfig(config, "temporalChunksTrackingNbProcesses", videoPath)
+  hyperparameters["temporalChunksTrackingNbWarmUpFrames"] = getConfig(config, "temporalChunksTrackingNbWarmUpFrames", videoPath)
   
   hyperparameters["copyOriginalVideoToOutputFolderForValidation"] = getConfig(config, "copyOriginalVideoToOutputFolderForValidation", videoPath)
   
@@ -411,6 +428,11 @@ def getHyperparameters(configFile, videoName, videoPath, argv):
   
   hyperparameters["trackingDL"] = getConfig(config, "trackingDL", videoPath)
   hyperparameters["trackingDLdicotomySearchOfOptimalBlobArea"] = getConfig(config, "trackingDLdicotomySearchOfOptimalBlobArea", videoPath)
+  hyperparameters["trackingDLBatchSize"] = getConfig(config, "trackingDLBatchSize", videoPath)
+  hyperparameters["trackingDLNbDataLoaderWorkers"] = getConfig(config, "trackingDLNbDataLoaderWorkers", videoPath)
+  hyperparameters["trackingDLCpuExport"] = getConfig(config, "trackingDLCpuExport", videoPath)
+  hyperparameters["trackingDLCpuExportQuantize"] = getConfig(config, "trackingDLCpuExportQuantize", videoPath)
+  hyperparameters["trackingDLNbThreadsPerProcess"] = getConfig(config, "trackingDLNbThreadsPerProcess", videoPath)
   hyperparameters["applySimpleThresholdOnPredictedMask"] = getConfig(config, "applySimpleThresholdOnPredictedMask", videoPath)
   hyperparameters["simpleThresholdCheckMinForMaxCountour"] = getConfig(config, "simpleThresholdCheckMinForMaxCountour", videoPath)
   
@@ -1,4 +1,5 @@
 from zebrazoom.code.preprocessImage import preprocessImage
+from zebrazoom.videoFormatConversion.zzVideoReading import getGrayscaleFrame
 import numpy as np
 import cv2
 
@@ -39,8 +40,8 @@ def getForegroundImageSequential(cap, videoPath, background, frameNumber, wellNu
   if hyperparameters["imagePreProcessMethod"]:
     frame = preprocessImage(frame, hyperparameters)
   
-  grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-  curFrame = grey[ytop:ytop+lenY, xtop:xtop+lenX]
+  grey = getGrayscaleFrame(frame[ytop:ytop+lenY, xtop:xtop+lenX])
+  curFrame = grey
   
   xHead = trackingHeadTailAllAnimals[0][frameNumber - hyperparameters["firstFrame"] - 1][0][0]
   yHead = trackingHeadTailAllAnimals[0][frameNumber - hyperparameters["firstFrame"] - 1][0][1]
@@ -86,7 +87,7 @@ def getForegroundImageSequential(cap, videoPath, background, frameNumber, wellNu
     nbBlackPixelsMax = int(hyperparameters["adjustMinPixelDiffForBackExtract_nbBlackPixelsMax"])
     while (minPixelDiffForBackExtract > 0) and (countTries < 30) and not(minPixelDiffForBackExtract in minPixel2nbBlackPixels):
       if countTries > 0:
-        curFrame = grey[ytop:ytop+lenY, xtop:xtop+lenX]
+        curFrame = grey
         if hyperparameters["trackOnlyOnROI_halfDiameter"] != 0 and frameNumber != hyperparameters["firstFrame"] and xHead != 0 and yHead != 0:
           curFrame = curFrame[ymin:ymax, xmin:xmax]
         putToWhite = ( curFrame.astype('int32') >= (back.astype('int32') - minPixelDiffForBackExtract) )
@@ -117,7 +118,7 @@ def getForegroundImageSequential(cap, videoPath, background, frameNumber, wellNu
         
     minPixelDiffForBackExtract = best_minPixelDiffForBackExtract
     hyperparameters["minPixelDiffForBackExtractHead"] = minPixelDiffForBackExtract
-    curFrame = grey[ytop:ytop+lenY, xtop:xtop+lenX]
+    curFrame = grey
     if hyperparameters["trackOnlyOnROI_halfDiameter"] != 0 and frameNumber != hyperparameters["firstFrame"] and xHead != 0 and yHead != 0:
       curFrame = curFrame[ymin:ymax, xmin:xmax]
       curFrameInitial = curFrame
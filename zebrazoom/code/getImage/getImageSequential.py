@@ -1,4 +1,5 @@
 from zebrazoom.code.preprocessImage import preprocessImage
+from zebrazoom.videoFormatConversion.zzVideoReading import getGrayscaleFrame
 import numpy as np
 import cv2
 
@@ -27,8 +28,7 @@ def getImageSequential(cap, videoPath, frameNumber, wellNumber, wellPositions, h
   if hyperparameters["imagePreProcessMethod"]:
     frame = preprocessImage(frame, hyperparameters)
   
-  grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-  curFrame = grey[ytop:ytop+lenY, xtop:xtop+lenX]
+  curFrame = getGrayscaleFrame(frame[ytop:ytop+lenY, xtop:xtop+lenX])
   
   if (debug):
     import zebrazoom.code.util as util
@@ -39,7 +39,8 @@ def headEmbededFrameSequential(cap, videoPath, frameNumber, wellNumber, wellPosi
     util.showFrame(frame, title='thres1')
     util.showFrame(thres1, title='thres1')
     
-  frame  = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-  thres1 = cv2.cvtColor(thres1, cv2.COLOR_BGR2GRAY)
+  if len(frame.shape) == 3:
+    frame  = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    thres1 = cv2.cvtColor(thres1, cv2.COLOR_BGR2GRAY)
   
   return [frame, thres1]
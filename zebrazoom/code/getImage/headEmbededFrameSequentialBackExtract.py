@@ -1,4 +1,5 @@
 from zebrazoom.code.preprocessImage import preprocessImage
+from zebrazoom.videoFormatConversion.zzVideoReading import getGrayscaleFrame
 import numpy as np
 import cv2
 
@@ -33,8 +34,11 @@ def headEmbededFrameSequentialBackExtract(cap, videoPath, background, hyperparam
   thres1  = cv2.filter2D(frame,-1,kernel)
   retval, thres1 = cv2.threshold(thres1, 80, 255, cv2.THRESH_BINARY)
     
-  frame  = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-  thres1 = cv2.cvtColor(thres1, cv2.COLOR_BGR2GRAY)
+  if len(frame.shape) == 3:
+    frame  = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    thres1 = cv2.cvtColor(thres1, cv2.COLOR_BGR2GRAY)
+  else:
+    frame  = getGrayscaleFrame(frame)
 
   if (debug):
     import zebrazoom.code.util as util
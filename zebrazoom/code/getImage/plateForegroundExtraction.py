@@ -0,0 +1,46 @@
+import numpy as np
+import cv2
+from zebrazoom.videoFormatConversion.zzVideoReading import getGrayscaleFrame
+
+
+class PlateForegroundExtraction():
+  # Calculates the grayscale image and the foreground image (pixels too close to the background set to white) once for the whole frame
+  # Each well then only takes views of these images, instead of converting and comparing the whole frame again for each well
+
+  def __init__(self):
+    self.foreground    = None
+    self.mask          = None
+    self.backMinusDiff = None
+    self.background    = None
+    self.minPixelDiffForBackExtract = None
+
+  def _prepareBackground(self, background, minPixelDiffForBackExtract):
+    # The saturating uint8 subtraction gives exactly the same foreground as the int32 comparison as long as minPixelDiffForBackExtract is a non negative integer
+    self.background = background
+    self.minPixelDiffForBackExtract = minPixelDiffForBackExtract
+    if background.dtype == np.uint8 and float(minPixelDiffForBackExtract).is_integer() and minPixelDiffForBackExtract >= 0:
+      self.backMinusDiff = np.maximum(background.astype('int32') - int(minPixelDiffForBackExtract), 0).astype(np.uint8)
+    else:
+      self.backMinusDiff = None
+
+  def extract(self, frame, background, minPixelDiffForBackExtract, backgroundChanged=False):
+    # Returns [grey, foreground]: grey is a new image, foreground is overwritten by the next call to extract
+    # backgroundChanged must be set if the background was modified in place since the previous call
+
+    grey = getGrayscaleFrame(frame)
+
+    if backgroundChanged or background is not self.background or minPixelDiffForBackExtract != self.minPixelDiffForBackExtract:
+      self._prepareBackground(background, minPixelDiffForBackExtract)
+    if self.foreground is None or self.foreground.shape != grey.shape:
+      self.foreground = np.empty(grey.shape, np.uint8)
+      self.mask       = np.empty(grey.shape, np.uint8)
+
+    if self.backMinusDiff is not None and self.backMinusDiff.shape == grey.shape and grey.dtype == np.uint8:
+      cv2.compare(grey, self.backMinusDiff, cv2.CMP_GE, self.mask)
+      cv2.max(grey, self.mask, self.foreground)
+      return [grey, self.foreground]
+
+    foreground = grey.copy()
+    putToWhite = ( foreground.astype('int32') >= (background.astype('int32') - minPixelDiffForBackExtract) )
+    foreground[putToWhite] = 255
+    return [grey, foreground]
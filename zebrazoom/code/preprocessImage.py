@@ -90,7 +90,7 @@ def erodeThenMin(img, hyperparameters, imagePreProcessParameters):
   
 def setImageLineToBlack(img, hyperparameters, imagePreProcessParameters):
   
-  img = cv2.line(img, (imagePreProcessParameters[0], imagePreProcessParameters[1]), (imagePreProcessParameters[2], imagePreProcessParameters[3]), (0, 0, 0), imagePreProcessParameters[4])
+  img = cv2.line(img.copy(), (imagePreProcessParameters[0], imagePreProcessParameters[1]), (imagePreProcessParameters[2], imagePreProcessParameters[3]), (0, 0, 0), imagePreProcessParameters[4])
   
   return img
 
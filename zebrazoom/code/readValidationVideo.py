@@ -176,6 +176,7 @@ def readValidationVideo(videoPath, folderName, configFilePath, numWell, numAnima
 
     cap.set(1, l)
     ret, img = cap.read()
+    img = img.copy() # the frame number and the tracking are drawn on the frame
     
     if hyperparameters["imagePreProcessMethod"]:
       img = preprocessImage(img, hyperparameters)
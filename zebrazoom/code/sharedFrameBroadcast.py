@@ -0,0 +1,172 @@
+import multiprocessing as mp
+import numpy as np
+import zebrazoom.videoFormatConversion.zzVideoReading as zzVideoReading
+from zebrazoom.code.trackingFolder.trackingFunctions import trackingUsesGrayscaleFrames
+
+
+def getFramesRangeTrackedPerWell(hyperparameters):
+
+  firstFrame = hyperparameters["firstFrame"]
+  if hyperparameters["firstFrameForTracking"] != -1:
+    firstFrame = hyperparameters["firstFrameForTracking"]
+  lastFrame = hyperparameters["lastFrame"]
+  if int(hyperparameters["onlyDoTheTrackingForThisNumberOfFrames"]) != 0:
+    lastFrame = min(lastFrame, firstFrame + int(hyperparameters["onlyDoTheTrackingForThisNumberOfFrames"]))
+
+  return [firstFrame, lastFrame]
+
+
+def canUseSharedFrameBroadcast(hyperparameters):
+  # The broadcast only serves the frames read sequentially by tracking(), so it is only used when each well process tracks all frames from firstFrame to lastFrame without interaction
+  return hyperparameters["singleDecodeFrameBroadcast"] and not(hyperparameters["trackingDL"]) and not(hyperparameters["fishTailTrackingDifficultBackground"]) and not(hyperparameters["headEmbeded"]) and hyperparameters["debugPauseBetweenTrackAndParamExtract"] != "justExtractParamFromPreviousTrackData" and hyperparameters["adjustFreelySwimTracking"] == 0 and hyperparameters["adjustFreelySwimTrackingAutomaticParameters"] == 0 and hyperparameters["adjustHeadEmbededTracking"] == 0 and not(hyperparameters["adjustHeadEmbeddedEyeTracking"])
+
+
+class SharedFrameReader():
+  # Given to a well process instead of its own VideoCapture: frames read sequentially come from the shared ring buffer filled by SharedFrameBroadcaster, any other access falls back to a private VideoCapture
+
+  def __init__(self, videoPath, consumerId, ringBuffer, slotsRet, detached, emptySlots, filledSlots, nbSlots, frameShape, frameDtype, firstFrame, lastFrame, videoInfo, copyFrames, grayscale):
+    self.videoPath        = videoPath
+    self.consumerId       = consumerId
+    self.ringBuffer       = ringBuffer
+    self.slotsRet         = slotsRet
+    self.detached         = detached
+    self.emptySlots       = emptySlots
+    self.filledSlots      = filledSlots
+    self.nbSlots          = nbSlots
+    self.frameShape       = frameShape
+    self.frameDtype       = frameDtype
+    self.firstFrame       = firstFrame
+    self.lastFrame        = lastFrame
+    self.videoInfo        = videoInfo
+    self.copyFrames       = copyFrames
+    self.grayscale        = grayscale
+    self.nextFrame        = firstFrame
+    self.holdingSlot      = False
+    self.frames           = None
+    self.privateCap       = None
+
+  def __getstate__(self):
+    state = self.__dict__.copy()
+    state["frames"] = None
+    return state
+
+  def _releaseSlot(self):
+    if self.holdingSlot:
+      self.emptySlots.release()
+      self.holdingSlot = False
+
+  def _detach(self):
+    if not(self.detached[self.consumerId]):
+      self.detached[self.consumerId] = 1
+      self._releaseSlot()
+      self.privateCap = zzVideoReading.VideoCapture(self.videoPath, grayscale=self.grayscale)
+      self.privateCap.set(1, self.nextFrame)
+
+  def isOpened(self):
+    return True
+
+  def get(self, idOfInfoRequested):
+    if self.privateCap is not None:
+      return self.privateCap.get(idOfInfoRequested)
+    if idOfInfoRequested == 1:
+      return self.nextFrame
+    return self.videoInfo[idOfInfoRequested] if idOfInfoRequested in self.videoInfo else 0
+
+  def set(self, propToChange, numImage):
+    if self.privateCap is None and propToChange == 1 and int(numImage) == self.nextFrame:
+      return True
+    self._detach()
+    return self.privateCap.set(propToChange, numImage)
+
+  def read(self):
+    if self.privateCap is not None:
+      return self.privateCap.read()
+    self._releaseSlot()
+    if self.nextFrame > self.lastFrame:
+      self._detach()
+      return self.privateCap.read()
+    if self.frames is None:
+      self.frames = np.frombuffer(self.ringBuffer, dtype=self.frameDtype).reshape((self.nbSlots,) + self.frameShape)
+      self.frames.flags.writeable = False # the same frame is shared with the other wells processes
+    self.filledSlots.acquire()
+    self.holdingSlot = True
+    slot = (self.nextFrame - self.firstFrame) % self.nbSlots
+    self.nextFrame += 1
+    if not(self.slotsRet[slot]):
+      return [False, []]
+    if self.copyFrames:
+      return [True, self.frames[slot].copy()]
+    return [True, self.frames[slot]]
+
+  def release(self):
+    if self.privateCap is not None:
+      self.privateCap.release()
+    elif not(self.detached[self.consumerId]):
+      self.detached[self.consumerId] = 1
+      self._releaseSlot()
+
+
+class SharedFrameBroadcaster():
+  # Decodes each frame of the video only once and shares it with all the well processes through a ring buffer in shared memory
+
+  def __init__(self, videoPath, hyperparameters, nbConsumers):
+
+    [self.firstFrame, self.lastFrame] = getFramesRangeTrackedPerWell(hyperparameters)
+    self.videoPath   = videoPath
+    self.nbConsumers = nbConsumers
+    self.nbSlots     = max(2, int(hyperparameters["singleDecodeFrameBroadcastNbSlots"]))
+    self.copyFrames  = bool(hyperparameters["imagePreProcessMethod"]) # some pre-processing methods modify the frame in place
+    self.grayscale   = trackingUsesGrayscaleFrames(hyperparameters)
+
+    cap = zzVideoReading.VideoCapture(videoPath, grayscale=self.grayscale)
+    self.videoInfo = {idOfInfoRequested: cap.get(idOfInfoRequested) for idOfInfoRequested in [3, 4, 5, 7]}
+    cap.set(1, self.firstFrame)
+    ret, frame = cap.read()
+    cap.release()
+    if not(ret):
+      raise ValueError("Could not read the frame " + str(self.firstFrame) + " of " + videoPath + " to initialize the shared frames buffer")
+    self.frameShape = frame.shape
+    self.frameDtype = frame.dtype
+
+    self.ringBuffer       = mp.RawArray('B', self.nbSlots * frame.nbytes)
+    self.slotsRet         = mp.RawArray('b', self.nbSlots)
+    self.detached         = mp.RawArray('b', nbConsumers)
+    self.emptySlots       = [mp.Semaphore(self.nbSlots) for consumerId in range(0, nbConsumers)]
+    self.filledSlots      = [mp.Semaphore(0) for consumerId in range(0, nbConsumers)]
+    self.frames           = np.frombuffer(self.ringBuffer, dtype=self.frameDtype).reshape((self.nbSlots,) + self.frameShape)
+
+  def getReader(self, consumerId):
+    return SharedFrameReader(self.videoPath, consumerId, self.ringBuffer, self.slotsRet, self.detached, self.emptySlots[consumerId], self.filledSlots[consumerId], self.nbSlots, self.frameShape, self.frameDtype, self.firstFrame, self.lastFrame, self.videoInfo, self.copyFrames, self.grayscale)
+
+  def _waitForFreeSlot(self, consumerId, processes):
+    while not(self.detached[consumerId]):
+      if self.emptySlots[consumerId].acquire(timeout=0.5):
+        return
+      if processes is not None and not(processes[consumerId].is_alive()):
+        self.detached[consumerId] = 1
+
+  def broadcast(self, processes=None):
+
+    cap = zzVideoReading.VideoCapture(self.videoPath, grayscale=self.grayscale)
+    cap.set(1, self.firstFrame)
+
+    for i in range(self.firstFrame, self.lastFrame + 1):
+
+      slot = (i - self.firstFrame) % self.nbSlots
+      for consumerId in range(0, self.nbConsumers):
+        self._waitForFreeSlot(consumerId, processes)
+
+      if all(self.detached):
+        break
+
+      ret, frame = cap.read()
+      if ret and frame.shape == self.frameShape:
+        self.frames[slot] = frame
+        self.slotsRet[slot] = 1
+      else:
+        self.slotsRet[slot] = 0
+
+      for consumerId in range(0, self.nbConsumers):
+        self.filledSlots[consumerId].release()
+
+    cap.release()
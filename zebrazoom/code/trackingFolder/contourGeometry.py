@@ -0,0 +1,99 @@
+import math
+import cv2
+import numpy as np
+
+
+def findClosestContourPoint(contour, x, y):
+  # Index of the point of the contour the closest to (x, y) (the first one in case of equality)
+  Pts = contour[:, 0]
+  return int(np.argmin(np.sqrt((Pts[:, 0] - x)**2 + (Pts[:, 1] - y)**2)))
+
+
+def pointsPolygonTest(contour, points):
+  # Signed distances of several points to a contour (positive inside, negative outside and 0 on the contour), calculated for all the points at once in the same way as cv2.pointPolygonTest(contour, point, True) does for each point
+  vertices         = contour[:, 0].astype(np.float32)
+  previousVertices = np.roll(vertices, 1, axis=0)
+  points = np.asarray(points, dtype=np.float32).reshape((-1, 1, 2))
+
+  edges          = (vertices - previousVertices).astype(np.float64)
+  fromPrevVertex = (points - previousVertices).astype(np.float64)
+  fromVertex     = (points - vertices).astype(np.float64)
+  dx  = edges[:, 0]
+  dy  = edges[:, 1]
+  dx1 = fromPrevVertex[:, :, 0]
+  dy1 = fromPrevVertex[:, :, 1]
+  dx2 = fromVertex[:, :, 0]
+  dy2 = fromVertex[:, :, 1]
+
+  # Squared distance to each edge
+  cross       = dy1*dx - dx1*dy
+  beforeEdge  = dx1*dx + dy1*dy <= 0
+  afterEdge   = np.logical_and(np.logical_not(beforeEdge), dx2*dx + dy2*dy >= 0)
+  alongEdge   = np.logical_not(np.logical_or(beforeEdge, afterEdge))
+  distNum     = np.where(beforeEdge, dx1*dx1 + dy1*dy1, np.where(afterEdge, dx2*dx2 + dy2*dy2, cross*cross))
+  distDenom   = np.where(alongEdge, dx*dx + dy*dy, 1)
+  minDistance = np.sqrt(np.min(distNum / distDenom, axis=1))
+
+  # Inside / outside: parity of the number of edges crossed by a horizontal ray going from the point towards the right
+  pointsX = points[:, :, 0]
+  pointsY = points[:, :, 1]
+  notCrossed = np.logical_or.reduce((np.logical_and(previousVertices[:, 1] <= pointsY, vertices[:, 1] <= pointsY), np.logical_and(previousVertices[:, 1] > pointsY, vertices[:, 1] > pointsY), np.logical_and(previousVertices[:, 0] < pointsX, vertices[:, 0] < pointsX)))
+  crossed = np.logical_and(np.logical_not(notCrossed), np.where(dy < 0, -cross, cross) > 0)
+  inside  = np.count_nonzero(crossed, axis=1) % 2 == 1
+
+  return np.where(inside, minDistance, -minDistance)
+
+
+def simpleOptimalValueSearch(PtClosest, contour, unitVector, lenX, lenY):
+  # Searches for the point the furthest inside the contour along unitVector, starting from PtClosest
+
+  # All the candidate points are tested at once
+  maxFactor = 20
+  candidates = np.array([(PtClosest + factor * unitVector).astype(int) for factor in range(1, maxFactor + 1)])
+  distances  = pointsPolygonTest(contour, candidates)
+
+  factor = 0
+  dist = 1
+  maxDist = 0
+  indMax = 0
+  testCenter = PtClosest + factor * unitVector
+  while (dist > 0) and (factor < maxFactor) and (testCenter[0] >= 0) and (testCenter[1] >= 0) and (testCenter[0] < lenX) and (testCenter[1] < lenY):
+    factor = factor + 1
+    testCenter = candidates[factor - 1]
+    dist = distances[factor - 1]
+    if dist > maxDist:
+      maxDist = dist
+      indMax  = factor
+
+  testCenter = PtClosest + indMax * unitVector
+  testCenter = testCenter.astype(int)
+
+  return testCenter
+
+
+def reajustCenterOfMassIfNecessary(contour, x, y, lenX, lenY, searchFurthestPointInside=False):
+  # If (x, y) is outside of the contour, moves it inside the contour, next to the point of the contour the closest to it
+  inside = cv2.pointPolygonTest(contour, (float(x), float(y)), True)
+  if inside < 0:
+
+    PtClosest = contour[findClosestContourPoint(contour, x, y)][0]
+    unitVector = np.array([PtClosest[0] - x, PtClosest[1] - y])
+    unitVectorLength = math.sqrt(unitVector[0]**2 + unitVector[1]**2)
+    unitVector[0] = unitVector[0] / unitVectorLength
+    unitVector[1] = unitVector[1] / unitVectorLength
+    if not(searchFurthestPointInside):
+      # Takes the first point inside the contour (from 5 to 2 times unitVector away from PtClosest), all the candidate points being tested at once
+      candidates = [(PtClosest + 5 * unitVector).astype(int)] + [PtClosest + factor * unitVector for factor in range(4, 1, -1)]
+      distances  = pointsPolygonTest(contour, candidates)
+      insideCandidates = np.nonzero(distances > 0)[0]
+      if len(insideCandidates):
+        testCenter = candidates[insideCandidates[0]]
+      else:
+        testCenter = PtClosest + 1 * unitVector
+    else:
+      testCenter = simpleOptimalValueSearch(PtClosest, contour, unitVector, lenX, lenY)
+
+    x = testCenter[0]
+    y = testCenter[1]
+
+  return [x, y]
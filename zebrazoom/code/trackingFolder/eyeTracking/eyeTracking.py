@@ -14,6 +14,43 @@ def eyeTrackingHeadEmbedded(animalId, i, firstFrame, frame, hyperparameters, thr
   if hyperparameters["eyeTrackingHeadEmbeddedWithEllipse"]:
     return eyeTrackingHeadEmbeddedEllipse(animalId, i, firstFrame, frame, hyperparameters, thresh1, trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingEyesAllAnimals, leftEyeCoordinate, rightEyeCoordinate, widgets)
 
+segmentsMasksCache = {}
+def getSegmentsMasks(shape, headingLineHalfDiameter, headingLineWidth, angleOptions, key):
+  # Flattened masks (one per row) of the segments drawn through the center of an eye crop of the given shape for each of the angle options, calculated only once and then reused on all frames
+  key = (shape, headingLineHalfDiameter, headingLineWidth, key)
+  if key not in segmentsMasksCache:
+    masks = np.zeros((len(angleOptions), shape[0] * shape[1]))
+    for j, angleOption in enumerate(angleOptions):
+      startPoint = (int(headingLineHalfDiameter - headingLineHalfDiameter * math.cos(angleOption)), int(headingLineHalfDiameter - headingLineHalfDiameter * math.sin(angleOption)))
+      endPoint   = (int(headingLineHalfDiameter + headingLineHalfDiameter * math.cos(angleOption)), int(headingLineHalfDiameter + headingLineHalfDiameter * math.sin(angleOption)))
+      mask = cv2.line(np.zeros(shape, np.uint8), startPoint, endPoint, (1), headingLineWidth)
+      masks[j] = mask.flatten()
+    segmentsMasksCache[key] = masks
+  return segmentsMasksCache[key]
+
+def findEyeAngleWithSegment(forSpecificEye, headingLineHalfDiameter, headingLineWidth):
+  # Finds the angle of the segment which, once drawn in black on the eye crop, leaves the highest sum of pixels (i.e. the segment covering the lowest sum of pixels): nTries angles are first tested, then nTries2 angles around the best one
+  # The sums left by all the angles of each step are calculated at once with the product of the bank of masks of the segments with the flattened crop
+  pixels   = forSpecificEye.flatten().astype(np.float64)
+  totalSum = np.sum(pixels)
+  pixelSum  = 0
+  bestAngle = 0
+  bestIdx   = 0
+  nTries    = 20
+  angleOptions = [j * (math.pi / nTries) for j in range(0, nTries)]
+  nbWhitePixels = totalSum - getSegmentsMasks(forSpecificEye.shape, headingLineHalfDiameter, headingLineWidth, angleOptions, -1) @ pixels
+  if len(nbWhitePixels) and np.max(nbWhitePixels) > pixelSum:
+    bestIdx   = int(np.argmax(nbWhitePixels))
+    pixelSum  = nbWhitePixels[bestIdx]
+    bestAngle = angleOptions[bestIdx]
+  bestAngle1 = bestAngle
+  nTries2     = 50
+  angleOptions = [bestAngle1 - ((math.pi / nTries) / 2) + ((j2 / nTries2) * (math.pi / nTries)) for j2 in range(0, nTries2)]
+  nbWhitePixels = totalSum - getSegmentsMasks(forSpecificEye.shape, headingLineHalfDiameter, headingLineWidth, angleOptions, bestIdx) @ pixels
+  if len(nbWhitePixels) and np.max(nbWhitePixels) > pixelSum:
+    bestAngle = angleOptions[int(np.argmax(nbWhitePixels))]
+  return bestAngle
+
 def eyeTrackingHeadEmbeddedSegment(animalId, i, firstFrame, frame, hyperparameters, thresh1, trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingEyesAllAnimals, leftEyeCoordinate, rightEyeCoordinate, widgets):
   
   headingLineHalfDiameter = hyperparameters["eyeTrackingHeadEmbeddedHalfDiameter"]
@@ -34,31 +71,7 @@ def eyeTrackingHeadEmbeddedSegment(animalId, i, firstFrame, frame, hyperparamete
   for eyeIdx, eyeCoordinate in enumerate([leftEyeCoordinate, rightEyeCoordinate]):
     headingLineWidth = headingLineWidthArray[eyeIdx]
     forSpecificEye = forEye[int(eyeCoordinate[1]-headingLineHalfDiameter):int(eyeCoordinate[1]+headingLineHalfDiameter), int(eyeCoordinate[0]-headingLineHalfDiameter):int(eyeCoordinate[0]+headingLineHalfDiameter)]
-    pixelSum  = 0
-    bestAngle = 0
-    nTries    = 20
-    for j in range(0, nTries):
-      angleOption = j * (math.pi / nTries)
-      startPoint = (int(headingLineHalfDiameter - headingLineHalfDiameter * math.cos(angleOption)), int(headingLineHalfDiameter - headingLineHalfDiameter * math.sin(angleOption)))
-      endPoint   = (int(headingLineHalfDiameter + headingLineHalfDiameter * math.cos(angleOption)), int(headingLineHalfDiameter + headingLineHalfDiameter * math.sin(angleOption)))
-      testImage  = forSpecificEye.copy()
-      testImage  = cv2.line(testImage, startPoint, endPoint, (0), headingLineWidth)
-      nbWhitePixels = np.sum(testImage)
-      if nbWhitePixels > pixelSum:
-        pixelSum  = nbWhitePixels
-        bestAngle = angleOption
-    bestAngle1 = bestAngle
-    nTries2     = 50
-    for j2 in range(0, nTries2):
-      angleOption = bestAngle1 - ((math.pi / nTries) / 2) + ((j2 / nTries2) * (math.pi / nTries))
-      startPoint = (int(headingLineHalfDiameter - headingLineHalfDiameter * math.cos(angleOption)), int(headingLineHalfDiameter - headingLineHalfDiameter * math.sin(angleOption)))
-      endPoint   = (int(headingLineHalfDiameter + headingLineHalfDiameter * math.cos(angleOption)), int(headingLineHalfDiameter + headingLineHalfDiameter * math.sin(angleOption)))
-      testImage  = forSpecificEye.copy()
-      testImage  = cv2.line(testImage, startPoint, endPoint, (0), headingLineWidth)
-      nbWhitePixels = np.sum(testImage)
-      if nbWhitePixels > pixelSum:
-        pixelSum  = nbWhitePixels
-        bestAngle = angleOption
+    bestAngle = findEyeAngleWithSegment(forSpecificEye, headingLineHalfDiameter, headingLineWidth)
     angle.append(bestAngle)
   
   leftEyeAngle  = angle[0]
@@ -99,6 +112,63 @@ def eyeTrackingHeadEmbeddedSegment(animalId, i, firstFrame, frame, hyperparamete
   return trackingEyesAllAnimals
 
 
+def getEyeContours(threshEye, offset=(0, 0)):
+  # Contours of the thresholded eye image with their areas and the (integer) coordinates of their centers
+  contours, hierarchy = cv2.findContours(threshEye, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE, offset=offset)
+  areas   = np.zeros(len(contours))
+  centers = np.zeros((len(contours), 2), dtype=int)
+  for idx, contour in enumerate(contours):
+    areas[idx] = cv2.contourArea(contour)
+    M = cv2.moments(contour)
+    if M['m00']:
+      centers[idx] = [int(M['m10']/M['m00']), int(M['m01']/M['m00'])]
+  return [contours, areas, centers]
+
+def getClosestContours(contours, centers, candidates, eyesCoordinates):
+  # For each eye, the candidate contour whose center is the closest to the eye coordinate (the first one in case of equality) and its squared distance to the eye coordinate
+  closestContours = []
+  for eyeCoordinate in eyesCoordinates:
+    dist = (eyeCoordinate[0] - centers[candidates, 0])**2 + (eyeCoordinate[1] - centers[candidates, 1])**2
+    closestContours.append([contours[candidates[np.argmin(dist)]], np.min(dist)])
+  return closestContours
+
+eyesRegionCache = {}
+def getEyesContours(threshEye, leftEyeCoordinate, rightEyeCoordinate, animalId):
+  # Contours of the left and right eyes: the contours with an area lower than 90% of the image whose centers are the closest to the eye coordinates (0 when there is no such contour)
+  # The eyes of head embedded animals stay in the same place: findContours is first run only on a region around the eyes contours of the previous frame
+  # That result is kept when, for each eye, both the contour found and the disc centered on the eye coordinate going through the center of that contour lie inside the region (the contours crossing the boundary of the region are ignored), otherwise the whole image is used
+  eyesCoordinates = [leftEyeCoordinate, rightEyeCoordinate]
+  maxArea = len(threshEye) * len(threshEye[0]) * 0.9
+  key = (animalId, threshEye.shape)
+  if key in eyesRegionCache:
+    [xmin, ymin, xmax, ymax] = eyesRegionCache[key]
+    threshRegion = threshEye[ymin:ymax, xmin:xmax].copy()
+    threshRegion[0,:] = 255
+    threshRegion[len(threshRegion)-1,:] = 255
+    threshRegion[:,0] = 255
+    threshRegion[:,len(threshRegion[0])-1] = 255
+    [contours, areas, centers] = getEyeContours(threshRegion, (xmin, ymin))
+    boundingRects = np.array([cv2.boundingRect(contour) for contour in contours]).reshape(-1, 4)
+    candidates = np.nonzero((areas < maxArea) & (boundingRects[:, 0] > xmin) & (boundingRects[:, 1] > ymin) & (boundingRects[:, 0] + boundingRects[:, 2] < xmax - 1) & (boundingRects[:, 1] + boundingRects[:, 3] < ymax - 1))[0]
+    if len(candidates):
+      closestContours = getClosestContours(contours, centers, candidates, eyesCoordinates)
+      if all(eyeCoordinate[0] - math.sqrt(dist) > xmin and eyeCoordinate[1] - math.sqrt(dist) > ymin and eyeCoordinate[0] + math.sqrt(dist) < xmax - 1 and eyeCoordinate[1] + math.sqrt(dist) < ymax - 1 for eyeCoordinate, [contour, dist] in zip(eyesCoordinates, closestContours)):
+        return [contour for contour, dist in closestContours]
+  
+  [contours, areas, centers] = getEyeContours(threshEye)
+  candidates = np.nonzero(areas < maxArea)[0]
+  if not len(candidates):
+    eyesRegionCache.pop(key, None)
+    return [0, 0]
+  eyesContours = [contour for contour, dist in getClosestContours(contours, centers, candidates, eyesCoordinates)]
+  
+  # Region of the next frame: the bounding box of the eyes contours and of the eye coordinates, with a margin of the size of the biggest eye contour
+  points = np.concatenate([contour.reshape(-1, 2) for contour in eyesContours] + [np.array(eyesCoordinates, dtype=int)])
+  margin = max(max(cv2.boundingRect(contour)[2:]) for contour in eyesContours)
+  eyesRegionCache[key] = [max(int(np.min(points[:, 0])) - margin, 0), max(int(np.min(points[:, 1])) - margin, 0), min(int(np.max(points[:, 0])) + margin + 1, len(threshEye[0])), min(int(np.max(points[:, 1])) + margin + 1, len(threshEye))]
+  
+  return eyesContours
+
 def eyeTrackingHeadEmbeddedEllipse(animalId, i, firstFrame, frame, hyperparameters, thresh1, trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingEyesAllAnimals, leftEyeCoordinate, rightEyeCoordinate, widgets):
   
   if hyperparameters["improveContrastForEyeDetectionOfHeadEmbedded"]:
@@ -123,30 +193,8 @@ def eyeTrackingHeadEmbeddedEllipse(animalId, i, firstFrame, frame, hyperparamete
   threshEye[:,0] = 255
   threshEye[:,len(threshEye[0])-1] = 255
   
-  contourLeft  = 0
-  contourRight = 0
+  [contourLeft, contourRight] = getEyesContours(threshEye, leftEyeCoordinate, rightEyeCoordinate, animalId)
   
-  contours, hierarchy = cv2.findContours(threshEye, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-  maxLeft  = 1000000000000000000000000000
-  maxRight = 1000000000000000000000000000
-  maxArea  = len(threshEye) * len(threshEye[0]) * 0.9
-  for contour in contours:
-    area = cv2.contourArea(contour)
-    M = cv2.moments(contour)
-    if M['m00']:
-      cx = int(M['m10']/M['m00'])
-      cy = int(M['m01']/M['m00'])
-    else:
-      cx = 0
-      cy = 0
-    if area < maxArea:
-      if (leftEyeCoordinate[0] - cx)**2 + (leftEyeCoordinate[1] - cy)**2 < maxLeft:
-        maxLeft  = (leftEyeCoordinate[0] - cx)**2 + (leftEyeCoordinate[1] - cy)**2
-        contourLeft  = contour
-      if (rightEyeCoordinate[0] - cx)**2 + (rightEyeCoordinate[1] - cy)**2 < maxRight:
-        maxRight = (rightEyeCoordinate[0] - cx)**2 + (rightEyeCoordinate[1] - cy)**2
-        contourRight = contour
-    
   # Finding the (X, Y) coordinates and the angle of each of the two eyes
   eyeAngle = [0, 0]
   eyeX = [leftEyeCoordinate[0], rightEyeCoordinate[0]]
@@ -9,59 +9,8 @@ import zebrazoom.code.util as util
 from zebrazoom.code.trackingFolder.headTrackingHeadingCalculationFolder.headTrackingHeadingCalculation import headTrackingHeadingCalculation
 from zebrazoom.code.trackingFolder.tailTracking import tailTracking
 from zebrazoom.code.trackingFolder.debugTracking import debugTracking
+from zebrazoom.code.trackingFolder.contourGeometry import reajustCenterOfMassIfNecessary
 
-def simpleOptimalValueSearch(PtClosest, contour, unitVector, lenX, lenY):
-  
-  factor = 0
-  dist = 1
-  maxDist = 0
-  indMax = 0
-  testCenter = PtClosest + factor * unitVector
-  while (dist > 0) and (factor < 20) and (testCenter[0] >= 0) and (testCenter[1] >= 0) and (testCenter[0] < lenX) and (testCenter[1] < lenY):
-    factor = factor + 1
-    testCenter = PtClosest + factor * unitVector
-    testCenter = testCenter.astype(int)
-    dist = cv2.pointPolygonTest(contour, (testCenter[0], testCenter[1]), True)
-    if dist > maxDist:
-      maxDist = dist
-      indMax  = factor
-  
-  testCenter = PtClosest + indMax * unitVector
-  testCenter = testCenter.astype(int)
-  
-  return testCenter
-
-def reajustCenterOfMassIfNecessary(contour, x, y, lenX, lenY):
-  inside = cv2.pointPolygonTest(contour, (x, y), True)
-  if inside < 0:
-    
-    minDist = 100000000000000
-    indMin  = 0
-    for i in range(0, len(contour)):
-      Pt = contour[i][0]
-      dist = math.sqrt((Pt[0] - x)**2 + (Pt[1] - y)**2)
-      if dist < minDist:
-        minDist = dist
-        indMin  = i
-    PtClosest = contour[indMin][0]
-    unitVector = np.array([PtClosest[0] - x, PtClosest[1] - y])
-    unitVectorLength = math.sqrt(unitVector[0]**2 + unitVector[1]**2)
-    unitVector[0] = unitVector[0] / unitVectorLength
-    unitVector[1] = unitVector[1] / unitVectorLength
-    if False:
-      factor = 5
-      testCenter = PtClosest + factor * unitVector
-      testCenter = testCenter.astype(int)
-      while (cv2.pointPolygonTest(contour, (testCenter[0], testCenter[1]), True) <= 0) and (factor > 1):
-        factor = factor - 1
-        testCenter = PtClosest + factor * unitVector
-    else:
-      testCenter = simpleOptimalValueSearch(PtClosest, contour, unitVector, lenX, lenY)
-    
-    x = testCenter[0]
-    y = testCenter[1]
-  
-  return [x, y]
   
 def fillWhiteHoles(frame):
   
@@ -299,7 +248,7 @@ def fishTailTrackingDifficultBackground(videoPath, wellNumber, wellPositions, hy
             M = cv2.moments(contour)
             cx = int(M['m10']/M['m00'])
             cy = int(M['m01']/M['m00'])
-            [cx, cy] = reajustCenterOfMassIfNecessary(contour, cx, cy, len(frame[0]), len(frame))
+            [cx, cy] = reajustCenterOfMassIfNecessary(contour, cx, cy, len(frame[0]), len(frame), True)
             if math.sqrt((previousCenterDetectedXROICoordinates - cx)**2 + (previousCenterDetectedYROICoordinates - cy)**2) < distanceToPreviousCenterDetected:
               newCenterDetectedX_ROICordinates = cx
               newCenterDetectedY_ROICordinates = cy
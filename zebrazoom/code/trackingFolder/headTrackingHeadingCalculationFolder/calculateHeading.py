@@ -11,41 +11,34 @@ def computeHeading(thresh1, x, y, headSize, hyperparameters):
     print("Setting headSize to 25 instead of -1, this may be a problem in some cases")
     headSize = 25 # This was introduced to fix bug when config file creation for center of mass only tracking 16/11/22
   
-  videoWidth  = hyperparameters["videoWidth"]
-  videoHeight = hyperparameters["videoHeight"]
-  
-  x = x + int(headSize)
-  y = y + int(headSize)
-  
-  paddedImage = np.zeros((len(thresh1) + 2 * int(headSize), len(thresh1[0]) + 2 * int(headSize)))
-  paddedImage[:, :] = 255
-  paddedImage[int(headSize):len(thresh1)+int(headSize), int(headSize):len(thresh1[0])+int(headSize)] = thresh1
-  thresh1 = paddedImage
-  
-  thresh1 = thresh1.astype(np.uint8)
-
-  ymin  = y - headSize
-  ymax  = y + headSize
-  xmin  = x - headSize
-  xmax  = x + headSize
-  
-  img = thresh1[int(ymin):int(ymax), int(xmin):int(xmax)]
+  # Window of size 2*headSize around the head in the image thresh1 surrounded by a white margin of int(headSize) pixels, taken directly from thresh1 (without padding the whole image)
+  margin = int(headSize)
+  ymin = max(int(y + margin - headSize), 0)
+  ymax = min(int(y + margin + headSize), len(thresh1) + 2 * margin)
+  xmin = max(int(x + margin - headSize), 0)
+  xmax = min(int(x + margin + headSize), len(thresh1[0]) + 2 * margin)
+  
+  img = np.zeros((ymax - ymin, xmax - xmin), np.uint8)
+  img[:, :] = 255
+  ymin2 = max(ymin - margin, 0)
+  ymax2 = min(ymax - margin, len(thresh1))
+  xmin2 = max(xmin - margin, 0)
+  xmax2 = min(xmax - margin, len(thresh1[0]))
+  if ymin2 < ymax2 and xmin2 < xmax2:
+    img[ymin2 + margin - ymin:ymax2 + margin - ymin, xmin2 + margin - xmin:xmax2 + margin - xmin] = thresh1[ymin2:ymax2, xmin2:xmax2]
   
   img[0,:] = 255
   img[len(img)-1,:] = 255
   img[:,0] = 255
   img[:,len(img[0])-1] = 255
   
-  y, x = np.nonzero(img)
-  x = x - np.mean(x)
-  y = y - np.mean(y)
-  coords = np.vstack([x, y])
-  cov = np.cov(coords)
+  # Orientation of the eigenvector with the largest eigenvalue of the covariance matrix of the nonzero pixels, the covariance matrix being calculated from the (integer) raw moments of the window instead of from the coordinates of all the pixels
+  # np.linalg.eig is still used on that 2x2 matrix so that the sign of the eigenvector, and so the direction along the main axis, stays the same
+  M = cv2.moments(img, True)
+  cov = np.array([[M['m00'] * M['m20'] - M['m10']**2, M['m00'] * M['m11'] - M['m10'] * M['m01']], [M['m00'] * M['m11'] - M['m10'] * M['m01'], M['m00'] * M['m02'] - M['m01']**2]]) / (M['m00'] * (M['m00'] - 1))
   evals, evecs = np.linalg.eig(cov)
   sort_indices = np.argsort(evals)[::-1]
   x_v1, y_v1 = evecs[:, sort_indices[0]]  # Eigenvector with largest eigenvalue
-  x_v2, y_v2 = evecs[:, sort_indices[1]]
-  scale = 20
   theta = calculateAngle(0, 0, x_v1, y_v1)
   theta = (theta - math.pi/2) % (2 * math.pi)
   
@@ -2,61 +2,8 @@ import math
 import cv2
 import numpy as np
 from zebrazoom.code.trackingFolder.headTrackingHeadingCalculationFolder.calculateHeading import calculateHeadingSimple, calculateHeading
+from zebrazoom.code.trackingFolder.contourGeometry import reajustCenterOfMassIfNecessary
 
-def simpleOptimalValueSearch(PtClosest, contour, unitVector, lenX, lenY):
-  
-  factor = 0
-  dist = 1
-  maxDist = 0
-  indMax = 0
-  testCenter = PtClosest + factor * unitVector
-  while (dist > 0) and (factor < 20) and (testCenter[0] >= 0) and (testCenter[1] >= 0) and (testCenter[0] < lenX) and (testCenter[1] < lenY):
-    factor = factor + 1
-    testCenter = PtClosest + factor * unitVector
-    testCenter = testCenter.astype(int)
-    dist = cv2.pointPolygonTest(contour, (testCenter[0], testCenter[1]), True)
-    if dist > maxDist:
-      maxDist = dist
-      indMax  = factor
-  
-  testCenter = PtClosest + indMax * unitVector
-  testCenter = testCenter.astype(int)
-  
-  return testCenter
-  
-
-def reajustCenterOfMassIfNecessary(contour, x, y, lenX, lenY):
-  inside = cv2.pointPolygonTest(contour, (x, y), True)
-  if inside < 0:
-    
-    minDist = 100000000000000
-    indMin  = 0
-    for i in range(0, len(contour)):
-      Pt = contour[i][0]
-      dist = math.sqrt((Pt[0] - x)**2 + (Pt[1] - y)**2)
-      if dist < minDist:
-        minDist = dist
-        indMin  = i
-    PtClosest = contour[indMin][0]
-    unitVector = np.array([PtClosest[0] - x, PtClosest[1] - y])
-    unitVectorLength = math.sqrt(unitVector[0]**2 + unitVector[1]**2)
-    unitVector[0] = unitVector[0] / unitVectorLength
-    unitVector[1] = unitVector[1] / unitVectorLength
-    if True:
-      factor = 5
-      testCenter = PtClosest + factor * unitVector
-      testCenter = testCenter.astype(int)
-      while (cv2.pointPolygonTest(contour, (testCenter[0], testCenter[1]), True) <= 0) and (factor > 1):
-        factor = factor - 1
-        testCenter = PtClosest + factor * unitVector
-    else:
-      testCenter = simpleOptimalValueSearch(PtClosest, contour, unitVector, lenX, lenY)
-    
-    x = testCenter[0]
-    y = testCenter[1]
-  
-  return [x, y]
-  
 def findCenterByIterativelyDilating(initialContour, lenX, lenY):
   x = 0
   y = 0
@@ -96,6 +43,53 @@ def findCenterByIterativelyDilating(initialContour, lenX, lenY):
       x = int(M['m10']/M['m00'])
       y = int(M['m01']/M['m00'])
   return [x, y]
+
+
+def findCenterByDistanceTransform(initialContour, lenX, lenY):
+  # Same result as findCenterByIterativelyDilating, without the iterative dilations: dilating the background n times with a 3x3 kernel removes all the pixels of the blob at a chessboard distance of at most n from the background,
+  # so the pixels left by the last dilation are the pixels of the blob the furthest away from the background, which a single distance transform finds
+  # The distance transform is only calculated on the bounding box of the blob (plus a one pixel margin of background) instead of on the whole image
+  x = 0
+  y = 0
+  if type(initialContour) != int:
+    [xBound, yBound, widthBound, heightBound] = cv2.boundingRect(initialContour)
+    xmin = max(xBound - 1, 0)
+    ymin = max(yBound - 1, 0)
+    xmax = min(xBound + widthBound + 1, lenX)
+    ymax = min(yBound + heightBound + 1, lenY)
+    blob = np.zeros((ymax - ymin, xmax - xmin), np.uint8)
+    cv2.fillPoly(blob, pts =[initialContour], color=(255), offset=(-xmin, -ymin))
+    # The borders of the whole image are considered as background
+    if xmin == 0:
+      blob[:, 0] = 0
+    if ymin == 0:
+      blob[0, :] = 0
+    if xmax == lenX:
+      blob[:, len(blob[0])-1] = 0
+    if ymax == lenY:
+      blob[len(blob)-1, :] = 0
+    distance = cv2.distanceTransform(blob, cv2.DIST_C, 3)
+    maxDistance = np.max(distance)
+    if maxDistance > 0:
+      dilatedImage = np.full(blob.shape, 255, np.uint8)
+      dilatedImage[distance >= maxDistance] = 0
+      contours, hierarchy = cv2.findContours(dilatedImage, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE, offset=(xmin, ymin))
+      maxContour = 0
+      maxContourArea = 0
+      for contour, contourHierarchy in zip(contours, hierarchy[0]):
+        # The regions left by the last dilation are holes inside the background (the contour without parent is the border of the bounding box)
+        if contourHierarchy[3] != -1:
+          contourArea = cv2.contourArea(contour)
+          if contourArea < int(lenX * lenY * 0.8):
+            if contourArea > maxContourArea:
+              maxContourArea = contourArea
+              maxContour     = contour
+      if maxContourArea:
+        M = cv2.moments(maxContour)
+        if M['m00']:
+          x = int(M['m10']/M['m00'])
+          y = int(M['m01']/M['m00'])
+  return [x, y]
    
 
 def multipleAnimalsHeadTracking(trackingHeadingAllAnimals, trackingHeadTailAllAnimals, hyperparameters, gray, i, firstFrame, thresh1, xmin=0, ymin=0):
@@ -129,7 +123,10 @@ def multipleAnimalsHeadTracking(trackingHeadingAllAnimals, trackingHeadTailAllAn
         area = cv2.contourArea(contour)
         if (area > minAreaCur) and (area < maxAreaCur):
           if hyperparameters["findCenterOfAnimalByIterativelyDilating"]:
-            [x, y] = findCenterByIterativelyDilating(contour, len(thresh2[0]), len(thresh2))
+            if hyperparameters["findCenterOfAnimalByDistanceTransform"]:
+              [x, y] = findCenterByDistanceTransform(contour, len(thresh2[0]), len(thresh2))
+            else:
+              [x, y] = findCenterByIterativelyDilating(contour, len(thresh2[0]), len(thresh2))
           else:
             M = cv2.moments(contour)
             if M['m00']:
@@ -157,7 +154,10 @@ def multipleAnimalsHeadTracking(trackingHeadingAllAnimals, trackingHeadTailAllAn
       if (area > minAreaCur) and (area < maxAreaCur):
         # print("Find center of mass: area:", area)
         if hyperparameters["findCenterOfAnimalByIterativelyDilating"]:
-          [x, y] = findCenterByIterativelyDilating(contour, len(thresh2[0]), len(thresh2))
+          if hyperparameters["findCenterOfAnimalByDistanceTransform"]:
+            [x, y] = findCenterByDistanceTransform(contour, len(thresh2[0]), len(thresh2))
+          else:
+            [x, y] = findCenterByIterativelyDilating(contour, len(thresh2[0]), len(thresh2))
         else:
           M = cv2.moments(contour)
           if M['m00']:
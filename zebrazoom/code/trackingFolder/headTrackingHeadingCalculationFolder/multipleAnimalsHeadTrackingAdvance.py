@@ -2,6 +2,7 @@ import math
 import cv2
 import numpy as np
 from zebrazoom.code.trackingFolder.headTrackingHeadingCalculationFolder.calculateHeading import calculateHeadingSimple
+from zebrazoom.code.trackingFolder.refactoredCode2022.identitiesLinkage import getDetected, getLastDetectedPositions, calculateDistanceMatrix, linkPositions
 
 def calculateMinDistFromOtherAnimals(animal_Id, hyperparameters, trackingHeadTailAllAnimals, i, firstFrame):
   mindist   = 1000000
@@ -17,6 +18,24 @@ def calculateMinDistFromOtherAnimals(animal_Id, hyperparameters, trackingHeadTai
           mindist = dist
   return mindist
 
+def linkAnimalsToHeadCoordinatesOptions(trackingHeadTailAllAnimals, headCoordinatesOptions, hyperparameters, i, firstFrame, lengthX):
+  # Optimal (instead of greedy) assignment of the head coordinates options to the animals not yet placed on this frame but detected recently
+  marginX = hyperparameters["multipleAnimalTrackingAdvanceAlgorithmMarginX"]
+  headCoordinatesOptionsAlreadyTakenAnimalId = [-1 for k in headCoordinatesOptions]
+  if len(headCoordinatesOptions) == 0:
+    return headCoordinatesOptionsAlreadyTakenAnimalId
+  previousPositions = getLastDetectedPositions(trackingHeadTailAllAnimals, i-firstFrame, hyperparameters["identitiesLinkageMaxNbFramesDisappeared"])
+  previousPositions[getDetected(trackingHeadTailAllAnimals[:, i-firstFrame, 0])] = np.nan
+  options = np.array(headCoordinatesOptions, dtype=float)
+  distances = calculateDistanceMatrix(previousPositions, options)
+  allowedLinks = np.logical_or(distances < hyperparameters["multipleAnimalTrackingAdvanceAlgorithmDist1"], np.logical_and(distances < hyperparameters["multipleAnimalTrackingAdvanceAlgorithmDist2"], np.logical_and(options[:, 0] > marginX, options[:, 0] < lengthX - marginX)))
+  links = linkPositions(previousPositions, options, hyperparameters["identitiesLinkageMaxDistance"], allowedLinks)
+  for animal_Id in np.nonzero(links != -1)[0]:
+    trackingHeadTailAllAnimals[animal_Id, i-firstFrame][0][0] = headCoordinatesOptions[links[animal_Id]][0]
+    trackingHeadTailAllAnimals[animal_Id, i-firstFrame][0][1] = headCoordinatesOptions[links[animal_Id]][1]
+    headCoordinatesOptionsAlreadyTakenAnimalId[links[animal_Id]] = animal_Id
+  return headCoordinatesOptionsAlreadyTakenAnimalId
+
 def multipleAnimalsHeadTrackingAdvance(trackingHeadingAllAnimals, trackingHeadTailAllAnimals, hyperparameters, gray, i, firstFrame, thresh1, thresh3, lengthX):
   
   marginX = hyperparameters["multipleAnimalTrackingAdvanceAlgorithmMarginX"]
@@ -105,7 +124,9 @@ def multipleAnimalsHeadTrackingAdvance(trackingHeadingAllAnimals, trackingHeadTa
   headCoordinatesOptionsAlreadyTakenDist     = [-1 for k in headCoordinatesOptions]
   headCoordinatesOptionsAlreadyTakenAnimalId = [-1 for k in headCoordinatesOptions]
   animalNotPutOrEjectedBecausePositionAlreadyTaken = 1
-  if i > firstFrame:
+  if i > firstFrame and hyperparameters["multipleAnimalTrackingAdvanceAlgorithmOptimalLinkage"]:
+    headCoordinatesOptionsAlreadyTakenAnimalId = linkAnimalsToHeadCoordinatesOptions(trackingHeadTailAllAnimals, headCoordinatesOptions, hyperparameters, i, firstFrame, lengthX)
+  elif i > firstFrame:
     while animalNotPutOrEjectedBecausePositionAlreadyTaken:
       animalNotPutOrEjectedBecausePositionAlreadyTaken = 0
       for animal_Id in range(0, hyperparameters["nbAnimalsPerWell"]):
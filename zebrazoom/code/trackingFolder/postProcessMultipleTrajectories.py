@@ -3,12 +3,29 @@ import cv2
 import math
 
 def rollingMedianFilter(array, window):
+  # Moving mean (and not median) filter, the first and last window-1 values being left unchanged
   array2 = np.convolve(array, np.ones(window), 'same') / window
   array2[:window-1] = array[:window-1]
   array2[-window+1:] = array[-window+1:]
   array = array2
   return array
 
+def findEndOfGap(headPositions, endCandidates, zeroFrameStart, hasPreviousPosition, maxDistanceAuthorized, maxDisapearanceFrames):
+  # Returns the first frame of endCandidates ending the gap starting at zeroFrameStart and its distance to the position before the gap ([-1, 0] if the gap never ends)
+  # The candidates are tested by chunks of increasing size, as the gap usually ends on one of the first candidates
+  chunkStart = 0
+  chunkSize  = 16
+  while chunkStart < len(endCandidates):
+    frames = endCandidates[chunkStart:chunkStart+chunkSize]
+    headStart = headPositions[zeroFrameStart-1] if hasPreviousPosition else headPositions[frames]
+    distances = np.sqrt(np.sum((headPositions[frames] - headStart)**2, axis=1))
+    gapEnds = np.nonzero(np.logical_or(distances < maxDistanceAuthorized, frames - zeroFrameStart > maxDisapearanceFrames))[0]
+    if len(gapEnds):
+      return [frames[gapEnds[0]], distances[gapEnds[0]]]
+    chunkStart = chunkStart + chunkSize
+    chunkSize  = chunkSize * 2
+  return [-1, 0]
+
 def postProcessMultipleTrajectories(trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingEyesAllAnimals, trackingProbabilityOfGoodDetection, hyperparameters, wellPositions):
   
   maxDistanceAuthorized = hyperparameters["postProcessMaxDistanceAuthorized"]
@@ -29,13 +46,13 @@ def postProcessMultipleTrajectories(trackingHeadingAllAnimals, trackingHeadTailA
   # Removing all points that are too close to the borders
   if hyperparameters["postProcessRemovePointsOnBordersMargin"]:
     borderMargin = hyperparameters["postProcessRemovePointsOnBordersMargin"]
-    for animalId in range(0, len(trackingHeadTailAllAnimals)):
-      for frameNumber in range(0, len(trackingHeadTailAllAnimals[animalId])):
-        xHead = trackingHeadTailAllAnimals[animalId][frameNumber][0][0]
-        yHead = trackingHeadTailAllAnimals[animalId][frameNumber][0][1]
-        if (xHead <= borderMargin) or (yHead <= borderMargin) or (xHead >= wellPositions[animalId]["lengthX"] - borderMargin - 1) or (yHead >= wellPositions[animalId]["lengthY"] - borderMargin - 1):
-          trackingHeadTailAllAnimals[animalId][frameNumber][0][0] = 0
-          trackingHeadTailAllAnimals[animalId][frameNumber][0][1] = 0
+    lengthX = np.array([wellPositions[animalId]["lengthX"] for animalId in range(0, len(trackingHeadTailAllAnimals))])[:, np.newaxis]
+    lengthY = np.array([wellPositions[animalId]["lengthY"] for animalId in range(0, len(trackingHeadTailAllAnimals))])[:, np.newaxis]
+    xHead = trackingHeadTailAllAnimals[:, :, 0, 0]
+    yHead = trackingHeadTailAllAnimals[:, :, 0, 1]
+    toRemove = (xHead <= borderMargin) | (yHead <= borderMargin) | (xHead >= lengthX - borderMargin - 1) | (yHead >= lengthY - borderMargin - 1)
+    trackingHeadTailAllAnimals[toRemove, 0, 0] = 0
+    trackingHeadTailAllAnimals[toRemove, 0, 1] = 0
   
   # Removing all points that are deviating too much from the main trajectory
   if hyperparameters["postProcessRemovePointsAwayFromMainTrajectory"]:
@@ -46,51 +63,61 @@ def postProcessMultipleTrajectories(trackingHeadingAllAnimals, trackingHeadTailA
       yHeadPositionsRollingMedian = rollingMedianFilter(yHeadPositions, 11)
       distance = np.sqrt((xHeadPositions - xHeadPositionsRollingMedian) ** 2 + (yHeadPositions - yHeadPositionsRollingMedian) ** 2)
       distanceRollingMedian = rollingMedianFilter(distance, 5)
-      normalizedDistance = np.array([1 for x in range(0,len(xHeadPositions))])
       normalizedDistance = distance / distanceRollingMedian
       normalizedDistance = np.nan_to_num(normalizedDistance, nan=1)
       toRemove   = normalizedDistance - np.mean(normalizedDistance) > hyperparameters["postProcessRemovePointsAwayFromMainTrajectoryThreshold"] * np.std(normalizedDistance)
       trackingHeadTailAllAnimals[animalId, toRemove, 0, 0] = 0
       trackingHeadTailAllAnimals[animalId, toRemove, 0, 1] = 0
   
-  currentlyZero  = False
-  zeroFrameStart = 0
-  for animalId in range(0, len(trackingHeadTailAllAnimals)):
-    for frameNumber in range(0, len(trackingHeadTailAllAnimals[animalId])):
-      xHead = trackingHeadTailAllAnimals[animalId][frameNumber][0][0]
-      yHead = trackingHeadTailAllAnimals[animalId][frameNumber][0][1]
-      if frameNumber != 0:
-        xHeadPrev = trackingHeadTailAllAnimals[animalId][frameNumber-1][0][0]
-        yHeadPrev = trackingHeadTailAllAnimals[animalId][frameNumber-1][0][1]
-      else:
-        xHeadPrev = trackingHeadTailAllAnimals[animalId][frameNumber][0][0]
-        yHeadPrev = trackingHeadTailAllAnimals[animalId][frameNumber][0][1]
-      if ((xHead == 0 and yHead == 0) or (math.sqrt((xHead - xHeadPrev)**2 + (yHead - yHeadPrev)**2) > maxDistanceAuthorized)) and (frameNumber != len(trackingHeadTailAllAnimals[animalId]) - 1):
-        if not(currentlyZero):
-          zeroFrameStart = frameNumber
-        # print("currentlyZero at True: animalId:", animalId, "; frameNumber:", frameNumber)
-        currentlyZero = True
-      else:
-        if currentlyZero:
-          if zeroFrameStart >= 1:
-            xHeadStart = trackingHeadTailAllAnimals[animalId][zeroFrameStart-1][0][0]
-            yHeadStart = trackingHeadTailAllAnimals[animalId][zeroFrameStart-1][0][1]
-          else:
-            xHeadStart = trackingHeadTailAllAnimals[animalId][frameNumber][0][0]
-            yHeadStart = trackingHeadTailAllAnimals[animalId][frameNumber][0][1]
-          xHeadEnd = trackingHeadTailAllAnimals[animalId][frameNumber][0][0]
-          yHeadEnd = trackingHeadTailAllAnimals[animalId][frameNumber][0][1]
-          if (math.sqrt((xHeadEnd - xHeadStart)**2 + (yHeadEnd - yHeadStart)**2) < maxDistanceAuthorized) or (frameNumber - zeroFrameStart > maxDisapearanceFrames):
-            currentlyZero = False
-            if (math.sqrt((xHeadEnd - xHeadStart)**2 + (yHeadEnd - yHeadStart)**2) < maxDistanceAuthorized) and not((xHeadEnd == 0) and (yHeadEnd == 0)):
-              xStep = (xHeadEnd - xHeadStart) / (frameNumber - zeroFrameStart)
-              yStep = (yHeadEnd - yHeadStart) / (frameNumber - zeroFrameStart)
-              for frameAtZeroToChange in range(zeroFrameStart, frameNumber):
-                trackingHeadTailAllAnimals[animalId][frameAtZeroToChange][0][0] = xHeadStart + xStep * (frameAtZeroToChange - zeroFrameStart)
-                trackingHeadTailAllAnimals[animalId][frameAtZeroToChange][0][1] = yHeadStart + yStep * (frameAtZeroToChange - zeroFrameStart)    
-            else:
-              for frameAtZeroToChange in range(zeroFrameStart, frameNumber):
-                trackingHeadTailAllAnimals[animalId][frameAtZeroToChange][0][0] = xHeadStart
-                trackingHeadTailAllAnimals[animalId][frameAtZeroToChange][0][1] = yHeadStart
+  # Filling the gaps: a gap starts on a frame where the animal isn't detected or is too far from its previous position, and ends on the first following frame which is neither (or on the last frame) and is close enough to the position before the gap or more than maxDisapearanceFrames frames after its start
+  # The frames of all animals are put one after the other: as the last frame of each animal always ends the current gap, gaps can't go from one animal to the next
+  [nbAnimals, nbFrames] = trackingHeadTailAllAnimals.shape[:2]
+  headPositions = trackingHeadTailAllAnimals[:, :, 0].reshape((-1, 2))
+  frameNumbers  = np.tile(np.arange(nbFrames), nbAnimals)
+  jumps = np.zeros(len(headPositions))
+  jumps[1:] = np.sqrt(np.sum(np.diff(headPositions, axis=0)**2, axis=1))
+  jumps[frameNumbers == 0] = 0
+  inGap = np.logical_or(np.logical_and(headPositions[:, 0] == 0, headPositions[:, 1] == 0), jumps > maxDistanceAuthorized)
+  inGap[frameNumbers == nbFrames - 1] = False
+  
+  # Run length encoding of the frames in gaps: most gaps end on the first frame after their run
+  runsLimits  = np.diff(np.concatenate(([0], inGap.astype(np.int8))))
+  runStarts   = np.nonzero(runsLimits == 1)[0]
+  runEnds     = np.nonzero(runsLimits == -1)[0]
+  hasPreviousPosition = frameNumbers[runStarts] >= 1
+  headStarts  = np.where(hasPreviousPosition[:, np.newaxis], headPositions[runStarts - 1], headPositions[runEnds])
+  distances   = np.sqrt(np.sum((headPositions[runEnds] - headStarts)**2, axis=1))
+  endsOnFirstFrameAfterRun = np.logical_or(distances < maxDistanceAuthorized, runEnds - runStarts > maxDisapearanceFrames)
+  
+  # The other gaps go on after their run, including the following runs in the gap
+  startsGap = np.ones(len(runStarts), dtype=bool)
+  endCandidates = np.nonzero(np.logical_not(inGap))[0]
+  nextRun = 0
+  for run in np.nonzero(np.logical_not(endsOnFirstFrameAfterRun))[0]:
+    if run < nextRun:
+      continue
+    zeroFrameStart = runStarts[run]
+    animalLastFrame = zeroFrameStart - frameNumbers[zeroFrameStart] + nbFrames - 1
+    [frameNumber, distance] = findEndOfGap(headPositions, endCandidates[np.searchsorted(endCandidates, zeroFrameStart):np.searchsorted(endCandidates, animalLastFrame, side='right')], zeroFrameStart, hasPreviousPosition[run], maxDistanceAuthorized, maxDisapearanceFrames)
+    if frameNumber == -1:
+      nextRun = np.searchsorted(runStarts, animalLastFrame + 1)
+      startsGap[run:nextRun] = False
+    else:
+      runEnds[run]   = frameNumber
+      distances[run] = distance
+      nextRun = np.searchsorted(runStarts, frameNumber + 1)
+      startsGap[run+1:nextRun] = False
+  
+  gapStarts = runStarts[startsGap]
+  gapEnds   = runEnds[startsGap]
+  headStarts = np.where(hasPreviousPosition[startsGap, np.newaxis], headPositions[gapStarts - 1], headPositions[gapEnds])
+  headEnds   = headPositions[gapEnds]
+  interpolated = np.logical_and(distances[startsGap] < maxDistanceAuthorized, np.logical_not(np.logical_and(headEnds[:, 0] == 0, headEnds[:, 1] == 0)))
+  steps = (headEnds - headStarts) / (gapEnds - gapStarts)[:, np.newaxis]
+  gapLengths = gapEnds - gapStarts
+  gapIds  = np.repeat(np.arange(len(gapStarts)), gapLengths)
+  offsets = np.arange(len(gapIds)) - np.repeat(np.cumsum(gapLengths) - gapLengths, gapLengths)
+  headPositions[gapStarts[gapIds] + offsets] = np.where(interpolated[gapIds, np.newaxis], headStarts[gapIds] + steps[gapIds] * offsets[:, np.newaxis], headStarts[gapIds])
+  trackingHeadTailAllAnimals[:, :, 0] = headPositions.reshape((nbAnimals, nbFrames, 2))
   
   return [trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingEyesAllAnimals]
@@ -1,11 +1,13 @@
 import cv2
 
-def detectMovementWithRawVideoInsideTracking2(hyperparameters, trackingHeadTailAllAnimalsList, previousFrames, animal_Id, i, firstFrame, auDessusPerAnimalIdList, grey, wellPositions):
+def detectMovementWithRawVideoInsideTracking2(hyperparameters, trackingHeadTailAllAnimalsList, previousFrames, animal_Id, i, firstFrame, auDessusPerAnimalIdList, grey, wellPositions, wellNumbers=None):
   halfDiameterRoiBoutDetect = hyperparameters["halfDiameterRoiBoutDetect"]
+  if wellNumbers is None:
+    wellNumbers = range(0 if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"], hyperparameters["nbWells"] if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"] + 1)
   if previousFrames.full():
     previousFrame   = previousFrames.get()
     curFrame        = grey.copy()
-    for wellNumber in range(0 if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"], hyperparameters["nbWells"] if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"] + 1):
+    for wellNumber in wellNumbers:
       # previousXYCoord = previousXYCoords.get()
       headX = trackingHeadTailAllAnimalsList[wellNumber][animal_Id, i-firstFrame][0][0]
       headY = trackingHeadTailAllAnimalsList[wellNumber][animal_Id, i-firstFrame][0][1]
@@ -68,7 +70,7 @@ def detectMovementWithRawVideoInsideTracking2(hyperparameters, trackingHeadTailA
         else:
           auDessusPerAnimalIdList[wellNumber][animalId][i-firstFrame] = 0
   else:
-    for wellNumber in range(0 if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"], hyperparameters["nbWells"] if hyperparameters["onlyTrackThisOneWell"] == -1 else hyperparameters["onlyTrackThisOneWell"] + 1):
+    for wellNumber in wellNumbers:
       for animalId in range(0, hyperparameters["nbAnimalsPerWell"]):
         auDessusPerAnimalIdList[wellNumber][animalId][i-firstFrame] = 0
   previousFrames.put(grey)
@@ -1,27 +1,17 @@
 import cv2
 import numpy as np
 
-def findCenterByIterativelyDilating(initialContour, lenX, lenY):
+def findCenterByIterativelyDilating(initialContour, lenX, lenY, useDistanceTransform=False):
   x = 0
   y = 0
   
-  xmin = lenX
-  ymin = lenY
-  xmax = 0
-  ymax = 0
-  for pt in initialContour:
-    if pt[0][0] < xmin:
-      xmin = pt[0][0]
-    if pt[0][1] < ymin:
-      ymin = pt[0][1]
-    if pt[0][0] > xmax:
-      xmax = pt[0][0]
-    if pt[0][1] > ymax:
-      ymax = pt[0][1]
+  xmin = min(lenX, np.min(initialContour[:, 0, 0]))
+  ymin = min(lenY, np.min(initialContour[:, 0, 1]))
+  xmax = max(0, np.max(initialContour[:, 0, 0]))
+  ymax = max(0, np.max(initialContour[:, 0, 1]))
   
-  for pt in initialContour:
-    pt[0][0] = pt[0][0] - xmin
-    pt[0][1] = pt[0][1] - ymin
+  initialContour[:, 0, 0] -= xmin
+  initialContour[:, 0, 1] -= ymin
   
   image = np.zeros((ymax - ymin, xmax - xmin))
   image[:, :] = 255
@@ -33,14 +23,22 @@ def findCenterByIterativelyDilating(initialContour, lenX, lenY):
     image[0,:] = 255
     image[:, len(image[0])-1] = 255
     image[len(image)-1, :]    = 255
-    nbBlackPixels = 1
-    dilateIter = 0
-    while nbBlackPixels > 0:
-      dilateIter   = dilateIter + 1
+    if useDistanceTransform:
+      # Same result as the iterative dilations below: the pixels left by the last dilation (with a 3x3 kernel) are the pixels the furthest away from the background in chessboard distance
+      distance = cv2.distanceTransform(255 - image, cv2.DIST_C, 3)
+      maxDistance = np.max(distance)
+      dilatedImage = image.copy()
+      if maxDistance > 0:
+        dilatedImage[distance < maxDistance] = 255
+    else:
+      nbBlackPixels = 1
+      dilateIter = 0
+      while nbBlackPixels > 0:
+        dilateIter   = dilateIter + 1
+        dilatedImage = cv2.dilate(image, kernel, iterations=dilateIter)
+        nbBlackPixels = cv2.countNonZero(255-dilatedImage)
+      dilateIter   = dilateIter - 1
       dilatedImage = cv2.dilate(image, kernel, iterations=dilateIter)
-      nbBlackPixels = cv2.countNonZero(255-dilatedImage)
-    dilateIter   = dilateIter - 1
-    dilatedImage = cv2.dilate(image, kernel, iterations=dilateIter)
     dilatedImage[:,0] = 255
     dilatedImage[0,:] = 255
     dilatedImage[:, len(dilatedImage[0])-1] = 255
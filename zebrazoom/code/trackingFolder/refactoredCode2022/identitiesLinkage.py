@@ -1,41 +1,141 @@
 from scipy.optimize import linear_sum_assignment
 import numpy as np
-import math
 
-def findOptimalIdCorrespondance(trackingHeadTailAllAnimalsList, wellNumber, i,  firstFrame):
-  
+
+def getDetected(headPositions):
+  # An animal is considered as not detected when its head position is (0, 0)
+  return np.any(headPositions != 0, axis=-1)
+
+
+def getLastDetectedPositions(trackingHeadTailAllAnimals, frameIndex, maxNbFramesDisappeared):
+  # Last head position of each animal detected between the frames frameIndex - 1 - maxNbFramesDisappeared and frameIndex - 1 (nan for the animals not detected during these frames)
+  headPositions = trackingHeadTailAllAnimals[:, max(0, frameIndex - 1 - maxNbFramesDisappeared):frameIndex, 0]
+  lastPositions = np.full((len(trackingHeadTailAllAnimals), 2), np.nan)
+  if headPositions.shape[1]:
+    detected = getDetected(headPositions)
+    lastDetected = headPositions.shape[1] - 1 - np.argmax(detected[:, ::-1], axis=1)
+    everDetected = np.any(detected, axis=1)
+    lastPositions[everDetected] = headPositions[everDetected, lastDetected[everDetected]]
+  return lastPositions
+
+
+def calculateDistanceMatrix(previousPositions, currentPositions):
+  return np.sqrt(np.sum((currentPositions[np.newaxis, :] - previousPositions[:, np.newaxis])**2, axis=2))
+
+
+def findOptimalLinks(costMatrix, allowedLinks):
+  # Optimal assignment of the columns of costMatrix to its rows, only keeping allowed links: returns, for each row, the column linked to it (-1 if none)
+  links = np.full(len(costMatrix), -1)
+  if not(np.any(allowedLinks)):
+    return links
+  # Forbidden links get a cost higher than the sum of all the allowed links, so that the number of allowed links is maximized first
+  forbiddenCost = (np.max(costMatrix[allowedLinks]) + 1) * (min(costMatrix.shape) + 1)
+  row_ind, col_ind = linear_sum_assignment(np.where(allowedLinks, costMatrix, forbiddenCost))
+  kept = allowedLinks[row_ind, col_ind]
+  links[row_ind[kept]] = col_ind[kept]
+  return links
+
+
+def linkPositions(previousPositions, currentPositions, maxDistance=0, allowedLinks=None):
+  # Returns, for each previous position, the index of the current position linked to it (-1 if none)
+  # Positions equal to nan can't be linked, nor can positions further apart than maxDistance (if maxDistance is not 0) or not in allowedLinks (if not None)
+  distances = calculateDistanceMatrix(previousPositions, currentPositions)
+  allowed = np.logical_not(np.isnan(distances))
+  if maxDistance:
+    allowed = np.logical_and(allowed, distances <= maxDistance)
+  if allowedLinks is not None:
+    allowed = np.logical_and(allowed, allowedLinks)
+  return findOptimalLinks(distances, allowed)
+
+
+def findOptimalIdCorrespondance(trackingHeadTailAllAnimalsList, wellNumber, i, firstFrame, hyperparameters=None):
+
+  trackingHeadTailAllAnimals = trackingHeadTailAllAnimalsList[wellNumber]
+  nbAnimals = len(trackingHeadTailAllAnimals)
+
   if i > firstFrame:
-    
-    costMatrix = np.zeros((len(trackingHeadTailAllAnimalsList[wellNumber]), len(trackingHeadTailAllAnimalsList[wellNumber])))
-    
-    for animalIdPrev in range(0, len(trackingHeadTailAllAnimalsList[wellNumber])):
-      for animalIdCur in range(0, len(trackingHeadTailAllAnimalsList[wellNumber])):
-        coordPrevX = trackingHeadTailAllAnimalsList[wellNumber][animalIdPrev, i-firstFrame-1][0][0]
-        coordPrevY = trackingHeadTailAllAnimalsList[wellNumber][animalIdPrev, i-firstFrame-1][0][1]         
-        coordCurX  = trackingHeadTailAllAnimalsList[wellNumber][animalIdCur,  i-firstFrame][0][0]
-        coordCurY  = trackingHeadTailAllAnimalsList[wellNumber][animalIdCur,  i-firstFrame][0][1]
-        # TO DO: add some very high cost for (0, 0) coordinates
-        costMatrix[animalIdPrev, animalIdCur] = math.sqrt((coordCurX - coordPrevX)**2 + (coordCurY - coordPrevY)**2)
-    
-    row_ind, col_ind = linear_sum_assignment(costMatrix)
-    
-    return col_ind
-    
+
+    maxDistance            = hyperparameters["identitiesLinkageMaxDistance"] if hyperparameters is not None else 0
+    maxNbFramesDisappeared = hyperparameters["identitiesLinkageMaxNbFramesDisappeared"] if hyperparameters is not None else 0
+
+    previousPositions = getLastDetectedPositions(trackingHeadTailAllAnimals, i-firstFrame, maxNbFramesDisappeared)
+    currentPositions  = trackingHeadTailAllAnimals[:, i-firstFrame, 0].astype(float)
+    currentDetected   = getDetected(currentPositions)
+    currentPositions[np.logical_not(currentDetected)] = np.nan
+
+    correspondance = linkPositions(previousPositions, currentPositions, maxDistance)
+
+    # The animals not linked take the remaining positions, the detected positions going first to the animals not detected recently
+    freeIds = np.nonzero(correspondance == -1)[0]
+    freeIds = freeIds[np.argsort(np.logical_not(np.isnan(previousPositions[freeIds, 0])), kind='stable')]
+    freePositions = np.setdiff1d(np.arange(nbAnimals), correspondance)
+    freePositions = freePositions[np.argsort(np.logical_not(currentDetected[freePositions]), kind='stable')]
+    correspondance[freeIds] = freePositions
+
+    return correspondance
+
   else:
-    
-    return np.array([k for k in range(0, len(trackingHeadTailAllAnimalsList[wellNumber]))])
+
+    return np.arange(nbAnimals)
 
 
 def switchIdentities(correspondance, trackingHeadTailAllAnimalsList, trackingHeadingAllAnimalsList, wellNumber, i, firstFrame):
-  
-  trackingHeadTailAllAnimalsListWellNumberOriginal = trackingHeadTailAllAnimalsList[wellNumber][:, i-firstFrame].copy()
-  trackingHeadingAllAnimalsListWellNumberOriginal  = trackingHeadingAllAnimalsList[wellNumber][:, i-firstFrame].copy()
-  
-  for previousId, newId in enumerate(correspondance):
-    trackingHeadTailAllAnimalsList[wellNumber][previousId, i-firstFrame] = trackingHeadTailAllAnimalsListWellNumberOriginal[newId]
-
-  for previousId, newId in enumerate(correspondance):
-    trackingHeadingAllAnimalsList[wellNumber][previousId, i-firstFrame] = trackingHeadingAllAnimalsListWellNumberOriginal[newId]
-  
+
+  trackingHeadTailAllAnimalsList[wellNumber][:, i-firstFrame] = trackingHeadTailAllAnimalsList[wellNumber][correspondance, i-firstFrame]
+  trackingHeadingAllAnimalsList[wellNumber][:, i-firstFrame]  = trackingHeadingAllAnimalsList[wellNumber][correspondance, i-firstFrame]
+
   return [trackingHeadTailAllAnimalsList, trackingHeadingAllAnimalsList]
 
+
+def linkTrackletsOverSlidingWindow(trackingHeadTailAllAnimals, otherTrackingDataAllAnimals, hyperparameters):
+  # Track level linking: when animals start being detected again, they are linked to the animals which stopped being detected during the previous identitiesLinkageSlidingWindow frames (themselves included)
+  # The ends of the trajectories of linked animals are swapped in place in trackingHeadTailAllAnimals and in all the elements of otherTrackingDataAllAnimals (arrays indexed by [animal, frame] or lists of one array per animal indexed by frame)
+
+  windowSize  = hyperparameters["identitiesLinkageSlidingWindow"]
+  maxDistance = hyperparameters["identitiesLinkageMaxDistance"]
+
+  headPositions = trackingHeadTailAllAnimals[:, :, 0]
+  detected = getDetected(headPositions)
+  [nbAnimals, nbFrames] = detected.shape
+  if nbAnimals < 2 or nbFrames < 2:
+    return
+
+  # permutations[:, frame] gives the original animal ids now associated to each animal id on each frame
+  permutations = np.empty((nbAnimals, nbFrames), dtype=int)
+  permutation  = np.arange(nbAnimals)
+  permutations[:, 0] = permutation
+  previousDetected  = detected[:, 0]
+  lastDetectedFrame = np.where(previousDetected, 0, -windowSize - 1)
+  lastPositions     = headPositions[:, 0].astype(float)
+
+  for frame in range(1, nbFrames):
+    currentDetected = detected[permutation, frame]
+    starting = np.nonzero(np.logical_and(currentDetected, np.logical_not(previousDetected)))[0]
+    if len(starting):
+      ending = np.nonzero(np.logical_and(np.logical_not(previousDetected), lastDetectedFrame >= frame - windowSize))[0]
+      links = linkPositions(lastPositions[ending], headPositions[permutation[starting], frame].astype(float), maxDistance)
+      linked = links != -1
+      if np.any(ending[linked] != starting[links[linked]]):
+        # The animals linked take the end of the trajectory they were linked to, the others animals whose trajectory was taken take the remaining trajectories
+        framePermutation = np.full(nbAnimals, -1)
+        framePermutation[ending[linked]] = starting[links[linked]]
+        remainingIds = np.nonzero(framePermutation == -1)[0]
+        remainingTrajectories = np.setdiff1d(np.arange(nbAnimals), framePermutation)
+        notMoved = np.intersect1d(remainingIds, remainingTrajectories)
+        framePermutation[notMoved] = notMoved
+        framePermutation[np.setdiff1d(remainingIds, notMoved)] = np.setdiff1d(remainingTrajectories, notMoved)
+        permutation = permutation[framePermutation]
+        currentDetected = detected[permutation, frame]
+    permutations[:, frame] = permutation
+    lastDetectedFrame[currentDetected] = frame
+    lastPositions[currentDetected] = headPositions[permutation[currentDetected], frame]
+    previousDetected = currentDetected
+
+  frames = np.arange(nbFrames)
+  for trackingDataAllAnimals in [trackingHeadTailAllAnimals] + otherTrackingDataAllAnimals:
+    if type(trackingDataAllAnimals) == list:
+      trackingDataPermuted = np.array(trackingDataAllAnimals)[permutations, frames]
+      for animalId in range(0, nbAnimals):
+        trackingDataAllAnimals[animalId][:] = trackingDataPermuted[animalId]
+    else:
+      trackingDataAllAnimals[:] = trackingDataAllAnimals[permutations, frames]
@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+from scipy import ndimage
+
+
+def getWellNumberLookup(wellPositions, frameHeight, frameWidth):
+  # Well number of each pixel of the plate (-1 outside of the wells)
+  wellNumberLookup = np.full((frameHeight, frameWidth), -1, dtype=np.int32)
+  for wellNumber, wellPosition in enumerate(wellPositions):
+    wellNumberLookup[wellPosition['topLeftY']:wellPosition['topLeftY']+wellPosition['lengthY'], wellPosition['topLeftX']:wellPosition['topLeftX']+wellPosition['lengthX']] = wellNumber
+  return wellNumberLookup
+
+
+def splitBlobAtWellsBoundaries(labels, stats, wellNumberLookup, label):
+  # Splits a blob spreading over several wells into the 4-connected pieces of the blob inside each well, as found by findContours in the image of each well
+  # The pieces get new labels, appended to the statistics, and the area of the initial blob is set to 0
+  x = stats[label, cv2.CC_STAT_LEFT]
+  y = stats[label, cv2.CC_STAT_TOP]
+  w = stats[label, cv2.CC_STAT_WIDTH]
+  h = stats[label, cv2.CC_STAT_HEIGHT]
+  blobLabels = labels[y:y+h, x:x+w]
+  blobWells  = wellNumberLookup[y:y+h, x:x+w]
+  blob = blobLabels == label
+  newStats = [stats]
+  newWells = []
+  nextLabel = len(stats)
+  for wellNumber in np.unique(blobWells[blob]):
+    nbPieces, piecesLabels, piecesStats, piecesCentroids = cv2.connectedComponentsWithStats(np.logical_and(blob, blobWells == wellNumber).astype(np.uint8), connectivity=4)
+    pieces = piecesLabels > 0
+    blobLabels[pieces] = piecesLabels[pieces] + nextLabel - 1
+    piecesStats = piecesStats[1:]
+    piecesStats[:, cv2.CC_STAT_LEFT] += x
+    piecesStats[:, cv2.CC_STAT_TOP]  += y
+    newStats.append(piecesStats)
+    newWells += [wellNumber] * (nbPieces - 1)
+    nextLabel += nbPieces - 1
+  stats = np.concatenate(newStats)
+  stats[label, cv2.CC_STAT_AREA] = 0
+  return [stats, newWells]
+
+
+def findAnimalsBlobsInPlate(foreground, wellNumberLookup, nbWells, hyperparameters):
+  # Finds the blobs of the animals of all the wells at once with a single connected components labelling of the foreground of the whole plate
+  # Returns the labels image, the statistics of the blobs and, for each well, the labels of (at most) nbAnimalsPerWell blobs with an area between 0.7 * minAreaBody and 1.3 * maxAreaBody, the biggest ones first
+  # The blobs are 4-connected, as the holes found by findContours in the thresholded image of each well are, and blobs spreading over touching wells are split at the boundaries of the wells
+  animalsPixels = np.logical_and(foreground < 255, wellNumberLookup != -1).astype(np.uint8)
+  nbLabels, labels, stats, centroids = cv2.connectedComponentsWithStats(animalsPixels, connectivity=4)
+  
+  # Wells of the blobs: only the blobs big enough to be (or to contain) an animal are checked
+  bigBlobs = np.nonzero(stats[1:, cv2.CC_STAT_AREA] > 0.7 * hyperparameters["minAreaBody"])[0] + 1
+  blobsWells = np.full(nbLabels, -1)
+  if len(bigBlobs):
+    blobsWells[bigBlobs] = ndimage.minimum(wellNumberLookup, labels, bigBlobs)
+    for label in bigBlobs[blobsWells[bigBlobs] != ndimage.maximum(wellNumberLookup, labels, bigBlobs)]:
+      [stats, newWells] = splitBlobAtWellsBoundaries(labels, stats, wellNumberLookup, label)
+      blobsWells = np.concatenate((blobsWells, newWells)).astype(int)
+  
+  areas = stats[:, cv2.CC_STAT_AREA]
+  candidates = np.nonzero(np.logical_and(areas > 0.7 * hyperparameters["minAreaBody"], areas < 1.3 * hyperparameters["maxAreaBody"]))[0]
+  candidates = candidates[candidates > 0]
+  candidates = candidates[np.lexsort((-areas[candidates], blobsWells[candidates]))]
+  
+  animalsBlobsPerWell = [[] for wellNumber in range(0, nbWells)]
+  for candidate in candidates:
+    wellBlobs = animalsBlobsPerWell[blobsWells[candidate]]
+    if len(wellBlobs) < hyperparameters["nbAnimalsPerWell"]:
+      wellBlobs.append(candidate)
+  
+  return [labels, stats, animalsBlobsPerWell]
+
+
+def getBlobContour(labels, stats, label, xtop, ytop):
+  # Contour of a blob in the coordinates of its well, traced on the background pixels surrounding the blob in the same way as for the holes found by findContours in the thresholded image of the well
+  x = stats[label, cv2.CC_STAT_LEFT]
+  y = stats[label, cv2.CC_STAT_TOP]
+  w = stats[label, cv2.CC_STAT_WIDTH]
+  h = stats[label, cv2.CC_STAT_HEIGHT]
+  # Margin of 2 pixels as findContours doesn't take into account the border of the image
+  blobImage = np.full((h + 4, w + 4), 255, dtype=np.uint8)
+  blobImage[2:h+2, 2:w+2][labels[y:y+h, x:x+w] == label] = 0
+  contours, hierarchy = cv2.findContours(blobImage, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE, offset=(int(x - 2 - xtop), int(y - 2 - ytop)))
+  hole = np.nonzero(hierarchy[0, :, 3] != -1)[0][0]
+  return contours[hole]
@@ -96,119 +96,114 @@ def appendPoint(x, y, points):
   points = np.append(points, curPoint, axis=1)
   return points
 
+descentOffsetsCache = {}
+def getDescentOffsets(nbList, steps):
+  # Displacements (step * cos(theta), step * sin(theta)) of all the candidate points for each step and each angle, calculated only once as nbList and steps are fixed for the whole video
+  key = (nbList, tuple(steps))
+  if key not in descentOffsetsCache:
+    thetas = [i*(math.pi/nbList) for i in range(0,2*nbList)]
+    offsetsX = np.array([[step * (math.cos(theta)) for theta in thetas] for step in steps])
+    offsetsY = np.array([[step * (math.sin(theta)) for theta in thetas] for step in steps])
+    descentOffsetsCache[key] = (np.array(thetas), np.array(steps), offsetsX, offsetsY)
+  return descentOffsetsCache[key]
+
 def findNextPoints(depth,x,y,frame,points,angle,maxDepth,steps,nbList,initialImage,debug, hyperparameters, dontChooseThisPoint = [], maxRadiusForDontChoosePoint = 0):
   
   lenX = len(frame[0]) - 1
   lenY = len(frame) - 1
-
-  thetaDiffAccept = 1
-  
-  if depth < hyperparameters["initialTailPortionMaxSegmentDiffAngleCutOffPos"] * maxDepth:
-    thetaDiffAccept = hyperparameters["initialTailPortionMaxSegmentDiffAngleValue"]
   
-  if depth > 0.85*maxDepth:
-    thetaDiffAccept = 0.6
-  
-  if hyperparameters["headEmbededMaxAngleBetweenSubsequentSegments"]:
-    thetaDiffAccept = hyperparameters["headEmbededMaxAngleBetweenSubsequentSegments"]
-  
-  pixTotMax = 1000000
-  maxTheta  = angle
-
-  l = [i*(math.pi/nbList) for i in range(0,2*nbList) if distBetweenThetas(i*(math.pi/nbList), angle) < thetaDiffAccept]
+  (thetas, stepsArray, offsetsX, offsetsY) = getDescentOffsets(nbList, steps)
   
-  # if debug:
-    # print("debug")
+  firstDepth    = depth
+  firstNewTheta = None
   
-  for step in steps:
+  # Each iteration finds the next point of the tail from the current one (x, y)
+  while True:
     
-    if (step < maxDepth - depth) or (step == steps[0]):
+    thetaDiffAccept = 1
     
-      for theta in l:
-        
-        xNew = assignValueIfBetweenRange(int(x + step * (math.cos(theta))), 0, lenX)
-        yNew = assignValueIfBetweenRange(int(y + step * (math.sin(theta))), 0, lenY)
-        pixTot = frame[yNew][xNew]
-        
-        # if debug:
-          # print([theta,pixTot])
-        
-        # Keeps that theta angle as maximum if appropriate
-        if (pixTot < pixTotMax):
-          if (len(dontChooseThisPoint) == 0):
-            pixTotMax = pixTot
-            maxTheta = theta
-            xTot = xNew
-            yTot = yNew
-          else:
-            dist = 1000000000000000000
-            for num in range(0, len(dontChooseThisPoint[0])):
-              dist = min(dist, math.sqrt((xNew - dontChooseThisPoint[0, num])**2 + (yNew - dontChooseThisPoint[1, num])**2))
-            if (not(dist <= maxRadiusForDontChoosePoint)):
-              pixTotMax = pixTot
-              maxTheta = theta
-              xTot = xNew
-              yTot = yNew
-  
-  w = 4
-  ym = yTot - w
-  yM = yTot + w
-  xm = xTot - w
-  xM = xTot + w
-  if ym < 0:
-    ym = 0
-  if xm < 0:
-    xm = 0
-  if yM > len(initialImage):
-    yM = len(initialImage)
-  if xM > len(initialImage[0]):
-    xM = len(initialImage[0])
-  
-  pixSur = np.min(frame[ym:yM, xm:xM]) #initialImage[ym:yM, xm:xM])
-  # if debug:
-    # print("depth:", depth, " ; maxDepth:", maxDepth, " ; pixSur:", pixSur)
-  
-  # if depth > 0.95*maxDepth:
-    # pixTot = frame[y][x]
-    # if (pixTot < pixTotMax):
-      # pixTotMax = pixTot
-      # maxTheta = theta
-      # xTot = x
-      # yTot = y
-      # depth = maxDepth + 10
-  
-  # if debug:
-    # print(["max:",maxTheta,pixTotMax])
-  
-  # Calculates distance between new and old point
-  distSubsquentPoints = math.sqrt((xTot - x)**2 + (yTot - y)**2)
-  
-  pixSurMax = hyperparameters["headEmbededParamTailDescentPixThreshStop"]
-  # pixSurMax = 220 #150 #245 #150
-  if depth + distSubsquentPoints < maxDepth and ((pixSur < pixSurMax) or (depth < hyperparameters["authorizedRelativeLengthTailEnd"]*maxDepth)):
-    points = appendPoint(xTot, yTot, points)
-  else:
-    vectX = xTot - x
-    vectY = yTot - y
-    xTot  = int(x + (maxDepth / (depth + distSubsquentPoints)) * vectX)
-    yTot  = int(y + (maxDepth / (depth + distSubsquentPoints)) * vectY)
-    points = appendPoint(xTot, yTot, points)
-  if debug:
-    import zebrazoom.code.util as util
+    if depth < hyperparameters["initialTailPortionMaxSegmentDiffAngleCutOffPos"] * maxDepth:
+      thetaDiffAccept = hyperparameters["initialTailPortionMaxSegmentDiffAngleValue"]
+    
+    if depth > 0.85*maxDepth:
+      thetaDiffAccept = 0.6
+    
+    if hyperparameters["headEmbededMaxAngleBetweenSubsequentSegments"]:
+      thetaDiffAccept = hyperparameters["headEmbededMaxAngleBetweenSubsequentSegments"]
+    
+    diffThetas = np.abs(thetas - angle)
+    anglesTested = (diffThetas < thetaDiffAccept) | ((diffThetas > math.pi) & ((2 * math.pi) - diffThetas < thetaDiffAccept))
+    stepsTested  = (stepsArray < maxDepth - depth) | (stepsArray == stepsArray[0])
+    
+    # All the candidate points (step by step, and angle by angle for each step) are evaluated at once
+    candidates = np.logical_and.outer(stepsTested, anglesTested)
+    xNew = np.minimum(np.maximum((x + offsetsX[candidates]).astype(int), 0), lenX)
+    yNew = np.minimum(np.maximum((y + offsetsY[candidates]).astype(int), 0), lenY)
+    pixTot = frame[yNew, xNew]
+    
+    # Keeps the darkest candidate point (the first one in case of equality), excluding the candidates too close to dontChooseThisPoint
+    if len(dontChooseThisPoint) and len(dontChooseThisPoint[0]):
+      dist = np.min(np.sqrt((xNew[:, np.newaxis] - dontChooseThisPoint[0][np.newaxis, :])**2 + (yNew[:, np.newaxis] - dontChooseThisPoint[1][np.newaxis, :])**2), axis=1)
+      allowed = np.nonzero(np.logical_not(dist <= maxRadiusForDontChoosePoint))[0]
+      best = allowed[np.argmin(pixTot[allowed])]
+    else:
+      best = np.argmin(pixTot)
+    xTot = int(xNew[best])
+    yTot = int(yNew[best])
+    
+    w = 4
+    ym = yTot - w
+    yM = yTot + w
+    xm = xTot - w
+    xM = xTot + w
+    if ym < 0:
+      ym = 0
+    if xm < 0:
+      xm = 0
+    if yM > len(initialImage):
+      yM = len(initialImage)
+    if xM > len(initialImage[0]):
+      xM = len(initialImage[0])
+    
+    pixSur = np.min(frame[ym:yM, xm:xM]) #initialImage[ym:yM, xm:xM])
+    
+    # Calculates distance between new and old point
+    distSubsquentPoints = math.sqrt((xTot - x)**2 + (yTot - y)**2)
+    
+    pixSurMax = hyperparameters["headEmbededParamTailDescentPixThreshStop"]
+    # pixSurMax = 220 #150 #245 #150
+    if depth + distSubsquentPoints < maxDepth and ((pixSur < pixSurMax) or (depth < hyperparameters["authorizedRelativeLengthTailEnd"]*maxDepth)):
+      points = appendPoint(xTot, yTot, points)
+    else:
+      vectX = xTot - x
+      vectY = yTot - y
+      xTot  = int(x + (maxDepth / (depth + distSubsquentPoints)) * vectX)
+      yTot  = int(y + (maxDepth / (depth + distSubsquentPoints)) * vectY)
+      points = appendPoint(xTot, yTot, points)
+    if debug:
+      import zebrazoom.code.util as util
 
-    cv2.circle(frame, (xTot, yTot), 3, (255,0,0),   -1)
-    util.showFrame(frame, title='HeadEmbeddedTailTracking')
+      cv2.circle(frame, (xTot, yTot), 3, (255,0,0),   -1)
+      util.showFrame(frame, title='HeadEmbeddedTailTracking')
+      
+    newTheta = calculateAngle(x,y,xTot,yTot)
+    if firstNewTheta is None:
+      firstNewTheta = newTheta
+    if not(distSubsquentPoints > 0 and depth + distSubsquentPoints < maxDepth and ((pixSur < pixSurMax) or (depth < hyperparameters["authorizedRelativeLengthTailEnd"]*maxDepth))):
+      break
     
-  newTheta = calculateAngle(x,y,xTot,yTot)
-  if distSubsquentPoints > 0 and depth + distSubsquentPoints < maxDepth and ((pixSur < pixSurMax) or (depth < hyperparameters["authorizedRelativeLengthTailEnd"]*maxDepth)):
-    (points,nop) = findNextPoints(depth+distSubsquentPoints,xTot,yTot,frame,points,newTheta,maxDepth,steps,nbList,initialImage,debug, hyperparameters)
+    # Only the first point of the descent is prevented from being close to dontChooseThisPoint
+    dontChooseThisPoint = []
+    depth = depth + distSubsquentPoints
+    [x, y] = [xTot, yTot]
+    angle  = newTheta
   
-  if depth == 0:
+  if firstDepth == 0:
     lenPoints = len(points[0]) - 1
     if points[0, lenPoints-1] == points[0, lenPoints] and points[1, lenPoints-1] == points[1, lenPoints]:
       points = points[:, :len(points[0])-1]
   
-  return (points,newTheta)
+  return (points,firstNewTheta)
 
 
 def weirdTrackingPoints(points, headPosition, tailTip):
@@ -93,64 +93,86 @@ def recenterPointAlongOrthogonalTailAxis(x,y,theta,frame,thresh1):
   
   return [xNew, yNew]
 
+# The rays are cast up to maxRayLength - 1 pixels away from the current point, in both directions
+maxRayLength = 100
+
+raysDirectionsCache = {}
+def getRaysDirections(nbList):
+  # Angles tested (and their cos and sin) for a given nbList, calculated only once
+  if nbList not in raysDirectionsCache:
+    thetasB = [i*(math.pi/nbList) for i in range(0,2*nbList)]
+    thetas  = [thetaB % math.pi for thetaB in thetasB]
+    raysDirectionsCache[nbList] = (np.array(thetasB), np.array(thetas), np.array([math.cos(theta) for theta in thetas]), np.array([math.sin(theta) for theta in thetas]))
+  return raysDirectionsCache[nbList]
+
+raysScoresCache = {}
+def getRaysScores(expDecreaseFactor):
+  # raysScores[k1][k2]: "score" of a segment fitted inside the blob made of k1 pixels in one direction and k2 pixels in the other (the terms are summed in the same order as they would be one by one)
+  if expDecreaseFactor not in raysScoresCache:
+    expTerms = [math.exp(-i*expDecreaseFactor) for i in range(0, maxRayLength - 1)]
+    raysScores = np.zeros((maxRayLength - 1, maxRayLength - 1))
+    ktot1 = 0
+    for k1 in range(0, maxRayLength - 1):
+      ktot = ktot1
+      for k2 in range(0, maxRayLength - 1):
+        raysScores[k1, k2] = ktot
+        ktot = ktot + expTerms[k2]
+      ktot1 = ktot1 + expTerms[k1]
+    raysScoresCache[expDecreaseFactor] = raysScores
+  return raysScoresCache[expDecreaseFactor]
+
+def castRays(x, y, cosThetas, sinThetas, thresh1, direction):
+  # For each angle, number of pixels that can be travelled from (x, y) while staying inside the blob, all angles and distances being sampled at once
+  radii = np.arange(1, maxRayLength)
+  xNew = np.clip((x + direction * (radii[np.newaxis, :] * cosThetas[:, np.newaxis])).astype(int), 0, len(thresh1[0]) - 1)
+  yNew = np.clip((y + direction * (radii[np.newaxis, :] * sinThetas[:, np.newaxis])).astype(int), 0, len(thresh1) - 1)
+  outsideBlob = thresh1[yNew, xNew] >= 150
+  return np.where(np.any(outsideBlob, axis=1), np.argmax(outsideBlob, axis=1), maxRayLength - 2)
+
 def findNextPoints(x,y,thresh1,frame,depth,points,lastTheta,debugAdv,nbList,thetaDiffAccept,expDecreaseFactor,step,debugTracking):
 
   thresh1lenX = len(thresh1[0]) - 1
   thresh1lenY = len(thresh1) - 1
   
-  maxThetaCorrected = -1
-
-  if debugAdv:
-    import zebrazoom.code.util as util
-
-    util.showFrame(frame, title='Frame')
-
-  if (depth < 25): #15):
+  (thetasB, thetas, cosThetas, sinThetas) = getRaysDirections(nbList)
+  raysScores = getRaysScores(expDecreaseFactor)
+  
+  firstMaxThetaCorrected = -1
+  firstIteration = True
+  
+  # Each iteration finds the next point of the tail from the current one (x, y)
+  while True:
+    
+    maxThetaCorrected = -1
+    
+    if debugAdv:
+      import zebrazoom.code.util as util
+      
+      util.showFrame(frame, title='Frame')
+    
+    if not(depth < 25): #15):
+      break
+    
     maxTheta = 0
     ktotMax = 0
     k1Max = 0
     k2Max = 0
     
-    l = [i*(math.pi/nbList) for i in range(0,2*nbList) if abs(i*(math.pi/nbList)-lastTheta) < thetaDiffAccept]
-      
-    for thetaB in l:
-      theta = thetaB % math.pi
-      
-      # Find furtherest point away from "old" "current" point still inside blob along the theta angle in one direction
-      pixVal = 1
-      k1 = 1
-      while pixVal < 150 and k1 < 100:
-        xNew = assignValueIfBetweenRange(int(x + k1 * (math.cos(theta))), 0, thresh1lenX)
-        yNew = assignValueIfBetweenRange(int(y + k1 * (math.sin(theta))), 0, thresh1lenY)
-        pixVal = thresh1[yNew][xNew]
-        k1 = k1 + 1
-      k1 = k1 - 2
-      
-      # Find furtherest point away from "old" "current" point still inside blob along the theta angle in the other direction
-      pixVal = 1
-      k2 = 1
-      while pixVal < 150 and k2 < 100:
-        xNew = assignValueIfBetweenRange(int(x - k2 * (math.cos(theta)) ), 0, thresh1lenX)
-        yNew = assignValueIfBetweenRange(int(y - k2 * (math.sin(theta)) ), 0, thresh1lenY)
-        pixVal = thresh1[yNew][xNew]
-        k2 = k2 + 1
-      k2 = k2 - 2
-      ktot = k1 + k2
-      
-      # Calculate "score" for this theta angle based on the lenght of the segment fitted inside the blob
-      ktot = 0
-      for i in range(0,k1):
-        ktot = ktot + math.exp(-i*expDecreaseFactor)
-      for i in range(0,k2):
-        ktot = ktot + math.exp(-i*expDecreaseFactor)
-      
-      # Keeps that theta angle as maximum if appropriate
-      if (ktot > ktotMax):
-        ktotMax = ktot
-        k1Max = k1
-        k2Max = k2
-        maxTheta = theta
-        
+    anglesTested = np.nonzero(np.abs(thetasB - lastTheta) < thetaDiffAccept)[0]
+    
+    if len(anglesTested):
+      # Find furtherest points away from "old" "current" point still inside blob along each theta angle in both directions
+      k1 = castRays(x, y, cosThetas[anglesTested], sinThetas[anglesTested], thresh1, 1)
+      k2 = castRays(x, y, cosThetas[anglesTested], sinThetas[anglesTested], thresh1, -1)
+      # Calculate "score" for each theta angle based on the lenght of the segment fitted inside the blob, and keeps the maximum
+      ktot = raysScores[k1, k2]
+      best = np.argmax(ktot)
+      if ktot[best] > ktotMax:
+        ktotMax = ktot[best]
+        k1Max = int(k1[best])
+        k2Max = int(k2[best])
+        maxTheta = thetas[anglesTested[best]]
+    
     # Calculates the two new possible points on both side of the local tail angle derivate
     if k1Max > step:
       x1 = assignValueIfBetweenRange(int(x + step  * (math.cos(maxTheta)) ), 0, thresh1lenX)
@@ -194,7 +216,7 @@ def findNextPoints(x,y,thresh1,frame,depth,points,lastTheta,debugAdv,nbList,thet
     distSubsquentPoints1 = (x1 - x)**2 + (y1 - y)**2
     distSubsquentPoints2 = (x2 - x)**2 + (y2 - y)**2
     
-    # If the distance between new and old point larger than 0, appends points and launch search for new point
+    # If the distance between new and old point larger than 0, appends points and goes on searching for the next point from the new one
     if (diffAngle1 > diffAngle2):
       if debugTracking:
         if thresh1[y2][x2] > 150:
@@ -203,12 +225,14 @@ def findNextPoints(x,y,thresh1,frame,depth,points,lastTheta,debugAdv,nbList,thet
           print("diffAngle2: ",diffAngle2," ; k2Max: ",k2Max," distSubsquentPoints2:",distSubsquentPoints2)
       cv2.circle(frame, (x2, y2), 1, (0,255,0),   -1)
       check = checkNewPointNotRedundant(points, x2, y2)
-      if check:
-        points = appendPoint(x2, y2, points)
-        if distSubsquentPoints2 > 0:
-          maxThetaCorrected = maxTheta + math.pi
-          newTheta = calculateAngle(x,y,x2,y2)
-          (points,nop) = findNextPoints(x2,y2,thresh1,frame,depth+1,points,newTheta,debugAdv,nbList,thetaDiffAccept,expDecreaseFactor,step,debugTracking)
+      if not(check):
+        break
+      points = appendPoint(x2, y2, points)
+      if not(distSubsquentPoints2 > 0):
+        break
+      maxThetaCorrected = maxTheta + math.pi
+      newTheta = calculateAngle(x,y,x2,y2)
+      [x, y] = [x2, y2]
     else:
       if debugTracking:
         if thresh1[y1][x1] > 150:
@@ -217,14 +241,22 @@ def findNextPoints(x,y,thresh1,frame,depth,points,lastTheta,debugAdv,nbList,thet
           print("diffAngle1: ",diffAngle1," ; k1Max: ",k1Max," distSubsquentPoints1:",distSubsquentPoints1)
       cv2.circle(frame, (x1, y1), 1, (0,255,0),   -1)
       check = checkNewPointNotRedundant(points, x1, y1)
-      if check:
-        points = appendPoint(x1, y1, points)
-        if distSubsquentPoints1 > 0:
-          maxThetaCorrected = maxTheta
-          newTheta = calculateAngle(x,y,x1,y1)
-          (points,nop) = findNextPoints(x1,y1,thresh1,frame,depth+1,points,newTheta,debugAdv,nbList,thetaDiffAccept,expDecreaseFactor,step,debugTracking)
-        
-  return (points,maxThetaCorrected)
+      if not(check):
+        break
+      points = appendPoint(x1, y1, points)
+      if not(distSubsquentPoints1 > 0):
+        break
+      maxThetaCorrected = maxTheta
+      newTheta = calculateAngle(x,y,x1,y1)
+      [x, y] = [x1, y1]
+    
+    if firstIteration:
+      firstMaxThetaCorrected = maxThetaCorrected
+      firstIteration = False
+    depth = depth + 1
+    lastTheta = newTheta
+  
+  return (points,firstMaxThetaCorrected)
   
 def smoothTail(points, nbTailPoints):
   
@@ -11,6 +11,81 @@ from zebrazoom.code.deepLearningFunctions.labellingFunctions import drawWhitePoi
 from scipy.interpolate import UnivariateSpline
 from numpy import linspace
 
+def getBodyContourAndArea(thresh1_b, x, y, contourPrecision):
+  # Contour of the foreground image thresh1_b containing (x, y) and its area (-100000000 if there is no such contour)
+  bodyContour = 0
+  contours, hierarchy = cv2.findContours(thresh1_b, cv2.RETR_TREE, contourPrecision)
+  for contour in contours:
+    dist = cv2.pointPolygonTest(contour, (x, y), True)
+    if dist >= 0:
+      M = cv2.moments(contour)
+      if M['m00']:
+        bodyContour = contour
+  if not(type(bodyContour) == int):
+    nbBlackPixels = cv2.contourArea(bodyContour)
+  else:
+    nbBlackPixels = -100000000
+  return [bodyContour, nbBlackPixels]
+
+def getDifferenceWithBackground(hyperparameters, initialCurFrame, back):
+  # A pixel is in the foreground when its difference with the background is above minPixelDiffForBackExtract (and when it isn't above thresholdForBlobImg)
+  diff = back.astype('int32') - initialCurFrame.astype('int32')
+  if hyperparameters["thresholdForBlobImg"] < 255:
+    diff[initialCurFrame > hyperparameters["thresholdForBlobImg"]] = -1
+  else:
+    diff[:, :] = 256
+  return diff
+
+def findMinPixelDiffForBackExtractByBisection(hyperparameters, initialCurFrame, back, x, y, nbBlackPixelsMax, minPixelDiffForBackExtract, contourPrecision):
+  # Searches for the value of minPixelDiffForBackExtract giving the body area the closest to nbBlackPixelsMax, starting from minPixelDiffForBackExtract (usually the value found on the previous frame)
+  # As the body area decreases when minPixelDiffForBackExtract increases, the value is first bracketed with steps doubling at each try and then found by bisection
+  
+  diff = getDifferenceWithBackground(hyperparameters, initialCurFrame, back)
+  
+  # The foreground images obtained with all the thresholds are nested: thresholds with the same number of foreground pixels (calculated for all the thresholds at once from the histogram of diff) give the same image and are only evaluated once
+  histogram = np.bincount(np.clip(diff, -1, 255).flatten() + 1, minlength=257)
+  nbForegroundPixels = diff.size - np.cumsum(histogram)[1:]
+  nbForegroundPixels2bodyContourAndArea = {}
+  
+  minPixel2nbBlackPixels = {}
+  minPixel2bodyContour   = {}
+  low  = 0   # Highest threshold found giving a body area above nbBlackPixelsMax
+  high = 256 # Lowest threshold found giving a body area below or equal to nbBlackPixelsMax
+  step = 1
+  countTries = 0
+  minPixelDiffForBackExtract = min(max(int(minPixelDiffForBackExtract), 1), 255)
+  while (high - low > 1) and (countTries < 30):
+    nbForeground = nbForegroundPixels[minPixelDiffForBackExtract]
+    if not(nbForeground in nbForegroundPixels2bodyContourAndArea):
+      thresh1_b = (diff > minPixelDiffForBackExtract).astype(np.uint8) * 255
+      nbForegroundPixels2bodyContourAndArea[nbForeground] = getBodyContourAndArea(thresh1_b, x, y, contourPrecision)
+    [minPixel2bodyContour[minPixelDiffForBackExtract], minPixel2nbBlackPixels[minPixelDiffForBackExtract]] = nbForegroundPixels2bodyContourAndArea[nbForeground]
+    if minPixel2nbBlackPixels[minPixelDiffForBackExtract] > nbBlackPixelsMax:
+      low = minPixelDiffForBackExtract
+    else:
+      high = minPixelDiffForBackExtract
+    if high == 256:
+      minPixelDiffForBackExtract = min(minPixelDiffForBackExtract + step, 255)
+      step = step * 2
+    elif low == 0:
+      minPixelDiffForBackExtract = max(minPixelDiffForBackExtract - step, 1)
+      step = step * 2
+    else:
+      minPixelDiffForBackExtract = (low + high) // 2
+    countTries = countTries + 1
+  
+  best_minPixelDiffForBackExtract = 0
+  minDist = 10000000000000
+  for minPixelDiffForBackExtract in minPixel2nbBlackPixels:
+    dist = abs(minPixel2nbBlackPixels[minPixelDiffForBackExtract] - nbBlackPixelsMax)
+    if dist < minDist:
+      minDist = dist
+      best_minPixelDiffForBackExtract = minPixelDiffForBackExtract
+  
+  thresh1 = (diff > best_minPixelDiffForBackExtract).astype(np.uint8) * 255
+  
+  return [best_minPixelDiffForBackExtract, thresh1, minPixel2bodyContour[best_minPixelDiffForBackExtract]]
+
 def findBodyContour(headPosition, hyperparameters, thresh1, initialCurFrame, back, wellNumber=-1, frameNumber=-1):
 
   if hyperparameters["saveBodyMask"] and hyperparameters["bodyMask_addWhitePoints"]:
@@ -33,7 +108,18 @@ def findBodyContour(headPosition, hyperparameters, thresh1, initialCurFrame, bac
   else: # hyperparameters["findContourPrecision"] == "CHAIN_APPROX_NONE"
     contourPrecision = cv2.CHAIN_APPROX_NONE
   
-  if hyperparameters["recalculateForegroundImageBasedOnBodyArea"]:
+  if hyperparameters["recalculateForegroundImageBasedOnBodyArea"] and hyperparameters["recalculateForegroundImageBasedOnBodyAreaBisection"]:
+    
+    nbBlackPixelsMax = int(hyperparameters["adjustMinPixelDiffForBackExtract_nbBlackPixelsMax"] / hyperparameters["nbAnimalsPerWell"])
+    minPixelDiffForBackExtract = int(hyperparameters["minPixelDiffForBackExtract"])
+    if "minPixelDiffForBackExtractBody" in hyperparameters:
+      minPixelDiffForBackExtract = hyperparameters["minPixelDiffForBackExtractBody"]
+    
+    [minPixelDiffForBackExtract, thresh1, bodyContour] = findMinPixelDiffForBackExtractByBisection(hyperparameters, initialCurFrame, back, x, y, nbBlackPixelsMax, minPixelDiffForBackExtract, contourPrecision)
+    
+    hyperparameters["minPixelDiffForBackExtractBody"] = minPixelDiffForBackExtract
+  
+  elif hyperparameters["recalculateForegroundImageBasedOnBodyArea"]:
     
     minPixel2nbBlackPixels = {}
     countTries = 0
@@ -50,23 +136,7 @@ def findBodyContour(headPosition, hyperparameters, thresh1, initialCurFrame, bac
       curFrame[putToWhite] = 255
       ret, thresh1_b = cv2.threshold(curFrame, hyperparameters["thresholdForBlobImg"], 255, cv2.THRESH_BINARY)
       thresh1_b = 255 - thresh1_b
-      bodyContour = 0
-      contours, hierarchy = cv2.findContours(thresh1_b, cv2.RETR_TREE, contourPrecision)
-      for contour in contours:
-        dist = cv2.pointPolygonTest(contour, (x, y), True)
-        if dist >= 0:
-          M = cv2.moments(contour)
-          if M['m00']:
-            cx = int(M['m10']/M['m00'])
-            cy = int(M['m01']/M['m00'])
-            bodyContour = contour
-          else:
-            cx = 0
-            cy = 0
-      if not(type(bodyContour) == int):
-        nbBlackPixels = cv2.contourArea(bodyContour)
-      else:
-        nbBlackPixels = -100000000
+      [bodyContour, nbBlackPixels] = getBodyContourAndArea(thresh1_b, x, y, contourPrecision)
     
       minPixel2nbBlackPixels[minPixelDiffForBackExtract] = nbBlackPixels
       if nbBlackPixels > nbBlackPixelsMax:
@@ -25,12 +25,7 @@ def findTailExtremete(rotatedContour, bodyContour, aaa, bord1b, bord2b, debug, d
   DotProds = np.zeros(TotalBPts)
   distance = np.zeros(TotalBPts)
 
-  for i in range(0, TotalBPts):
-    distance[i] = 0
-
   distance2 = np.zeros(TotalBPts+1)
-  for i in range(0, TotalBPts):
-    distance2[i] = 0
     
   [d, distance2] = initialiseDistance2(distance2, rotatedContour)
  
@@ -63,19 +58,12 @@ def findTailExtremete(rotatedContour, bodyContour, aaa, bord1b, bord2b, debug, d
   max2 = (distance2[bord1] - distance2[0])  + (distance2[len(rotatedContour)] - distance2[bord2])
   
   if hyperparameters["checkAllContourForTailExtremityDetect"] == 0:
-    tailRange = []
     if (max1 > max2):
-      for i in range(bord1, bord2):
-        tailRange.append(i)
+      tailRange = np.arange(bord1, bord2)
     else:
-      for i in range(0, bord1):
-        tailRange.append(i)
-      for i in range(bord2, len(rotatedContour)):
-        tailRange.append(i)
+      tailRange = np.concatenate((np.arange(0, bord1), np.arange(bord2, len(rotatedContour))))
   else:
-    tailRange = []
-    for i in range(0, len(rotatedContour)):
-      tailRange.append(i)
+    tailRange = np.arange(0, len(rotatedContour))
     
   [max2, max_droite, min_gauche, max_bas, min_haut, ind_droite, ind_gauche, ind_bas, ind_haut] = insideTailExtremete(distance2, DotProds, max_droite, min_gauche, max_bas, min_haut, ind_droite, ind_gauche, ind_bas, ind_haut, tailRange, rotatedContour, dst)
     
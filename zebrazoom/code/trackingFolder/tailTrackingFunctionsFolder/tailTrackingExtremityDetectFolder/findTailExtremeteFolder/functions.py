@@ -12,19 +12,13 @@ from numpy import linspace
 
 def initialiseDistance2(distance, boundary):
   TotalBPts   = len(boundary)
+  # distance[i]: length of the contour from its first point to its i-th point (the contour being closed, distance[TotalBPts] is its full length)
+  AvantPts = boundary[:, 0]
+  Pts      = np.roll(AvantPts, -1, axis=0)
+  Dx = AvantPts[:, 0] - Pts[:, 0]
+  Dy = AvantPts[:, 1] - Pts[:, 1]
   distance[0] = 0
-  for i in range(1, TotalBPts+1):
-    if (i == TotalBPts):
-      Pt = boundary[0][0]
-    else:
-      Pt = boundary[i][0]
-    AvantPt = boundary[i-1][0]
-    Dx = AvantPt[0] - Pt[0]
-    Dy = AvantPt[1] - Pt[1]
-    if i:
-      distance[i] = distance[i-1] + math.sqrt(Dx*Dx + Dy*Dy)
-    else:
-      distance[i] = math.sqrt(Dx*Dx + Dy*Dy)
+  distance[1:TotalBPts+1] = np.cumsum(np.sqrt(Dx*Dx + Dy*Dy))
   return [distance[TotalBPts], distance]
 
   
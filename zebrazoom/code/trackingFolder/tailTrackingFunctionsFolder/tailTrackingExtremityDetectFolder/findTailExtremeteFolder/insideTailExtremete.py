@@ -26,56 +26,39 @@ def insideTailExtremete(distance, DotProds, max_droite, min_gauche, max_bas, min
     dist_calculate_curv = 3
   
   max = 0
-
-  AheadPtr  = 0
-  BehindPtr = 0
-  Ptr       = 0
-
-  juge = 0
-  x = 0
-  y = 0
-
-  for i in tailRange:
-    AheadPtr = (i + dist_calculate_curv) % TotalBPts
-    BehindPtr = (i + TotalBPts - dist_calculate_curv) % TotalBPts
-    Ptr = i % TotalBPts
-    AheadPt = boundary[AheadPtr][0]
-    Pt = boundary[Ptr][0]
-    
-    BehindPt    = boundary[BehindPtr][0]
-    AheadVec    = [AheadPt[0] - Pt[0],  AheadPt[1] - Pt[1]]
-    
-    BehindVec   = [Pt[0] - BehindPt[0], Pt[1] - BehindPt[1]]
-    DotProdVal  = PointDot(AheadVec, BehindVec)
-    DotProds[i] = DotProdVal
-    x = Pt[0]
-    y = Pt[1]
-    
-    # Hmm... not sure about this part bellow...
-    fin_boucle = tailRange[len(tailRange)-1]
-    juge = calculateJuge(i,distance,distance[fin_boucle-1])
-    # The line above should probably be replace by the one below at some point !!!
-    # juge=calculateJuge2(i,distance,bord1,bord2,TotalBPts);
-    # (juge > trackParameters.minDistFromTailExtremityToTailBasis)
-    
-    if x > max_droite:
-      max_droite = x
-      ind_droite = i
-    if x < min_gauche:
-      min_gauche = x
-      ind_gauche = i
-    if y > max_bas:
-      max_bas = y
-      ind_bas = i
-    if (y < min_haut): # and (juge < 0.20):
-      min_haut = y
-      ind_haut = i
-
-    droite = ind_droite
-    gauche = ind_gauche
-    haut   = ind_haut
-    bas    = ind_bas
-    
-    max = distance[i]
+  
+  tailRange = np.asarray(tailRange, dtype=int)
+  if len(tailRange) == 0:
+    return [max, max_droite, min_gauche, max_bas, min_haut, ind_droite, ind_gauche, ind_bas, ind_haut]
+  
+  # Curvature of the contour at each point of the tail range
+  AheadPts  = boundary[(tailRange + dist_calculate_curv) % TotalBPts, 0]
+  Pts       = boundary[tailRange % TotalBPts, 0]
+  BehindPts = boundary[(tailRange + TotalBPts - dist_calculate_curv) % TotalBPts, 0]
+  AheadVec  = AheadPts - Pts
+  BehindVec = Pts - BehindPts
+  DotProds[tailRange] = AheadVec[:, 0]*BehindVec[:, 0] + AheadVec[:, 1]*BehindVec[:, 1]
+  
+  # Right-most, left-most, lowest and highest points of the tail range (the first one in case of equality)
+  x = Pts[:, 0]
+  y = Pts[:, 1]
+  i = np.argmax(x)
+  if x[i] > max_droite:
+    max_droite = x[i]
+    ind_droite = tailRange[i]
+  i = np.argmin(x)
+  if x[i] < min_gauche:
+    min_gauche = x[i]
+    ind_gauche = tailRange[i]
+  i = np.argmax(y)
+  if y[i] > max_bas:
+    max_bas = y[i]
+    ind_bas = tailRange[i]
+  i = np.argmin(y)
+  if (y[i] < min_haut):
+    min_haut = y[i]
+    ind_haut = tailRange[i]
+  
+  max = distance[tailRange[-1]]
   
   return [max, max_droite, min_gauche, max_bas, min_haut, ind_droite, ind_gauche, ind_bas, ind_haut]
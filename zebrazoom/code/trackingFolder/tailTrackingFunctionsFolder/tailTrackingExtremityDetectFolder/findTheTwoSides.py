@@ -90,29 +90,18 @@ def findTheTwoSides(headPosition, bodyContour, dst, hyperparameters):
     headPos    = np.array(headPosition)
     testBorder = headPos + factor * unitVector
     testBorder = testBorder.astype(int)
-    while (cv2.pointPolygonTest(bodyContour, (testBorder[0], testBorder[1]), True) > 0) and (factor < 100) and (testBorder[0] >= 0) and (testBorder[1] >= 0) and (testBorder[0] < len(dst[0])) and (testBorder[1] < len(dst)):
+    while (cv2.pointPolygonTest(bodyContour, (float(testBorder[0]), float(testBorder[1])), True) > 0) and (factor < 100) and (testBorder[0] >= 0) and (testBorder[1] >= 0) and (testBorder[0] < len(dst[0])) and (testBorder[1] < len(dst)):
       factor = factor + 1
       testBorder = headPos + factor * unitVector
     
     # Finding the indexes of the two "border points" along the contour (these are the two points that are the closest from the 'mouth' of fish)
     xOtherBorder = testBorder[0]
     yOtherBorder = testBorder[1]
-    minDist1 = 1000000000000
-    minDist2 = 1000000000000
-    indMin1  = 0
-    indMin2  = 0
-    for i in range(0, len(bodyContour)):
-      Pt   = bodyContour[i][0]
-      dist = math.sqrt((Pt[0] - xOtherBorder)**2 + (Pt[1] - yOtherBorder)**2)
-      if (dist < minDist1):
-        minDist2 = minDist1
-        indMin2  = indMin1
-        minDist1 = dist
-        indMin1  = i
-      else:
-        if (dist < minDist2):
-          minDist2 = dist
-          indMin2  = i
+    Pts  = bodyContour[:, 0]
+    dist = np.sqrt((Pts[:, 0] - xOtherBorder)**2 + (Pts[:, 1] - yOtherBorder)**2)
+    closestPoints = np.argsort(dist, kind='stable')
+    indMin1 = int(closestPoints[0])
+    indMin2 = int(closestPoints[1]) if len(closestPoints) > 1 else 0
       
     res = [indMin1, indMin2, bestAngle + math.pi]
     
@@ -123,14 +112,8 @@ def findTheTwoSides(headPosition, bodyContour, dst, hyperparameters):
     x = headPosition[0]
     y = headPosition[1]
     
-    minDist = 1000000000000
-    indMin  = 0
-    for i in range(0, len(bodyContour)):
-      Pt   = bodyContour[i][0]
-      dist = math.sqrt((Pt[0] - x)**2 + (Pt[1] - y)**2)
-      if (dist < minDist):
-        minDist = dist
-        indMin  = i
+    Pts = bodyContour[:, 0]
+    indMin = np.argmin(np.sqrt((Pts[:, 0] - x)**2 + (Pts[:, 1] - y)**2))
     
     res[0] = indMin
     PtClosest = bodyContour[indMin][0]
@@ -144,21 +127,14 @@ def findTheTwoSides(headPosition, bodyContour, dst, hyperparameters):
     factor = 1
     testBorder = headPos + factor * unitVector
     testBorder = testBorder.astype(int)
-    while (cv2.pointPolygonTest(bodyContour, (testBorder[0], testBorder[1]), True) > 0) and (factor < 100) and (testBorder[0] >= 0) and (testBorder[1] >= 0) and (testBorder[0] < len(dst[0])) and (testBorder[1] < len(dst)):
+    while (cv2.pointPolygonTest(bodyContour, (float(testBorder[0]), float(testBorder[1])), True) > 0) and (factor < 100) and (testBorder[0] >= 0) and (testBorder[1] >= 0) and (testBorder[0] < len(dst[0])) and (testBorder[1] < len(dst)):
       factor = factor + 1
       testBorder = headPos + factor * unitVector
     
     xOtherBorder = testBorder[0]
     yOtherBorder = testBorder[1]
     
-    minDist = 1000000000000
-    indMin2  = 0
-    for i in range(0, len(bodyContour)):
-      Pt   = bodyContour[i][0]
-      dist = math.sqrt((Pt[0] - xOtherBorder)**2 + (Pt[1] - yOtherBorder)**2)
-      if (dist < minDist):
-        minDist = dist
-        indMin2  = i
+    indMin2 = np.argmin(np.sqrt((Pts[:, 0] - xOtherBorder)**2 + (Pts[:, 1] - yOtherBorder)**2))
     
     res[1] = indMin2
     
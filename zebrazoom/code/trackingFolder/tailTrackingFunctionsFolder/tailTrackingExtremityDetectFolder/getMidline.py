@@ -12,15 +12,6 @@ from numpy import linspace
 
 from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.tailTrackingExtremityDetectFolder.resampleSeqConstPtsPerArcLength import resampleSeqConstPtsPerArcLength
 
-def fillTailRanges(tailRange1,tailRange2,fillSecond,i,MostCurvyIndex):
-  if (i == MostCurvyIndex):
-    fillSecond = 1
-  if fillSecond == 0:
-    tailRange1.append(i)
-  else:
-    tailRange2.append(i)
-  return [tailRange1,tailRange2,fillSecond]
-
 def getMidline(bord1, bord2, MostCurvyIndex, boundary, dst, taille, distance2, debug, hyperparameters, nbTailPoints):
 
   nbTailPoints = taille
@@ -42,17 +33,15 @@ def getMidline(bord1, bord2, MostCurvyIndex, boundary, dst, taille, distance2, d
   max1 = distance2[bord2] - distance2[bord1] 
   max2 = (distance2[bord1] - distance2[0])  + (distance2[len(boundary)] - distance2[bord2])
   
-  tailRangeA = []
-  tailRangeB = []
-  fillSecond = 0
   if (max1 > max2):
-    for i in range(bord1, bord2):
-      [tailRangeA,tailRangeB,fillSecond] = fillTailRanges(tailRangeA,tailRangeB,fillSecond,i,MostCurvyIndex)
+    tailRange = np.arange(bord1, bord2)
   else:
-    for i in range(bord2, len(boundary)):
-      [tailRangeA,tailRangeB,fillSecond] = fillTailRanges(tailRangeA,tailRangeB,fillSecond,i,MostCurvyIndex)
-    for i in range(0, bord1):
-      [tailRangeA,tailRangeB,fillSecond] = fillTailRanges(tailRangeA,tailRangeB,fillSecond,i,MostCurvyIndex)
+    tailRange = np.concatenate((np.arange(bord2, len(boundary)), np.arange(0, bord1)))
+  # The tail range is split in two at MostCurvyIndex: the points before it form one side of the tail and the points after it the other side
+  MostCurvyPosition = np.nonzero(tailRange == MostCurvyIndex)[0]
+  MostCurvyPosition = MostCurvyPosition[0] if len(MostCurvyPosition) else len(tailRange)
+  tailRangeA = tailRange[:MostCurvyPosition]
+  tailRangeB = tailRange[MostCurvyPosition:]
   
   OrigBoundA = boundary[tailRangeA]
   OrigBoundB = boundary[tailRangeB]
@@ -71,17 +60,14 @@ def getMidline(bord1, bord2, MostCurvyIndex, boundary, dst, taille, distance2, d
     NBoundA = resampleSeqConstPtsPerArcLength(OrigBoundA, numTailPoints)
     NBoundB = resampleSeqConstPtsPerArcLength(OrigBoundB, numTailPoints)
 
+    # Points of the midline, from the tail basis to the tail tip
+    indexes   = np.arange(1, taille)
+    midPoints = (NBoundB[indexes % taille] + NBoundA[taille - indexes]) / 2
+    
     # calculates length of the tail
-    TotalDist = 0
-    for i in range(1, taille):
-      Pt  = NBoundB[i % taille]
-      Pt2 = NBoundA[taille - i]
-      x = (Pt[0]+Pt2[0]) / 2
-      y = (Pt[1]+Pt2[1]) / 2
-      if i > 1:
-        TotalDist = TotalDist + math.sqrt((x-xAvant)*(x-xAvant)+(y-yAvant)*(y-yAvant))
-      xAvant = x
-      yAvant = y
+    Dx = midPoints[1:, 0] - midPoints[:-1, 0]
+    Dy = midPoints[1:, 1] - midPoints[:-1, 1]
+    TotalDist = np.cumsum(np.sqrt(Dx*Dx + Dy*Dy))[-1] if len(Dx) else 0
       
     if ((TotalDist<hyperparameters["minTailSize"]) or (TotalDist>hyperparameters["maxTailSize"])):
     
@@ -92,22 +78,9 @@ def getMidline(bord1, bord2, MostCurvyIndex, boundary, dst, taille, distance2, d
       
       Tail = boundary[MostCurvyIndex][0]
       
-      point = np.array([Tail[0], Tail[1]])
-      output = np.insert(output, 0, point, axis=1)
-      
-      for i in range(1, taille):
-        Pt  = NBoundB[i % taille]
-        Pt2 = NBoundA[taille - i]
-        point = np.array([(Pt[0]+Pt2[0])/2, (Pt[1]+Pt2[1])/2])
-        output = np.insert(output, 0, point, axis=1)
-      
-      i = taille-2
-      if i >= 1:
-        Pt =  NBoundB[i % taille]
-        Pt2 = NBoundA[taille-i]
-        ClosestPoint = [ (Pt[0]+Pt2[0])/2 , (Pt[1]+Pt2[1])/2 ]
-      else:
-        ClosestPoint = [-200, -200]
+      output = np.zeros((1, taille, 2))
+      output[0, :taille-1] = midPoints[::-1]
+      output[0, taille-1]  = Tail
   
   else:
   
@@ -115,8 +88,7 @@ def getMidline(bord1, bord2, MostCurvyIndex, boundary, dst, taille, distance2, d
     # WE SHOULD CHECK FOR TAIL LENGHT
     # ALSO WE SHOULD DO SOMETHING BETTER THAN JUST PUTTING THE TAIL TIP FOR EACH OF THE TEN POINTS !!!
     Tail = boundary[MostCurvyIndex][0]    
-    point = np.array([Tail[0], Tail[1]])
-    for i in range(0, taille):
-      output = np.insert(output, 0, point, axis=1)    
+    output = np.zeros((1, taille, 2))
+    output[0, :] = Tail
   
   return output
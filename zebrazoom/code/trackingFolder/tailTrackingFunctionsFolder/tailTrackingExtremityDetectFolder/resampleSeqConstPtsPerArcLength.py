@@ -12,38 +12,18 @@ from numpy import linspace
 
 def resampleSeqConstPtsPerArcLength(OrigBound, numTailPoints):
   
-  n = len(OrigBound)
-  distOrg = np.zeros(n)
-  xOrg    = np.zeros(n)
-  yOrg    = np.zeros(n)
+  xOrg = OrigBound[:, 0, 0]
+  yOrg = OrigBound[:, 0, 1]
   
-  totDist = 0
-  distOrg[0] = totDist
-  xOrg[0] = OrigBound[0][0][0]
-  yOrg[0] = OrigBound[0][0][1]
+  # Cumulative arc length along the sequence of points
+  distOrg = np.zeros(len(OrigBound))
+  distOrg[1:] = np.cumsum(np.sqrt((xOrg[:-1] - xOrg[1:])**2 + (yOrg[:-1] - yOrg[1:])**2))
+  totDist = distOrg[-1]
   
-  for i in range(1, n):
-    diff       = math.sqrt((OrigBound[i-1][0][0]-OrigBound[i][0][0])**2 + (OrigBound[i-1][0][1]-OrigBound[i][0][1])**2)
-    totDist    = totDist + diff
-    distOrg[i] = totDist
-  
-  uniDist = np.zeros(numTailPoints)
-  uniX    = np.zeros(numTailPoints)
-  uniY    = np.zeros(numTailPoints)
-  
-  for i in range(0, numTailPoints):
-    uniDist[i] = totDist * (i/(numTailPoints-1))
-  
-  for i in range(1, n):
-    xOrg[i] = OrigBound[i][0][0]
-    yOrg[i] = OrigBound[i][0][1]
-  
-  uniX = np.interp(uniDist, distOrg, xOrg)
-  uniY = np.interp(uniDist, distOrg, yOrg)
+  uniDist = totDist * (np.arange(0, numTailPoints) / (numTailPoints-1))
   
   output = np.zeros((numTailPoints, 2))
-  for i in range(0, numTailPoints):
-    output[i][0] = uniX[i]
-    output[i][1] = uniY[i]
+  output[:, 0] = np.interp(uniDist, distOrg, xOrg)
+  output[:, 1] = np.interp(uniDist, distOrg, yOrg)
   
   return output
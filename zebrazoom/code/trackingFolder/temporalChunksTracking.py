@@ -0,0 +1,142 @@
+import math
+import os
+import multiprocessing as mp
+import numpy as np
+
+import zebrazoom.videoFormatConversion.zzVideoReading as zzVideoReading
+from zebrazoom.code.sharedFrameBroadcast import getFramesRangeTrackedPerWell
+from zebrazoom.code.trackingFolder.tracking import tracking, headEmbededTrackingInitialization
+from zebrazoom.code.trackingFolder.trackingFunctions import getNbWellsTrackedInParallel
+from zebrazoom.code.trackingFolder.blackFramesDetection import savingBlackFrames
+from zebrazoom.code.trackingFolder.postProcessMultipleTrajectories import postProcessMultipleTrajectories
+from zebrazoom.code.trackingFolder.refactoredCode2022.identitiesLinkage import getDetected, calculateDistanceMatrix, findOptimalLinks, linkTrackletsOverSlidingWindow
+
+
+def getTemporalChunks(firstFrame, lastFrame, nbChunks, nbWarmUpFrames):
+  # Returns, for each chunk, [first frame tracked (warm up frames included), first frame kept in the final results, last frame tracked]
+  nbFrames  = lastFrame - firstFrame + 1
+  nbChunks  = max(1, min(nbChunks, nbFrames // max(1, nbWarmUpFrames)))
+  chunkSize = math.ceil(nbFrames / nbChunks)
+  return [[max(firstFrame, chunkFirstFrame - nbWarmUpFrames), chunkFirstFrame, min(lastFrame, chunkFirstFrame + chunkSize - 1)] for chunkFirstFrame in range(firstFrame, lastFrame + 1, chunkSize)]
+
+
+def getChunkHyperparameters(hyperparameters, chunkFirstFrame, chunkLastFrame):
+  chunkHyperparameters = hyperparameters.copy()
+  chunkHyperparameters["firstFrame"] = chunkFirstFrame
+  chunkHyperparameters["firstFrameForTracking"] = -1
+  chunkHyperparameters["lastFrame"] = chunkLastFrame
+  chunkHyperparameters["onlyDoTheTrackingForThisNumberOfFrames"] = 0
+  return chunkHyperparameters
+
+
+def getMeanDetectedPositions(headPositions):
+  # Mean of the positions of each animal which are not nan (nan if there are none)
+  nbDetected = np.sum(np.logical_not(np.isnan(headPositions[:, :, 0])), axis=1)
+  return np.where(nbDetected[:, np.newaxis] > 0, np.nansum(headPositions, axis=1) / np.maximum(nbDetected, 1)[:, np.newaxis], np.nan)
+
+
+def findAnimalIdsCorrespondanceWithPreviousChunk(trackingHeadTailAllAnimals, chunkTrackingHeadTailAllAnimals, firstFrame, warmUpFirstFrame, chunkFirstFrame):
+  # The animals ids can be permuted from one chunk to the next: the ids are matched on the warm up frames, which were tracked by both chunks
+  # The animals not detected on a frame (head position (0, 0)) are set to nan and left out of the distances, as when linking the positions frame by frame
+  headPositionsPreviousChunk = trackingHeadTailAllAnimals[:, warmUpFirstFrame-firstFrame:chunkFirstFrame-firstFrame, 0].astype(float)
+  headPositionsChunk         = chunkTrackingHeadTailAllAnimals[:, :chunkFirstFrame-warmUpFirstFrame, 0].astype(float)
+  headPositionsPreviousChunk[np.logical_not(getDetected(headPositionsPreviousChunk))] = np.nan
+  headPositionsChunk[np.logical_not(getDetected(headPositionsChunk))] = np.nan
+  distances = np.sqrt(np.sum((headPositionsPreviousChunk[:, np.newaxis] - headPositionsChunk[np.newaxis, :])**2, axis=3))
+  nbFramesCompared = np.sum(np.logical_not(np.isnan(distances)), axis=2)
+  costMatrix = np.nansum(distances, axis=2) / np.maximum(nbFramesCompared, 1) # mean distance over the frames where both animals are detected
+  # Animals never detected on the same warm up frame are compared with their mean positions over the warm up frames (nan if an animal is never detected)
+  neverCompared = nbFramesCompared == 0
+  if np.any(neverCompared):
+    costMatrix[neverCompared] = calculateDistanceMatrix(getMeanDetectedPositions(headPositionsPreviousChunk), getMeanDetectedPositions(headPositionsChunk))[neverCompared]
+  animalIds = findOptimalLinks(costMatrix, np.logical_not(np.isnan(costMatrix)))
+  # The animals that can't be matched (not detected on the warm up frames) take the remaining ids
+  animalIds[animalIds == -1] = np.setdiff1d(np.arange(len(animalIds)), animalIds)
+  return animalIds
+
+
+def temporalChunksTracking(videoPath, background, wellNumber, wellPositions, hyperparameters, videoName):
+
+  [firstFrame, lastFrame] = getFramesRangeTrackedPerWell(hyperparameters)
+  arraysLastFrame = hyperparameters["lastFrame"] # the tracking arrays cover all frames up to lastFrame even if onlyDoTheTrackingForThisNumberOfFrames is set
+  nbTailPoints    = hyperparameters["nbTailPoints"]
+  nbAnimals       = hyperparameters["nbAnimalsPerWell"]
+
+  # The parameters calculated on the first frame of the video (possibly with user input) are calculated only once and shared with all chunks
+  headEmbededInitialState = None
+  if hyperparameters["headEmbeded"] == 1:
+    cap = zzVideoReading.VideoCapture(videoPath)
+    frame_width  = int(cap.get(3))
+    frame_height = int(cap.get(4))
+    cap.set(1, firstFrame)
+    headEmbededInitialState = headEmbededTrackingInitialization(cap, videoPath, background, firstFrame, wellNumber, wellPositions, hyperparameters, videoName, frame_width, frame_height, np.zeros((nbAnimals, 1)), np.zeros((nbAnimals, 1, nbTailPoints, 2)), 0)
+    cap.release()
+    hyperparameters = headEmbededInitialState[0]
+
+  if hyperparameters["headEmbeded"] == 1:
+    # Each frame of a head embedded animal is tracked only based on the first frame: no warm up is necessary, the tracking of the first frame is given to all chunks instead
+    chunks = getTemporalChunks(firstFrame, lastFrame, int(hyperparameters["temporalChunksTrackingNbProcesses"]), 1)
+    [firstFrameTrackingHeadTail, firstFrameTrackingHeading] = tracking(videoPath, background, wellNumber, wellPositions, getChunkHyperparameters(hyperparameters, firstFrame, firstFrame), videoName, 0, None, headEmbededInitialState, True)[:2]
+    chunks = [chunks[0]] + [[chunkFirstFrame - 1, chunkFirstFrame, chunkLastFrame] for [warmUpFirstFrame, chunkFirstFrame, chunkLastFrame] in chunks[1:]]
+  else:
+    chunks = getTemporalChunks(firstFrame, lastFrame, int(hyperparameters["temporalChunksTrackingNbProcesses"]), int(hyperparameters["temporalChunksTrackingNbWarmUpFrames"]))
+  print("Tracking of well", wellNumber, "split into", len(chunks), "temporal chunks")
+
+  chunksArgs = []
+  for [warmUpFirstFrame, chunkFirstFrame, chunkLastFrame] in chunks:
+    chunkHyperparameters = getChunkHyperparameters(hyperparameters, warmUpFirstFrame, chunkLastFrame)
+    chunkHeadEmbededInitialState = None
+    if headEmbededInitialState is not None:
+      chunkHeadEmbededInitialState = [chunkHyperparameters] + headEmbededInitialState[1:]
+      if chunkFirstFrame > firstFrame:
+        chunkHeadEmbededInitialState += [firstFrameTrackingHeadTail[:, 0], firstFrameTrackingHeading[:, 0]]
+    chunksArgs.append((videoPath, background, wellNumber, wellPositions, chunkHyperparameters, videoName, 0, None, chunkHeadEmbededInitialState, True))
+  # The wells already tracked in parallel share the cores with the chunks
+  nbProcesses = min(len(chunks), max(1, (os.cpu_count() or 1) // getNbWellsTrackedInParallel(hyperparameters)))
+  with mp.Pool(nbProcesses) as pool:
+    chunksTrackingData = pool.starmap(tracking, chunksArgs)
+
+  # Stitching the chunks together
+  trackingHeadTailAllAnimals = np.zeros((nbAnimals, arraysLastFrame-firstFrame+1, nbTailPoints, 2))
+  trackingHeadingAllAnimals = np.zeros((nbAnimals, arraysLastFrame-firstFrame+1))
+  trackingEyesAllAnimals = np.zeros((nbAnimals, arraysLastFrame-firstFrame+1, 8)) if hyperparameters["eyeTracking"] else 0
+  trackingProbabilityOfGoodDetection = np.zeros((nbAnimals, arraysLastFrame-firstFrame+1)) if type(chunksTrackingData[0][3]) != int else 0
+  auDessusPerAnimalId = [np.zeros((arraysLastFrame-firstFrame+1, 1)) for animalId in range(0, nbAnimals)] if hyperparameters["detectMovementWithRawVideoInsideTracking"] else 0
+
+  for [warmUpFirstFrame, chunkFirstFrame, chunkLastFrame], [chunkTrackingHeadTailAllAnimals, chunkTrackingHeadingAllAnimals, chunkTrackingEyesAllAnimals, chunkTrackingProbabilityOfGoodDetection, chunkAuDessusPerAnimalId] in zip(chunks, chunksTrackingData):
+
+    if nbAnimals > 1 and chunkFirstFrame > warmUpFirstFrame:
+      animalIds = findAnimalIdsCorrespondanceWithPreviousChunk(trackingHeadTailAllAnimals, chunkTrackingHeadTailAllAnimals, firstFrame, warmUpFirstFrame, chunkFirstFrame)
+    else:
+      animalIds = np.arange(nbAnimals)
+
+    kept     = slice(chunkFirstFrame - warmUpFirstFrame, chunkLastFrame - warmUpFirstFrame + 1)
+    stitched = slice(chunkFirstFrame - firstFrame, chunkLastFrame - firstFrame + 1)
+    trackingHeadTailAllAnimals[:, stitched] = chunkTrackingHeadTailAllAnimals[animalIds, kept]
+    trackingHeadingAllAnimals[:, stitched]  = chunkTrackingHeadingAllAnimals[animalIds, kept]
+    if type(trackingEyesAllAnimals) != int:
+      trackingEyesAllAnimals[:, stitched] = chunkTrackingEyesAllAnimals[animalIds, kept]
+    if type(trackingProbabilityOfGoodDetection) != int:
+      trackingProbabilityOfGoodDetection[:, stitched] = chunkTrackingProbabilityOfGoodDetection[animalIds, kept]
+    if type(auDessusPerAnimalId) != int:
+      for animalId in range(0, nbAnimals):
+        auDessusPerAnimalId[animalId][stitched] = chunkAuDessusPerAnimalId[animalIds[animalId]][kept]
+
+  if hyperparameters["identitiesLinkageSlidingWindow"] and nbAnimals > 1:
+    linkTrackletsOverSlidingWindow(trackingHeadTailAllAnimals, [trackingData for trackingData in [trackingHeadingAllAnimals, trackingEyesAllAnimals, trackingProbabilityOfGoodDetection, auDessusPerAnimalId] if type(trackingData) != int], hyperparameters)
+  
+  if hyperparameters["postProcessMultipleTrajectories"]:
+    [trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingEyesAllAnimals] = postProcessMultipleTrajectories(trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingEyesAllAnimals, trackingProbabilityOfGoodDetection, hyperparameters, wellPositions)
+
+  savingBlackFrames(hyperparameters, videoName, trackingHeadTailAllAnimals)
+
+  print("Tracking done for well", wellNumber)
+  if hyperparameters["popUpAlgoFollow"]:
+    from zebrazoom.code.popUpAlgoFollow import prepend
+    prepend("Tracking done for well "+ str(wellNumber))
+
+  [headPositionFirstFrame, tailTipFirstFrame] = headEmbededInitialState[1:3] if headEmbededInitialState is not None else [[], []]
+  if hyperparameters["detectMovementWithRawVideoInsideTracking"]:
+    return [trackingHeadTailAllAnimals, trackingHeadingAllAnimals, trackingEyesAllAnimals, headPositionFirstFrame, tailTipFirstFrame, auDessusPerAnimalId]
+  else:
+    return [trackingHeadTailAllAnimals, trackingHeadingAllAnimals, trackingEyesAllAnimals, headPositionFirstFrame, tailTipFirstFrame]
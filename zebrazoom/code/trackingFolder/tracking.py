@@ -14,6 +14,7 @@ from zebrazoom.code.trackingFolder.blackFramesDetection import getThresForBlackF
 from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.getTailTipManual import getHeadPositionByFileSaved, findTailTipByUserInput, getTailTipByFileSaved, findHeadPositionByUserInput, getAccentuateFrameForManualPointSelect
 from zebrazoom.code.trackingFolder.eyeTracking.eyeTracking import eyeTracking, eyeTrackingHeadEmbedded
 from zebrazoom.code.trackingFolder.postProcessMultipleTrajectories import postProcessMultipleTrajectories
+from zebrazoom.code.trackingFolder.refactoredCode2022.identitiesLinkage import linkTrackletsOverSlidingWindow
 
 from zebrazoom.code.getImage.headEmbededFrame import headEmbededFrame
 from zebrazoom.code.getImage.headEmbededFrameBackExtract import headEmbededFrameBackExtract
@@ -25,12 +26,90 @@ from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.headEmbededTailTr
 from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.headEmbededTailTrackingTeresaNicolson import headEmbededTailTrackFindMaxDepthTeresaNicolson, headEmbededTailTrackingTeresaNicolson
 from zebrazoom.code.trackingFolder.tailTrackingFunctionsFolder.centerOfMassTailTracking import centerOfMassTailTrackFindMaxDepth
 
-from zebrazoom.code.trackingFolder.trackingFunctions import addBlackLineToImgSetParameters
+from zebrazoom.code.trackingFolder.trackingFunctions import addBlackLineToImgSetParameters, trackingUsesGrayscaleFrames, canUseTemporalChunksTracking
 
 from zebrazoom.code.updateBackgroundAtInterval import updateBackgroundAtInterval
 
 
-def tracking(videoPath, background, wellNumber, wellPositions, hyperparameters, videoName, dlModel=0):
+def headEmbededTrackingInitialization(cap, videoPath, background, firstFrame, wellNumber, wellPositions, hyperparameters, videoName, frame_width, frame_height, trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingProbabilityOfGoodDetection):
+  
+  nbTailPoints = hyperparameters["nbTailPoints"]
+  heading = 0.7
+  maxDepth = 0
+  headPositionFirstFrame = []
+  tailTipFirstFrame = []
+  leftEyeCoordinate  = []
+  rightEyeCoordinate = []
+  
+  # Getting images
+  
+  if hyperparameters["headEmbededRemoveBack"] == 0 and hyperparameters["headEmbededAutoSet_BackgroundExtractionOption"] == 0:
+    [frame, thresh1] = headEmbededFrame(videoPath, firstFrame, wellNumber, wellPositions, hyperparameters)
+  else:
+    hyperparameters["headEmbededRemoveBack"] = 1
+    hyperparameters["minPixelDiffForBackExtract"] = hyperparameters["headEmbededAutoSet_BackgroundExtractionOption"]
+    [frame, thresh1] = headEmbededFrameBackExtract(videoPath, background, hyperparameters, firstFrame, wellNumber, wellPositions)
+  
+  # Setting hyperparameters in order to add line on image
+  if hyperparameters["addBlackLineToImg_Width"]:
+    hyperparameters = addBlackLineToImgSetParameters(hyperparameters, frame, videoName)
+  
+  # (x, y) coordinates for both eyes for head embedded fish eye tracking
+  if hyperparameters["eyeTracking"] and hyperparameters["headEmbeded"] == 1:
+    forEye = getAccentuateFrameForManualPointSelect(frame, hyperparameters)
+    if True:
+      from PyQt5.QtWidgets import QApplication
+
+      import zebrazoom.code.util as util
+
+      leftEyeCoordinate = list(util.getPoint(np.uint8(forEye * 255), "Click on the center of the left eye", zoomable=True, dialog=not hasattr(QApplication.instance(), 'window')))
+      rightEyeCoordinate = list(util.getPoint(np.uint8(forEye * 255), "Click on the center of the right eye", zoomable=True, dialog=not hasattr(QApplication.instance(), 'window')))
+    else:
+      leftEyeCoordinate  = [261, 201] # [267, 198] # [210, 105]
+      rightEyeCoordinate = [285, 157] # [290, 151] # [236, 72]
+    print("leftEyeCoordinate:", leftEyeCoordinate)
+    print("rightEyeCoordinate:", rightEyeCoordinate)
+  
+  # if hyperparameters["invertBlackWhiteOnImages"]:
+    # frame   = 255 - frame
+  
+  gray = frame.copy()
+  
+  oppHeading = (heading + math.pi) % (2 * math.pi)
+  
+  # Getting headPositionFirstFrame and tailTipFirstFrame positions
+  if os.path.exists(videoPath+'HP.csv'):
+    headPositionFirstFrame = getHeadPositionByFileSaved(videoPath)
+  else:
+    if hyperparameters["findHeadPositionByUserInput"]:
+      frameForManualPointSelection = getAccentuateFrameForManualPointSelect(frame, hyperparameters)
+      headPositionFirstFrame = findHeadPositionByUserInput(frameForManualPointSelection, firstFrame, videoPath, hyperparameters, wellNumber, wellPositions)
+    else:
+      [frame, gray, thresh1, blur, thresh2, frame2, initialCurFrame, back, xHead, yHead] = getImages(hyperparameters, cap, videoPath, firstFrame, background, wellNumber, wellPositions)
+      cap.set(1, firstFrame)
+      [trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingProbabilityOfGoodDetection, lastFirstTheta] = headTrackingHeadingCalculation(hyperparameters, firstFrame, firstFrame, blur, thresh1, thresh2, gray, hyperparameters["erodeSize"], frame_width, frame_height, trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingProbabilityOfGoodDetection, headPositionFirstFrame, wellPositions[wellNumber]["lengthX"])
+  if os.path.exists(videoPath+'.csv'):
+    tailTipFirstFrame  = getTailTipByFileSaved(hyperparameters,videoPath)
+  else:
+    frameForManualPointSelection = getAccentuateFrameForManualPointSelect(frame, hyperparameters)
+    tailTipFirstFrame  = findTailTipByUserInput(frameForManualPointSelection, firstFrame, videoPath, hyperparameters, wellNumber, wellPositions)
+  if hyperparameters["automaticallySetSomeOfTheHeadEmbededHyperparameters"] == 1:
+    hyperparameters = adjustHeadEmbededHyperparameters(hyperparameters, frame, headPositionFirstFrame, tailTipFirstFrame)
+  # Getting max depth
+  if hyperparameters["headEmbededTeresaNicolson"] == 1:
+    if len(headPositionFirstFrame) == 0:
+      headPositionFirstFrame = [trackingHeadTailAllAnimals[0][0][0][0], trackingHeadTailAllAnimals[0][0][0][1]]
+    maxDepth = headEmbededTailTrackFindMaxDepthTeresaNicolson(headPositionFirstFrame,nbTailPoints,firstFrame,headPositionFirstFrame[0],headPositionFirstFrame[1],thresh1,frame,hyperparameters,oppHeading,tailTipFirstFrame)
+  else:
+    if hyperparameters["centerOfMassTailTracking"] == 0:
+      maxDepth = headEmbededTailTrackFindMaxDepth(headPositionFirstFrame,nbTailPoints,firstFrame,headPositionFirstFrame[0],headPositionFirstFrame[1],thresh1,frame,hyperparameters,oppHeading,tailTipFirstFrame)
+    else:
+      maxDepth = centerOfMassTailTrackFindMaxDepth(headPositionFirstFrame,nbTailPoints,firstFrame,headPositionFirstFrame[0],headPositionFirstFrame[1],thresh1,frame,hyperparameters,oppHeading,tailTipFirstFrame)
+  
+  return [hyperparameters, headPositionFirstFrame, tailTipFirstFrame, maxDepth, leftEyeCoordinate, rightEyeCoordinate]
+
+
+def tracking(videoPath, background, wellNumber, wellPositions, hyperparameters, videoName, dlModel=0, sharedFrameReader=None, headEmbededInitialState=None, temporalChunk=False):
   
   if hyperparameters["trackingDL"]:
     import torch
@@ -44,6 +123,12 @@ def tracking(videoPath, background, wellNumber, wellPositions, hyperparameters,
     [trackingHeadTailAllAnimals, trackingHeadingAllAnimals, trackingEyesAllAnimals] = fishTailTrackingDifficultBackground(videoPath, wellNumber, wellPositions, hyperparameters, videoName)
     return [trackingHeadTailAllAnimals, trackingHeadingAllAnimals, trackingEyesAllAnimals, 0, 0]
   
+  if not(temporalChunk) and canUseTemporalChunksTracking(hyperparameters):
+    from zebrazoom.code.trackingFolder.temporalChunksTracking import temporalChunksTracking
+    if sharedFrameReader is not None:
+      sharedFrameReader.release()
+    return temporalChunksTracking(videoPath, background, wellNumber, wellPositions, hyperparameters, videoName)
+  
   firstFrame = hyperparameters["firstFrame"]
   if hyperparameters["firstFrameForTracking"] != -1:
     firstFrame = hyperparameters["firstFrameForTracking"]
@@ -58,16 +143,15 @@ def tracking(videoPath, background, wellNumber, wellPositions, hyperparameters,
   headPositionFirstFrame = []
   tailTipFirstFrame = []
   
-  cap = zzVideoReading.VideoCapture(videoPath)
+  if sharedFrameReader is not None:
+    cap = sharedFrameReader
+  else:
+    cap = zzVideoReading.VideoCapture(videoPath, grayscale=trackingUsesGrayscaleFrames(hyperparameters), nbFramesPrefetched=hyperparameters["nbFramesPrefetchedInBackgroundThread"])
   if (cap.isOpened()== False): 
     print("Error opening video stream or file")
   frame_width  = int(cap.get(3))
   frame_height = int(cap.get(4))
   
-  heading = -1
-  if hyperparameters["headEmbeded"]:
-    heading = 0.7
-    
   trackingHeadTailAllAnimals = np.zeros((hyperparameters["nbAnimalsPerWell"], lastFrame-firstFrame+1, nbTailPoints, 2))
   trackingHeadingAllAnimals = np.zeros((hyperparameters["nbAnimalsPerWell"], lastFrame-firstFrame+1))
   if hyperparameters["eyeTracking"]:
@@ -90,76 +174,20 @@ def tracking(videoPath, background, wellNumber, wellPositions, hyperparameters,
   
   # Using the first frame of the video to calculate parameters that will be used afterwards for the tracking
   if (hyperparameters["headEmbeded"] == 1):
-    # Getting images
-    
-    if hyperparameters["headEmbededRemoveBack"] == 0 and hyperparameters["headEmbededAutoSet_BackgroundExtractionOption"] == 0:
-      [frame, thresh1] = headEmbededFrame(videoPath, firstFrame, wellNumber, wellPositions, hyperparameters)
-    else:
-      hyperparameters["headEmbededRemoveBack"] = 1
-      hyperparameters["minPixelDiffForBackExtract"] = hyperparameters["headEmbededAutoSet_BackgroundExtractionOption"]
-      [frame, thresh1] = headEmbededFrameBackExtract(videoPath, background, hyperparameters, firstFrame, wellNumber, wellPositions)
-    
-    # Setting hyperparameters in order to add line on image
-    if hyperparameters["addBlackLineToImg_Width"]:
-      hyperparameters = addBlackLineToImgSetParameters(hyperparameters, frame, videoName)
-    
-    # (x, y) coordinates for both eyes for head embedded fish eye tracking
-    if hyperparameters["eyeTracking"] and hyperparameters["headEmbeded"] == 1:
-      forEye = getAccentuateFrameForManualPointSelect(frame, hyperparameters)
-      if True:
-        from PyQt5.QtWidgets import QApplication
-
-        import zebrazoom.code.util as util
-
-        leftEyeCoordinate = list(util.getPoint(np.uint8(forEye * 255), "Click on the center of the left eye", zoomable=True, dialog=not hasattr(QApplication.instance(), 'window')))
-        rightEyeCoordinate = list(util.getPoint(np.uint8(forEye * 255), "Click on the center of the right eye", zoomable=True, dialog=not hasattr(QApplication.instance(), 'window')))
-      else:
-        leftEyeCoordinate  = [261, 201] # [267, 198] # [210, 105]
-        rightEyeCoordinate = [285, 157] # [290, 151] # [236, 72]
-      print("leftEyeCoordinate:", leftEyeCoordinate)
-      print("rightEyeCoordinate:", rightEyeCoordinate)
-    
-    # if hyperparameters["invertBlackWhiteOnImages"]:
-      # frame   = 255 - frame
-    
-    gray = frame.copy()
-    
-    oppHeading = (heading + math.pi) % (2 * math.pi)
-    
-    # Getting headPositionFirstFrame and tailTipFirstFrame positions
-    if os.path.exists(videoPath+'HP.csv'):
-      headPositionFirstFrame = getHeadPositionByFileSaved(videoPath)
-    else:
-      if hyperparameters["findHeadPositionByUserInput"]:
-        frameForManualPointSelection = getAccentuateFrameForManualPointSelect(frame, hyperparameters)
-        headPositionFirstFrame = findHeadPositionByUserInput(frameForManualPointSelection, firstFrame, videoPath, hyperparameters, wellNumber, wellPositions)
-      else:
-        [frame, gray, thresh1, blur, thresh2, frame2, initialCurFrame, back, xHead, yHead] = getImages(hyperparameters, cap, videoPath, firstFrame, background, wellNumber, wellPositions)
-        cap.set(1, firstFrame)
-        [trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingProbabilityOfGoodDetection, lastFirstTheta] = headTrackingHeadingCalculation(hyperparameters, firstFrame, firstFrame, blur, thresh1, thresh2, gray, hyperparameters["erodeSize"], frame_width, frame_height, trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingProbabilityOfGoodDetection, headPositionFirstFrame, wellPositions[wellNumber]["lengthX"])
-    if os.path.exists(videoPath+'.csv'):
-      tailTipFirstFrame  = getTailTipByFileSaved(hyperparameters,videoPath)
-    else:
-      frameForManualPointSelection = getAccentuateFrameForManualPointSelect(frame, hyperparameters)
-      tailTipFirstFrame  = findTailTipByUserInput(frameForManualPointSelection, firstFrame, videoPath, hyperparameters, wellNumber, wellPositions)
-    if hyperparameters["automaticallySetSomeOfTheHeadEmbededHyperparameters"] == 1:
-      hyperparameters = adjustHeadEmbededHyperparameters(hyperparameters, frame, headPositionFirstFrame, tailTipFirstFrame)
-    # Getting max depth
-    if hyperparameters["headEmbededTeresaNicolson"] == 1:
-      if len(headPositionFirstFrame) == 0:
-        headPositionFirstFrame = [trackingHeadTailAllAnimals[0][0][0][0], trackingHeadTailAllAnimals[0][0][0][1]]
-      maxDepth = headEmbededTailTrackFindMaxDepthTeresaNicolson(headPositionFirstFrame,nbTailPoints,firstFrame,headPositionFirstFrame[0],headPositionFirstFrame[1],thresh1,frame,hyperparameters,oppHeading,tailTipFirstFrame)
-    else:
-      if hyperparameters["centerOfMassTailTracking"] == 0:
-        maxDepth = headEmbededTailTrackFindMaxDepth(headPositionFirstFrame,nbTailPoints,firstFrame,headPositionFirstFrame[0],headPositionFirstFrame[1],thresh1,frame,hyperparameters,oppHeading,tailTipFirstFrame)
-      else:
-        maxDepth = centerOfMassTailTrackFindMaxDepth(headPositionFirstFrame,nbTailPoints,firstFrame,headPositionFirstFrame[0],headPositionFirstFrame[1],thresh1,frame,hyperparameters,oppHeading,tailTipFirstFrame)
+    if headEmbededInitialState is None:
+      headEmbededInitialState = headEmbededTrackingInitialization(cap, videoPath, background, firstFrame, wellNumber, wellPositions, hyperparameters, videoName, frame_width, frame_height, trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingProbabilityOfGoodDetection)
+    [hyperparameters, headPositionFirstFrame, tailTipFirstFrame, maxDepth, leftEyeCoordinate, rightEyeCoordinate] = headEmbededInitialState[:6]
   
   if hyperparameters["adjustHeadEmbededTracking"] == 1 or hyperparameters["adjustFreelySwimTracking"] == 1 or hyperparameters["adjustFreelySwimTrackingAutomaticParameters"] == 1 or hyperparameters["adjustHeadEmbeddedEyeTracking"]:
     widgets = None
   
   # Performing the tracking on each frame
   i = firstFrame
+  if temporalChunk and hyperparameters["headEmbeded"] == 1 and len(headEmbededInitialState) > 6:
+    # The head position and heading of a head embedded animal are always the ones found on the first frame of the video: they are given for the first index of the arrays (see temporalChunksTracking)
+    [trackingHeadTailAllAnimals[:, 0], trackingHeadingAllAnimals[:, 0]] = headEmbededInitialState[6:]
+    i = firstFrame + 1
+    cap.set(1, i)
   if int(hyperparameters["onlyDoTheTrackingForThisNumberOfFrames"]) != 0:
     lastFrame = min(lastFrame, firstFrame + int(hyperparameters["onlyDoTheTrackingForThisNumberOfFrames"]))
   while (i < lastFrame+1):
@@ -282,6 +310,16 @@ def tracking(videoPath, background, wellNumber, wellPositions, hyperparameters,
     else:
       i = i + 1
   
+  # Also lets the shared frame broadcaster stop waiting for this well as soon as its frames are tracked
+  cap.release()
+  
+  if temporalChunk:
+    # The post-processing is done after stitching all chunks together (see temporalChunksTracking)
+    return [trackingHeadTailAllAnimals, trackingHeadingAllAnimals, trackingEyesAllAnimals, trackingProbabilityOfGoodDetection, auDessusPerAnimalId if hyperparameters["detectMovementWithRawVideoInsideTracking"] else 0]
+  
+  if hyperparameters["identitiesLinkageSlidingWindow"] and hyperparameters["nbAnimalsPerWell"] > 1:
+    linkTrackletsOverSlidingWindow(trackingHeadTailAllAnimals, [trackingData for trackingData in [trackingHeadingAllAnimals, trackingEyesAllAnimals, trackingProbabilityOfGoodDetection, auDessusPerAnimalId if hyperparameters["detectMovementWithRawVideoInsideTracking"] else 0] if type(trackingData) != int], hyperparameters)
+  
   if hyperparameters["postProcessMultipleTrajectories"]:
     [trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingEyesAllAnimals] = postProcessMultipleTrajectories(trackingHeadingAllAnimals, trackingHeadTailAllAnimals, trackingEyesAllAnimals, trackingProbabilityOfGoodDetection, hyperparameters, wellPositions)
   
@@ -3,6 +3,7 @@ import math
 import json
 import cv2
 import os
+from zebrazoom.code.vars import getGlobalVariables
 
 def calculateAngle(xStart, yStart, xEnd, yEnd):
   vx = xEnd - xStart
@@ -39,6 +40,20 @@ def assignValueIfBetweenRange(value, minn, maxx):
     return maxx
   return value
 
+def trackingUsesGrayscaleFrames(hyperparameters):
+  # Freely swimming tracking converts frames to grayscale before doing anything else with them, so they can directly be read in grayscale (unless color is used to pre-process them)
+  return not(hyperparameters["headEmbeded"]) and not(hyperparameters["imagePreProcessMethod"]) and not(hyperparameters["backgroundSubtractorKNN"])
+
+def getNbWellsTrackedInParallel(hyperparameters):
+  # Number of wells processes running at the same time (see mainZZ), which share the cores of the computer
+  if getGlobalVariables()["noMultiprocessing"] == 0 and not(hyperparameters["headEmbeded"]) and hyperparameters["onlyTrackThisOneWell"] == -1:
+    return hyperparameters["nbWells"]
+  return 1
+
+def canUseTemporalChunksTracking(hyperparameters):
+  # The frames of a well are split into temporal chunks tracked in parallel: not possible when the tracking of a frame depends on the whole past (background updated during the tracking) or requires user interaction
+  return int(hyperparameters["temporalChunksTrackingNbProcesses"]) > 1 and hyperparameters["updateBackgroundAtInterval"] == 0 and hyperparameters["debugPauseBetweenTrackAndParamExtract"] != "justExtractParamFromPreviousTrackData" and not(hyperparameters["debugTracking"]) and hyperparameters["adjustFreelySwimTracking"] == 0 and hyperparameters["adjustFreelySwimTrackingAutomaticParameters"] == 0 and hyperparameters["adjustHeadEmbededTracking"] == 0 and not(hyperparameters["adjustHeadEmbeddedEyeTracking"])
+
 def addBlackLineToImgSetParameters(hyperparameters, frame, videoName):
   import zebrazoom.code.util as util
 
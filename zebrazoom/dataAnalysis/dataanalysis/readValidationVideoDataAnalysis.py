@@ -126,6 +126,7 @@ def readValidationVideoDataAnalysis(videoPath, folderName, configFilePath, numWe
     
     cap.set(1, l )
     ret, img = cap.read()
+    img = img.copy() # the progress bar and the frame number are drawn on the frame
     
     if ((numWell != -1) and (zoom)):
       
@@ -10,6 +10,8 @@ from zebrazoom.code.getHyperparameters import getHyperparameters
 from zebrazoom.code.dataPostProcessing.dataPostProcessing import dataPostProcessing
 from zebrazoom.code.fasterMultiprocessing import fasterMultiprocessing
 from zebrazoom.code.fasterMultiprocessing2 import fasterMultiprocessing2
+from zebrazoom.code.sharedFrameBroadcast import SharedFrameBroadcaster, canUseSharedFrameBroadcast
+from zebrazoom.code.trackingFolder.trackingFunctions import getNbWellsTrackedInParallel
 
 import sys
 import pickle
@@ -28,7 +30,7 @@ globalVariables = getGlobalVariables()
 output = 0
 
 # Does the tracking and then the extraction of parameters
-def getParametersForWell(videoPath,background,wellNumber,wellPositions,output,previouslyAcquiredTrackingDataForDebug,hyperparameters, videoName, dlModel, useGUI):
+def getParametersForWell(videoPath,background,wellNumber,wellPositions,output,previouslyAcquiredTrackingDataForDebug,hyperparameters, videoName, dlModel, useGUI, sharedFrameReader=None):
   if useGUI:
     from PyQt5.QtWidgets import QApplication
 
@@ -37,16 +39,16 @@ def getParametersForWell(videoPath,background,wellNumber,wellPositions,output,pr
       app = PlainApplication(sys.argv)
   if hyperparameters["debugPauseBetweenTrackAndParamExtract"] == "noDebug":
     # Normal execution process
-    trackingData = tracking(videoPath,background,wellNumber,wellPositions,hyperparameters, videoName, dlModel)
+    trackingData = tracking(videoPath,background,wellNumber,wellPositions,hyperparameters, videoName, dlModel, sharedFrameReader)
     parameters = extractParameters(trackingData, wellNumber, hyperparameters, videoPath, wellPositions, background)
     output.put([wellNumber,parameters,[]])
   elif hyperparameters["debugPauseBetweenTrackAndParamExtract"] == "justSaveTrackData":
     # Extracing tracking data, saving it, and that's it
-    trackingData = tracking(videoPath,background,wellNumber,wellPositions,hyperparameters, videoName, dlModel)
+    trackingData = tracking(videoPath,background,wellNumber,wellPositions,hyperparameters, videoName, dlModel, sharedFrameReader)
     output.put([wellNumber,[],trackingData])
   elif hyperparameters["debugPauseBetweenTrackAndParamExtract"] == "saveTrackDataAndExtractParam":
     # Extracing tracking data, saving it, and continuing normal execution
-    trackingData = tracking(videoPath,background,wellNumber,wellPositions,hyperparameters, videoName, dlModel)
+    trackingData = tracking(videoPath,background,wellNumber,wellPositions,hyperparameters, videoName, dlModel, sharedFrameReader)
     parameters = extractParameters(trackingData, wellNumber, hyperparameters, videoPath, wellPositions, background)
     output.put([wellNumber,parameters,trackingData])
   else: # hyperparameters["debugPauseBetweenTrackAndParamExtract"] == "justExtractParamFromPreviousTrackData"
@@ -56,9 +58,9 @@ def getParametersForWell(videoPath,background,wellNumber,wellPositions,output,pr
     output.put([wellNumber,parameters,[]])
 
 
-def mainZZ(pathToVideo, videoName, videoExt, configFile, argv, useGUI=True):
+def mainZZ(pathToVideo, videoName, videoExt, configFile, argv, useGUI=True, backgroundAviConversion=None):
   
-  videoNameWithExt = videoName + '.' + videoExt
+  videoNameWithExt = videoName + '.' + videoExt if videoExt else videoName # no extension for a folder of images
   previouslyAcquiredTrackingDataForDebug = []
 
   # Checking that path and video exists
@@ -111,7 +113,7 @@ def mainZZ(pathToVideo, videoName, videoExt, configFile, argv, useGUI=True):
   else:
     # Creating output folder
     if not hyperparameters["reloadWellPositions"] and not hyperparameters["reloadBackground"] and not hyperparameters["dontDeleteOutputFolderIfAlreadyExist"]:
-      filesToKeep = {'intermediaryWellPositionReloadNoMatterWhat.txt', 'rotationAngle.txt'}
+      filesToKeep = {'intermediaryWellPositionReloadNoMatterWhat.txt', 'rotationAngle.txt', 'seekIndex.npz'}
       filesToCopy = []
       if os.path.exists(outputFolderVideo):
         if glob.glob(os.path.join(outputFolderVideo, 'results_*.txt')):
@@ -153,6 +155,10 @@ def mainZZ(pathToVideo, videoName, videoExt, configFile, argv, useGUI=True):
   with open(os.path.join(outputFolderVideo, 'configUsed.json'), 'w') as outfile:
     json.dump(configFile, outfile)
   
+  # Indexing the keyframes of the video to speed up the later seeks in the video
+  if hyperparameters["keyFramesSeekIndex"]:
+    zzVideoReading.buildSeekIndex(os.path.join(pathToVideo, videoNameWithExt), outputFolderVideo)
+  
 
   # Getting well positions
   if hyperparameters["headEmbeded"] and not hyperparameters["oneWellManuallyChosenTopLeft"]:
@@ -250,13 +256,18 @@ def mainZZ(pathToVideo, videoName, videoExt, configFile, argv, useGUI=True):
   # Reloading DL model for tracking with DL
   if hyperparameters["trackingDL"]:
     from zebrazoom.code.deepLearningFunctions.loadDLmodel import loadDLmodel
-    dlModel = loadDLmodel(hyperparameters["trackingDL"])
+    if hyperparameters["trackingDLNbThreadsPerProcess"] == 0:
+      # The cores are shared between the wells tracked in parallel
+      hyperparameters["trackingDLNbThreadsPerProcess"] = max(1, (os.cpu_count() or 1) // getNbWellsTrackedInParallel(hyperparameters))
+    dlModel = loadDLmodel(hyperparameters["trackingDL"], hyperparameters)
   else:
     dlModel = 0
   
   # Tracking and extraction of parameters
   if hyperparameters["fasterMultiprocessing"] == 1:
     processes = -1
+    if globalVariables["noMultiprocessing"]:
+      hyperparameters["fasterMultiprocessingNbWorkers"] = 0
     output2 = fasterMultiprocessing(os.path.join(pathToVideo, videoNameWithExt), background, wellPositions, [], hyperparameters, videoName)
   elif hyperparameters["fasterMultiprocessing"] == 2:
     processes = -1
@@ -266,10 +277,18 @@ def mainZZ(pathToVideo, videoName, videoExt, configFile, argv, useGUI=True):
       if hyperparameters["onlyTrackThisOneWell"] == -1:
         # for all wells, in parallel
         processes = []
+        if canUseSharedFrameBroadcast(hyperparameters):
+          # each frame is decoded only once and shared with all the wells processes
+          sharedFrameBroadcaster = SharedFrameBroadcaster(os.path.join(pathToVideo, videoNameWithExt), hyperparameters, hyperparameters["nbWells"])
+        else:
+          sharedFrameBroadcaster = None
         for wellNumber in range(0,hyperparameters["nbWells"]):
-          p = Process(target=getParametersForWell, args=(os.path.join(pathToVideo, videoNameWithExt), background, wellNumber, wellPositions, output, previouslyAcquiredTrackingDataForDebug, hyperparameters, videoName, dlModel, useGUI))
+          sharedFrameReader = sharedFrameBroadcaster.getReader(wellNumber) if sharedFrameBroadcaster is not None else None
+          p = Process(target=getParametersForWell, args=(os.path.join(pathToVideo, videoNameWithExt), background, wellNumber, wellPositions, output, previouslyAcquiredTrackingDataForDebug, hyperparameters, videoName, dlModel, useGUI, sharedFrameReader))
           p.start()
           processes.append(p)
+        if sharedFrameBroadcaster is not None:
+          sharedFrameBroadcaster.broadcast(processes)
       else:
         # for just one well
         processes = [1]
@@ -309,15 +328,21 @@ def mainZZ(pathToVideo, videoName, videoExt, configFile, argv, useGUI=True):
     
   if hyperparameters["debugPauseBetweenTrackAndParamExtract"] != "justSaveTrackData":
     # Creating super structure
-    superStruct = createSuperStruct(paramDataPerWell, wellPositions, hyperparameters, os.path.join(pathToVideo, videoNameWithExt))
+    # The tracking was done on a .seq video while it was being converted to .avi in the background: the .avi video is the one kept for validation
+    pathToOriginalVideo = os.path.join(pathToVideo, videoNameWithExt) if backgroundAviConversion is None else backgroundAviConversion.aviPath
+    superStruct = createSuperStruct(paramDataPerWell, wellPositions, hyperparameters, pathToOriginalVideo)
   
     # Creating validation video
     if not(hyperparameters["savePathToOriginalVideoForValidationVideo"]):
       if hyperparameters["copyOriginalVideoToOutputFolderForValidation"]:
-        shutil.copyfile(os.path.join(pathToVideo, videoNameWithExt), os.path.join(os.path.join(hyperparameters["outputFolder"], hyperparameters["videoName"]), 'originalVideoWithoutAnyTrackingDisplayed_pleaseUseTheGUIToVisualizeTrackingPoints.avi'))
+        if backgroundAviConversion is not None:
+          backgroundAviConversion.wait()
+        shutil.copyfile(pathToOriginalVideo, os.path.join(os.path.join(hyperparameters["outputFolder"], hyperparameters["videoName"]), 'originalVideoWithoutAnyTrackingDisplayed_pleaseUseTheGUIToVisualizeTrackingPoints.avi'))
       else:
         if hyperparameters["createValidationVideo"]:
-          infoFrame = createValidationVideo(os.path.join(pathToVideo, videoNameWithExt), superStruct, hyperparameters)
+          if backgroundAviConversion is not None:
+            backgroundAviConversion.wait()
+          infoFrame = createValidationVideo(pathToOriginalVideo, superStruct, hyperparameters)
     
     # Various post-processing options depending on configuration file choices
     superStruct = dataPostProcessing(outputFolderVideo, superStruct, hyperparameters, videoName, videoExt)
@@ -13,8 +13,65 @@ import numpy as np
 import cv2
 from pathlib import Path
 import platform
+import math
+import shutil
+import tempfile
+import subprocess
+import multiprocessing as mp
+from zebrazoom.videoFormatConversion.zzVideoReading import ZzVideoReading
 
-def sqb_convert_to_avi(path, videoName, codec='HFYU', lastFrame=-1):
+def convertSeqFramesToAviSegment(seq_path, avi_path, codec, firstFrame, lastFrame, grayscale):
+  
+  cap = ZzVideoReading(seq_path, grayscale)
+  out = cv2.VideoWriter(avi_path, cv2.VideoWriter_fourcc(codec[0],codec[1],codec[2],codec[3]), 10, (cap.width, cap.height), isColor=not(grayscale))
+  
+  cap.set(1, firstFrame)
+  for i in range(firstFrame, lastFrame):
+    
+    if (i % 500 == 0):
+      print("image " + str(i) + " out of " + str(lastFrame) + " in total")
+    
+    ret, frame = cap.read()
+    if not(ret):
+      print("couldn't read the frame", i, "of", seq_path)
+      break
+    out.write(frame)
+  
+  out.release()
+  cap.release()
+
+
+def joinAviSegments(segmentsPaths, avi_path, codec, grayscale):
+  # The segments are joined without re-encoding with ffmpeg when it's available, otherwise their frames are decoded and encoded again (which is lossless with a lossless codec)
+  
+  if shutil.which('ffmpeg') is not None:
+    segmentsListPath = os.path.join(os.path.dirname(segmentsPaths[0]), 'segments.txt')
+    with open(segmentsListPath, 'w') as segmentsList:
+      for segmentPath in segmentsPaths:
+        segmentsList.write("file '" + segmentPath.replace("'", "'\\''") + "'\n")
+    ret = subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', segmentsListPath, '-c', 'copy', avi_path]).returncode
+    os.remove(segmentsListPath)
+    if ret == 0:
+      return
+    print("ffmpeg could not join the avi segments, joining them with OpenCV instead")
+  
+  out = None
+  for segmentPath in segmentsPaths:
+    cap = cv2.VideoCapture(segmentPath)
+    ret, frame = cap.read()
+    while ret:
+      if grayscale and len(frame.shape) == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+      if out is None:
+        out = cv2.VideoWriter(avi_path, cv2.VideoWriter_fourcc(codec[0],codec[1],codec[2],codec[3]), 10, (frame.shape[1], frame.shape[0]), isColor=not(grayscale))
+      out.write(frame)
+      ret, frame = cap.read()
+    cap.release()
+  if out is not None:
+    out.release()
+
+
+def sqb_convert_to_avi(path, videoName, codec='HFYU', lastFrame=-1, nbProcesses=-1, grayscale=False):
   """
       Lecture du fichier binaire de séquence sqb
       Les données sont représentées par la structure en C suivante :
@@ -24,6 +81,8 @@ def sqb_convert_to_avi(path, videoName, codec='HFYU', lastFrame=-1):
               double TimeStamp;   // 8 bits
               int binfile;        // 4 bits -> + 4 bits vides car mémoire alignée
           } IMGDATA;
+      The frames are split into consecutive segments encoded in parallel (nbProcesses = -1: one process per core), which are then joined.
+      With grayscale set to True, the avi video is written in grayscale (this requires a codec supporting it, for example the lossless codec 'FFV1').
   """
   
   # Checking that path and video exists
@@ -34,61 +93,45 @@ def sqb_convert_to_avi(path, videoName, codec='HFYU', lastFrame=-1):
   seq_path  = os.path.join(path, videoName + '.seq')
   path2 = Path(path)
   avi_path  = os.path.join(path2.parent, videoName + '.avi')
-
-  cfg = configparser.ConfigParser()
-  cfg.read(seq_path)
   
-  width = int(cfg.get('Sequence Settings', 'Width'))
-  height = int(cfg.get('Sequence Settings', 'Height'))
-  bpp = int(cfg.get('Sequence Settings', 'BytesPerPixel'))
-  num_images = cfg.get('Sequence Settings', 'Number of files')
-  bin_file = cfg.get('Sequence Settings', 'Bin File')
-  sqb_path = seq_path.replace('.seq', '.sqb')
+  cap = ZzVideoReading(seq_path)
+  num_images = cap.num_images
+  cap.release()
+  if lastFrame <= 0:
+    lastFrame = num_images
+  lastFrame = min(lastFrame, num_images)
   
-  out = cv2.VideoWriter(avi_path, cv2.VideoWriter_fourcc(codec[0],codec[1],codec[2],codec[3]), 10, (width, height))
+  if nbProcesses <= 0:
+    nbProcesses = os.cpu_count()
+  nbProcesses = max(1, min(nbProcesses, lastFrame // 500)) # no point in splitting short videos
   
-  pathstr = os.path.dirname(seq_path)
-  if lastFrame <= 0:
-    lastFrame = int(num_images)
+  if nbProcesses == 1:
+    convertSeqFramesToAviSegment(seq_path, avi_path, codec, 0, lastFrame, grayscale)
+    return
   
-  with open(sqb_path,'rb') as f :
-    for i in range(0, lastFrame):
+  segmentSize = math.ceil(lastFrame / nbProcesses)
+  segments    = [[segmentFirstFrame, min(lastFrame, segmentFirstFrame + segmentSize)] for segmentFirstFrame in range(0, lastFrame, segmentSize)]
+  # The segments are removed even if the conversion or the join fails
+  segmentsFolder = tempfile.mkdtemp(prefix=videoName + '_segments', dir=path2.parent)
+  try:
+    segmentsPaths = [os.path.join(segmentsFolder, 'segment' + str(segmentNumber) + '.avi') for segmentNumber in range(0, len(segments))]
     
-      if (i % 500 == 0):
-        print("image " + str(i) + " out of " + str(lastFrame) + " in total")
+    with mp.Pool(len(segments)) as pool:
+      pool.starmap(convertSeqFramesToAviSegment, [(seq_path, segmentPath, codec, segmentFirstFrame, segmentLastFrame, grayscale) for segmentPath, [segmentFirstFrame, segmentLastFrame] in zip(segmentsPaths, segments)])
     
-      if int(platform.system() == "Linux"):
-        offset = struct.unpack('l', f.read(8))
-        timestamp = struct.unpack('d', f.read(8))
-        binfile = struct.unpack('i', f.read(4))
-        padding = f.read(4)
-      else:
-        offset = struct.unpack('l', f.read(4))
-        padding = f.read(4)
-        timestamp = struct.unpack('d', f.read(8))
-        binfile = struct.unpack('i', f.read(4))
-        padding = f.read(4)
-      
-      bin_path = os.path.join("%s" % (pathstr), "%s%0.5d.bin" % (bin_file, binfile[0]))
-      
-      f_bin = open(bin_path, 'rb')
-      f_bin.seek(offset[0], os.SEEK_SET)
-      
-      bytes = f_bin.read(height*width*bpp)
-      
-      if bpp == 2:
-        buffer = np.frombuffer(bytes, dtype=np.uint16)
-      else:
-        buffer = np.frombuffer(bytes, dtype=np.uint8)
-      
-      if len(buffer) == 3*height*width:
-        nparr2 = buffer.reshape(height, width, 3)
-      else:
-        nparr2 = buffer.reshape(height, width)
-        nparr2 = cv2.cvtColor(nparr2, cv2.COLOR_GRAY2RGB)
-        
-      out.write(nparr2)
-      
-      f_bin.close()
-      
-  out.release()
+    joinAviSegments(segmentsPaths, avi_path, codec, grayscale)
+  finally:
+    shutil.rmtree(segmentsFolder, ignore_errors=True)
+
+
+class SeqToAviBackgroundConversion():
+  # Converts a .seq video to .avi in a background process, so that the tracking can be launched directly on the .seq video at the same time (the frames read by both are then mostly read only once from the disk)
+
+  def __init__(self, path, videoName, codec='HFYU', lastFrame=-1, nbProcesses=1):
+    self.aviPath = os.path.join(Path(path).parent, videoName + '.avi')
+    self.process = mp.Process(target=sqb_convert_to_avi, args=(path, videoName, codec, lastFrame, nbProcesses)) # only one process by default, the tracking is using the other cores
+    self.process.start()
+
+  def wait(self):
+    self.process.join()
+    return self.aviPath
@@ -9,14 +9,31 @@ import csv
 import glob
 import time
 import configparser
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import cv2
 from pathlib import Path
 import platform
 
+def getSqbRecordDtype():
+  # One record per frame in the .sqb file (C struct {long offset; double TimeStamp; int binfile;} with memory alignment)
+  if int(platform.system() == "Linux"):
+    return np.dtype([('offset', '<i8'), ('timestamp', '<f8'), ('binfile', '<i4'), ('padding', '<i4')])
+  else:
+    return np.dtype([('offset', '<i4'), ('padding1', '<i4'), ('timestamp', '<f8'), ('binfile', '<i4'), ('padding2', '<i4')])
+
+
+def readSqbIndex(sqb_path, num_images=-1):
+  return np.fromfile(sqb_path, dtype=getSqbRecordDtype(), count=num_images)
+
+
 class ZzVideoReading():
 
-  def __init__(self, videoPath):
+  def __init__(self, videoPath, grayscale=False, copyFrames=False):
+    # Unless copyFrames is True, frames that don't need to be converted are returned as read-only views on the memory-mapped .bin files: callers drawing on the frames must copy them first
   
     seq_path  = videoPath
 
@@ -32,18 +49,33 @@ class ZzVideoReading():
     
     pathstr = os.path.dirname(seq_path)
     
-    f = open(sqb_path, 'rb')
-    
     self.sqb_path = sqb_path
     self.width = width
     self.height = height
     self.bpp = bpp
     self.num_images = int(num_images)
     self.bin_file = bin_file
-    self.sqb_path = sqb_path
     self.pathstr = pathstr
-    self.f = f
     self.lastFrameRead = -1
+    self.grayscale = grayscale
+    self.copyFrames = copyFrames
+    
+    # The .sqb index is parsed only once, and the .bin files are memory-mapped (and kept open) the first time they are needed
+    self.index = readSqbIndex(sqb_path, self.num_images)
+    self.binFiles = {}
+    self.frameDtype = np.uint16 if bpp == 2 else np.uint8
+    self.frameNbBytes = height * width * bpp
+  
+  def _getBinFile(self, binfile):
+    
+    if binfile not in self.binFiles:
+      bin_path = os.path.join("%s" % (self.pathstr), "%s%0.5d.bin" % (self.bin_file, binfile))
+      if not(os.path.exists(bin_path)):
+        return None
+      f_bin = open(bin_path, 'rb')
+      self.binFiles[binfile] = (f_bin, mmap.mmap(f_bin.fileno(), 0, access=mmap.ACCESS_READ))
+    
+    return self.binFiles[binfile][1]
   
   def get(self, idOfInfoRequested):
     
@@ -62,63 +94,75 @@ class ZzVideoReading():
     return True
   
   def release(self):
-    del self
     
+    for f_bin, binMmap in self.binFiles.values():
+      try:
+        binMmap.close()
+      except BufferError: # frames still referencing the mapping: it will be closed once they are garbage collected
+        pass
+      f_bin.close()
+    self.binFiles = {}
+    
+  def _readFrame(self, frameNumber):
+    
+    if frameNumber >= len(self.index):
+      print("Problem with Hiris video format", frameNumber)
+      return [False, []]
+    
+    record = self.index[frameNumber]
+    binMmap = self._getBinFile(int(record['binfile']))
+    
+    if binMmap is None:
+      print("Hiris video format: frame not found:", frameNumber)
+      return [False, []]
+    
+    offset = int(record['offset'])
+    if offset < 0 or offset + self.frameNbBytes > len(binMmap):
+      print("Problem with Hiris video format", frameNumber)
+      return [False, []]
+    
+    buffer = np.frombuffer(binMmap, dtype=self.frameDtype, count=self.frameNbBytes // np.dtype(self.frameDtype).itemsize, offset=offset)
+    
+    if len(buffer) == 3*self.height*self.width:
+      nparr2 = buffer.reshape(self.height, self.width, 3)
+      if self.grayscale:
+        nparr2 = cv2.cvtColor(nparr2, cv2.COLOR_BGR2GRAY)
+      elif self.copyFrames:
+        nparr2 = nparr2.copy()
+    else:
+      nparr2 = buffer.reshape(self.height, self.width)
+      if not(self.grayscale):
+        nparr2 = cv2.cvtColor(nparr2, cv2.COLOR_GRAY2RGB)
+      elif self.copyFrames:
+        nparr2 = nparr2.copy()
+    
+    return [True, nparr2]
+  
   def read(self):
     
     if self.lastFrameRead + 1 < self.num_images:
       
-      if int(platform.system() == "Linux"):
-        try:
-          offset = struct.unpack('l', self.f.read(8))
-          timestamp = struct.unpack('d', self.f.read(8))
-          binfile = struct.unpack('i', self.f.read(4))
-          padding = self.f.read(4)
-        except:
-          print("Problem with Hiris video format", self.lastFrameRead + 1)
-          return [False, []]
-      else:
-        try:
-          offset = struct.unpack('l', self.f.read(4))
-          padding = self.f.read(4)
-          timestamp = struct.unpack('d', self.f.read(8))
-          binfile = struct.unpack('i', self.f.read(4))
-          padding = self.f.read(4)
-        except:
-          print("Problem with Hiris video format", self.lastFrameRead + 1)
-          return [False, []]          
-      
-      bin_path = os.path.join("%s" % (self.pathstr), "%s%0.5d.bin" % (self.bin_file, binfile[0]))
-      
-      if not(os.path.exists(bin_path)):
-        print("Hiris video format: frame not found:", self.lastFrameRead + 1)
-        return [False, []]
-      
-      f_bin = open(bin_path, 'rb')
-      f_bin.seek(offset[0], os.SEEK_SET)
-      
-      bytes = f_bin.read(self.height*self.width*self.bpp)
-      
-      if self.bpp == 2:
-        buffer = np.frombuffer(bytes, dtype=np.uint16)
-      else:
-        buffer = np.frombuffer(bytes, dtype=np.uint8)
-      
-      
-      if len(buffer) == 3*self.height*self.width:
-        nparr2 = buffer.reshape(self.height, self.width, 3)
-      else:
-        nparr2 = buffer.reshape(self.height, self.width)
-        nparr2 = cv2.cvtColor(nparr2, cv2.COLOR_GRAY2RGB)
-      
-      self.lastFrameRead = self.lastFrameRead + 1
-      
-      return [True, nparr2]
+      ret, frame = self._readFrame(self.lastFrameRead + 1)
+      if ret:
+        self.lastFrameRead = self.lastFrameRead + 1
+      return [ret, frame]
     
     else:
       
       return [False, []]
   
+  def grab(self):
+    # Skipping a frame doesn't require reading it
+    if self.lastFrameRead + 1 < self.num_images:
+      self.lastFrameRead = self.lastFrameRead + 1
+      return True
+    return False
+  
+  def retrieve(self):
+    if self.lastFrameRead < 0 or self.lastFrameRead >= self.num_images:
+      return [False, []]
+    return self._readFrame(self.lastFrameRead)
+  
   
   def set(self, propToChange, numImage):
     
@@ -126,42 +170,422 @@ class ZzVideoReading():
       
       if numImage <= 0:
         
-        self.f.close()
-        self.f = open(self.sqb_path, 'rb')
         self.lastFrameRead = -1
       
       elif numImage >= self.num_images:
         
         self.lastFrameRead = int(self.num_images)
         
-      elif numImage > self.lastFrameRead:
-        
-        justToMove = self.f.read(24 * (int(numImage) - int(self.lastFrameRead) - 1))
-        self.lastFrameRead = numImage - 1  
-        
-      elif numImage < self.lastFrameRead:
-        
-        self.f.close()
-        self.f = open(self.sqb_path, 'rb')
+      else:
         
-        justToMove = self.f.read(24 * int(numImage))
-        self.lastFrameRead = numImage - 1
+        self.lastFrameRead = int(numImage) - 1
+
+
+class ZzImageSequenceReading():
+  # Reads a folder of numbered images (for example frame00001.png, frame00002.png, ...) as a video
+  # The next frames are decoded ahead by a pool of threads (OpenCV releases the GIL while decoding)
 
+  imagesExtensions = ('.png', '.tif', '.tiff', '.jpg', '.jpeg', '.bmp', '.pgm', '.ppm')
 
-def VideoCapture(videoPath):
+  def __init__(self, videoPath, grayscale=False, nbDecodingThreads=0):
+    
+    self.imagesPaths = [os.path.join(videoPath, fileName) for fileName in sorted(os.listdir(videoPath), key=lambda fileName: [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', fileName)]) if fileName.lower().endswith(self.imagesExtensions)]
+    self.num_images = len(self.imagesPaths)
+    self.imreadFlag = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+    self.nextFrame  = 0
+    self.width      = 0
+    self.height     = 0
+    if self.num_images:
+      firstImage = cv2.imread(self.imagesPaths[0], self.imreadFlag)
+      if firstImage is not None:
+        self.height, self.width = firstImage.shape[:2]
+    nbDecodingThreads = nbDecodingThreads if nbDecodingThreads > 0 else min(8, os.cpu_count())
+    self.nbFramesDecodedAhead = 2 * nbDecodingThreads
+    self.decodingPool   = ThreadPoolExecutor(nbDecodingThreads)
+    self.decodingFrames = {}
+  
+  def _decodeAhead(self):
+    for frameNumber in range(self.nextFrame, min(self.nextFrame + self.nbFramesDecodedAhead, self.num_images)):
+      if frameNumber not in self.decodingFrames:
+        self.decodingFrames[frameNumber] = self.decodingPool.submit(cv2.imread, self.imagesPaths[frameNumber], self.imreadFlag)
+  
+  def get(self, idOfInfoRequested):
+    
+    if idOfInfoRequested == 1:
+      return self.nextFrame
+    elif idOfInfoRequested == 3:
+      return self.width
+    elif idOfInfoRequested == 4:
+      return self.height
+    elif idOfInfoRequested == 7:
+      return self.num_images
+    elif idOfInfoRequested == 5:
+      return 24 # fake input video fps
+  
+  def isOpened(self):
+    return self.width > 0
+  
+  def release(self):
+    for decodingFrame in self.decodingFrames.values():
+      decodingFrame.cancel()
+    self.decodingFrames = {}
+    self.decodingPool.shutdown(wait=False)
   
-  if '.seq' in videoPath:
+  def read(self, image=None):
     
-    zzVidCapture = ZzVideoReading(videoPath)
+    if self.nextFrame >= self.num_images:
+      return [False, []]
+    
+    self._decodeAhead()
+    frame = self.decodingFrames.pop(self.nextFrame).result()
+    self.nextFrame += 1
+    self._decodeAhead()
     
-    return zzVidCapture
+    if frame is None or frame.shape[:2] != (self.height, self.width):
+      print("Could not read the image", self.imagesPaths[self.nextFrame - 1])
+      return [False, []]
+    if image is not None and image.shape == frame.shape:
+      np.copyto(image, frame)
+      return [True, image]
+    return [True, frame]
+  
+  def grab(self):
+    # Skipping a frame doesn't require decoding it
+    if self.nextFrame >= self.num_images:
+      return False
+    if self.nextFrame in self.decodingFrames:
+      self.decodingFrames.pop(self.nextFrame).cancel()
+    self.nextFrame += 1
+    return True
+  
+  def retrieve(self):
+    if self.nextFrame == 0:
+      return [False, []]
+    frame = cv2.imread(self.imagesPaths[self.nextFrame - 1], self.imreadFlag)
+    if frame is None:
+      return [False, []]
+    return [True, frame]
+  
+  def set(self, propToChange, numImage):
+    
+    if propToChange == 1:
+      self.nextFrame = min(max(0, int(numImage)), self.num_images)
+      # Frames decoded ahead that are not going to be needed anymore are dropped
+      for frameNumber in [frameNumber for frameNumber in self.decodingFrames if not(self.nextFrame <= frameNumber < self.nextFrame + self.nbFramesDecodedAhead)]:
+        self.decodingFrames.pop(frameNumber).cancel()
+      return True
+    return False
+
+
+class ZzGrayscaleVideoCapture():
+  # Same as cv2.VideoCapture but read() returns single-channel frames
+
+  def __init__(self, videoPath):
+    self.cap = cv2.VideoCapture(videoPath)
+    self.colorFrame = None
+  
+  def get(self, idOfInfoRequested):
+    return self.cap.get(idOfInfoRequested)
+  
+  def set(self, propToChange, value):
+    return self.cap.set(propToChange, value)
+  
+  def isOpened(self):
+    return self.cap.isOpened()
+  
+  def release(self):
+    self.cap.release()
+  
+  def grab(self):
+    return self.cap.grab()
+  
+  def _toGrayscale(self, ret, image):
+    if not(ret):
+      return [False, []]
+    if len(self.colorFrame.shape) == 2:
+      if image is not None and image.shape == self.colorFrame.shape:
+        np.copyto(image, self.colorFrame)
+        return [True, image]
+      return [True, self.colorFrame.copy()]
+    return [True, cv2.cvtColor(self.colorFrame, cv2.COLOR_BGR2GRAY, image)]
+  
+  def retrieve(self, image=None):
+    if self.colorFrame is None:
+      ret, self.colorFrame = self.cap.retrieve()
+    else:
+      ret, self.colorFrame = self.cap.retrieve(self.colorFrame)
+    return self._toGrayscale(ret, image)
+  
+  def read(self, image=None):
+    # The decoding buffer is reused from one frame to the next, the single-channel frame is written to image if given (as with cv2.VideoCapture.read)
+    if self.colorFrame is None:
+      ret, self.colorFrame = self.cap.read()
+    else:
+      ret, self.colorFrame = self.cap.read(self.colorFrame)
+    return self._toGrayscale(ret, image)
+
+
+class ZzPrefetchVideoCapture():
+  # Decodes the next frames in a background thread (OpenCV releases the GIL while decoding) so that decoding overlaps with the processing of the current frame
+  # A frame returned by read() can be reused for a following frame: it must not be kept (or must be copied) after the next call to read()
+
+  def __init__(self, cap, nbFramesPrefetched):
+    self.cap                = cap
+    self.nbFramesPrefetched = max(1, int(nbFramesPrefetched))
+    self.reusableBuffers    = not(isinstance(cap, (ZzVideoReading, ZzImageSequenceReading))) # frames of .seq videos and images are read in new arrays anyway
+    self.videoInfo          = {idOfInfoRequested: cap.get(idOfInfoRequested) for idOfInfoRequested in [3, 4, 5, 7]}
+    self.capLock            = threading.Lock() # the other properties are read from the capture while the background thread decodes
+    self.nextFrame          = int(cap.get(1))
+    self.freeBuffers        = queue.Queue()
+    self.currentBuffer      = None
+    self.thread             = None
+    self._startPrefetching()
+  
+  def _prefetch(self, filledFrames, stopPrefetching):
+    ret = True
+    while ret and not(stopPrefetching.is_set()):
+      buffer = None
+      if self.reusableBuffers:
+        try:
+          buffer = self.freeBuffers.get_nowait()
+        except queue.Empty:
+          pass
+      try:
+        with self.capLock:
+          ret, frame = self.cap.read(buffer) if buffer is not None else self.cap.read()
+      except Exception as exception: # raised again by read() in the main thread
+        ret, frame = False, exception
+      while not(stopPrefetching.is_set()):
+        try:
+          filledFrames.put([ret, frame], timeout=0.1)
+          break
+        except queue.Full:
+          pass
+  
+  def _startPrefetching(self):
+    self.filledFrames    = queue.Queue(maxsize=self.nbFramesPrefetched)
+    self.stopPrefetching = threading.Event()
+    self.endReached      = False
+    self.thread          = threading.Thread(target=self._prefetch, args=(self.filledFrames, self.stopPrefetching), daemon=True)
+    self.thread.start()
+  
+  def _stopPrefetching(self):
+    if self.thread is not None:
+      self.stopPrefetching.set()
+      self.thread.join()
+      self.thread = None
+  
+  def _recycleCurrentBuffer(self):
+    if self.currentBuffer is not None:
+      self.freeBuffers.put(self.currentBuffer)
+      self.currentBuffer = None
+  
+  def get(self, idOfInfoRequested):
+    if idOfInfoRequested == 1:
+      return self.nextFrame
+    if idOfInfoRequested in self.videoInfo:
+      return self.videoInfo[idOfInfoRequested]
+    with self.capLock:
+      return self.cap.get(idOfInfoRequested)
+  
+  def set(self, propToChange, value):
+    if propToChange == 1 and int(value) == self.nextFrame and self.thread is not None:
+      return True
+    self._stopPrefetching()
+    self._recycleCurrentBuffer()
+    ret = self.cap.set(propToChange, value)
+    self.nextFrame = int(self.cap.get(1))
+    self._startPrefetching()
+    return ret
+  
+  def isOpened(self):
+    with self.capLock:
+      return self.cap.isOpened()
+  
+  def release(self):
+    self._stopPrefetching()
+    self.cap.release()
+  
+  def read(self):
+    self._recycleCurrentBuffer()
+    if self.endReached:
+      return [False, []]
+    ret, frame = self.filledFrames.get()
+    if not(ret):
+      self.endReached = True
+      if isinstance(frame, Exception):
+        raise frame
+      return [False, []]
+    self.nextFrame += 1
+    if self.reusableBuffers:
+      self.currentBuffer = frame
+    return [True, frame]
+
+
+def getSeekIndexPath(seekIndexFolder):
+  # The seek index of a video is saved in the output folder of that video
+  return os.path.join(seekIndexFolder, 'seekIndex.npz')
+
+
+def _saveSeekIndex(videoPath, seekIndexPath, keyFrames, timestamps):
+  temporaryPath = seekIndexPath + '.tmp.npz'
+  np.savez(temporaryPath, videoSize=os.path.getsize(videoPath), videoModificationTime=os.path.getmtime(videoPath), keyFrames=np.array(keyFrames, dtype=np.int64), timestamps=np.array(timestamps, dtype=np.float64))
+  os.replace(temporaryPath, seekIndexPath) # other processes can be loading the index at the same time
+
+
+def loadSeekIndex(videoPath, seekIndexPath):
+  # Returns [keyFrames, timestamps], or None if there is no index up to date for that video
+  if not(os.path.exists(seekIndexPath)):
+    return None
+  try:
+    with np.load(seekIndexPath) as seekIndex:
+      if int(seekIndex['videoSize']) != os.path.getsize(videoPath) or float(seekIndex['videoModificationTime']) != os.path.getmtime(videoPath):
+        return None
+      return [seekIndex['keyFrames'], seekIndex['timestamps']]
+  except Exception:
+    return None
+
+
+def buildSeekIndex(videoPath, seekIndexFolder):
+  # Saves the positions of the keyframes of the video, found by demuxing its packets without decoding them
+  
+  if os.path.isdir(videoPath) or '.seq' in videoPath or '.sqb' in videoPath:
+    return
+  seekIndexPath = getSeekIndexPath(seekIndexFolder)
+  if not(hasattr(cv2, 'CAP_PROP_LRF_HAS_KEY_FRAME')) or not(os.path.isdir(seekIndexFolder)) or loadSeekIndex(videoPath, seekIndexPath) is not None:
+    return
+  
+  cap = cv2.VideoCapture(videoPath)
+  if not(cap.isOpened()) or not(cap.set(cv2.CAP_PROP_FORMAT, -1)):
+    cap.release()
+    return
+  packetsAreKeyFrames = []
+  packetsTimestamps   = []
+  while cap.grab():
+    packetsAreKeyFrames.append(cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME) > 0)
+    packetsTimestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+  cap.release()
+  if not(any(packetsAreKeyFrames)):
+    return
+  
+  # The packets are in decoding order: with B-frames, the frame number of a packet is the rank of its timestamp
+  # Some backends don't give the timestamps of the packets: the packets order is then used, which can only make a seek slower (grabbing the frames in between or seeking give the same frame)
+  packetsTimestamps = np.array(packetsTimestamps)
+  if len(np.unique(packetsTimestamps)) == len(packetsTimestamps):
+    order = np.argsort(packetsTimestamps, kind='stable')
+    framesNumbers = np.empty(len(order), dtype=np.int64)
+    framesNumbers[order] = np.arange(len(order))
+    timestamps = packetsTimestamps[order]
+  else:
+    framesNumbers = np.arange(len(packetsTimestamps))
+    timestamps = []
+  _saveSeekIndex(videoPath, seekIndexPath, np.sort(framesNumbers[np.array(packetsAreKeyFrames)]), timestamps)
+
+
+class ZzSeekIndexVideoCapture():
+  # Uses the keyframes positions of the video to decode as few frames as possible when moving to a frame:
+  # if there is no keyframe between the current position and the frame requested, the frames in between are grabbed instead of seeking (which would decode again from the previous keyframe)
+
+  def __init__(self, cap, keyFrames, timestamps):
+    self.cap        = cap
+    self.keyFrames  = keyFrames
+    self.timestamps = timestamps
+    self.nextFrame  = int(cap.get(1))
+  
+  def get(self, idOfInfoRequested):
+    if idOfInfoRequested == 1:
+      return self.nextFrame
+    if idOfInfoRequested == cv2.CAP_PROP_POS_MSEC and 0 < self.nextFrame <= len(self.timestamps):
+      return self.timestamps[self.nextFrame - 1]
+    return self.cap.get(idOfInfoRequested)
+  
+  def set(self, propToChange, value):
+    if propToChange == 1:
+      numImage = int(value)
+      if numImage == self.nextFrame:
+        return True
+      nextKeyFrame = np.searchsorted(self.keyFrames, self.nextFrame, side='right')
+      if numImage > self.nextFrame and (nextKeyFrame == len(self.keyFrames) or self.keyFrames[nextKeyFrame] > numImage):
+        while self.nextFrame < numImage and self.cap.grab():
+          self.nextFrame += 1
+        return self.nextFrame == numImage
+    ret = self.cap.set(propToChange, value)
+    self.nextFrame = int(self.cap.get(1))
+    return ret
+  
+  def isOpened(self):
+    return self.cap.isOpened()
+  
+  def release(self):
+    self.cap.release()
+  
+  def grab(self):
+    ret = self.cap.grab()
+    if ret:
+      self.nextFrame += 1
+    return ret
+  
+  def retrieve(self, image=None):
+    return self.cap.retrieve(image) if image is not None else self.cap.retrieve()
+  
+  def read(self, image=None):
+    ret, frame = self.cap.read(image) if image is not None else self.cap.read()
+    if ret:
+      self.nextFrame += 1
+    return [ret, frame]
+
+
+def readFramesInIncreasingOrder(cap, framesNumbers, maxNbFramesGrabbedInsteadOfSeeking):
+  # Reads the (sorted) frames framesNumbers in a single forward pass: a frame close enough after the previous one is reached by grabbing the frames in between (without retrieving them) instead of seeking
+  nextFrame = int(cap.get(1))
+  for frameNumber in framesNumbers:
+    if nextFrame < frameNumber <= nextFrame + maxNbFramesGrabbedInsteadOfSeeking:
+      while nextFrame < frameNumber and cap.grab():
+        nextFrame += 1
+    if nextFrame != frameNumber:
+      cap.set(1, frameNumber)
+    ret, frame = cap.read()
+    nextFrame = frameNumber + 1
+    yield [frameNumber, ret, frame]
+
+
+def getGrayscaleFrame(frame):
+  # Returns a new single-channel frame (which can be modified in place), whether the frame was read in color or in grayscale
+  if len(frame.shape) == 3:
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+  return frame.copy()
+
+
+def VideoCapture(videoPath, grayscale=False, nbFramesPrefetched=0, seekIndexFolder=None):
+  
+  if os.path.isdir(videoPath):
+    
+    zzVidCapture = ZzImageSequenceReading(videoPath, grayscale)
+  
+  elif '.seq' in videoPath:
+    
+    zzVidCapture = ZzVideoReading(videoPath, grayscale)
   
   elif '.sqb' in videoPath:
     
-    zzVidCapture = ZzVideoReading(videoPath.replace('.sqb', '.seq'))
+    zzVidCapture = ZzVideoReading(videoPath.replace('.sqb', '.seq'), grayscale)
+  
+  elif grayscale:
     
-    return zzVidCapture
+    zzVidCapture = ZzGrayscaleVideoCapture(videoPath)
   
   else:
     
-    return cv2.VideoCapture(videoPath)
+    zzVidCapture = cv2.VideoCapture(videoPath)
+  
+  if seekIndexFolder is not None and isinstance(zzVidCapture, (cv2.VideoCapture, ZzGrayscaleVideoCapture)) and zzVidCapture.isOpened():
+    
+    seekIndex = loadSeekIndex(videoPath, getSeekIndexPath(seekIndexFolder))
+    if seekIndex is not None:
+      zzVidCapture = ZzSeekIndexVideoCapture(zzVidCapture, seekIndex[0], seekIndex[1])
+  
+  if nbFramesPrefetched and zzVidCapture.isOpened():
+    
+    return ZzPrefetchVideoCapture(zzVidCapture, nbFramesPrefetched)
+  
+  return zzVidCapture